@@ -27,12 +27,19 @@ Features: conditional fetch (304), timing instrumentation, retry/backoff,
           DNS/TLS resolver cache with cooldown isolation,
           HTTP header fingerprinting (server/CDN/cache/HSTS),
           domain health daily (fetch_success/304_ratio/avg_ms),
-          health tier classification (GOOD/DEGRADED/BAD) + auto-alerting.
+          health tier classification (GOOD/DEGRADED/BAD) + auto-alerting,
+          concurrent DNS prefetch for frontier look-ahead + dns_ok=0 fail-fast,
+          robots.txt cache (TTL + conditional refresh) with crawl-delay rate limiting,
+          streaming sitemap/sitemap-index ingest (gzip, lastmod diff, per-file stats),
+          offline re-analysis of stored HTML over a process pool (replay-derived snapshots),
+          multi-process frontier worker fleet (leased claims, heartbeats, expired-lease reclaim).
 """
 import requests
 from bs4 import BeautifulSoup
-import sys, json, re, os, hashlib, time
+import sys, json, re, os, hashlib, time, datetime, socket, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from collections import Counter
+from contextlib import contextmanager
 from urllib.parse import urlparse
 
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -111,10 +118,162 @@ def _a11y_alt(soup):
     ok = sum(1 for i in imgs if i.get('alt','').strip())
     return round(ok/len(imgs)*100, 1), len(imgs)
 
+_WORD_RE = re.compile(r'\w{3,}')
+_TEXT_CHUNK = 64 * 1024
+
+def _text_stats(soup, top_k=10):
+    """
+    One pass over the text nodes of soup.get_text(): returns
+    (text_len, sha256_text, word_count, top_k terms) identical to the
+    get_text() + re.findall(r'\w+', text.lower()) + Counter.most_common path,
+    while holding at most ~_TEXT_CHUNK chars of text and the vocabulary.
+    Chunks are cut at whitespace only, so lower() (final-sigma context) and
+    \w-runs never straddle a boundary; the carry is one token at most.
+    """
+    h = hashlib.sha256()
+    counts = Counter()
+    tl = 0
+    carry = ""
+    pending, plen = [], 0
+
+    def _flush(final=False):
+        nonlocal tl, carry, pending, plen
+        chunk = "".join(pending)
+        pending, plen = [], 0
+        tl += len(chunk)
+        h.update(chunk.encode())
+        buf = carry + chunk
+        if final or not buf or buf[-1].isspace():
+            carry = ""
+        else:
+            carry = buf.rsplit(None, 1)[-1]
+            buf = buf[:-len(carry)]
+        if buf:
+            counts.update(_WORD_RE.findall(buf.lower()))
+
+    for node in soup.strings:
+        pending.append(node)
+        plen += len(node)
+        if plen >= _TEXT_CHUNK:
+            _flush()
+    _flush(final=True)
+    return tl, h.hexdigest(), sum(counts.values()), counts.most_common(top_k)
+
 
 # ═══════════════════════════════════════════════════════════════════════
 # Core analyzer v4
 # ═══════════════════════════════════════════════════════════════════════
+def extract_page(url, final_url, raw_html, status_code=200, redirect_chain=None, timings=None):
+    """
+    PARSE + extraction for one HTML document (no network, no DB).
+    Returns (analysis, edge_data); parse_ms/audit_ms are written into timings.
+    Shared by the live fetch path and offline re-analysis (v16).
+    """
+    timings = timings if timings is not None else {}
+    redirect_chain = redirect_chain or []
+
+    # ── PARSE ──
+    t1 = time.time()
+    soup = BeautifulSoup(raw_html, 'html.parser')
+    page_domain = (urlparse(final_url).hostname or "").lower()
+
+    title = soup.title.string.strip() if soup.title and soup.title.string else None
+    meta_tag = soup.find('meta', attrs={'name': 'description'})
+    meta_desc = meta_tag['content'].strip() if meta_tag and meta_tag.get('content') else None
+
+    h1_list = [t.get_text(strip=True) for t in soup.find_all('h1')]
+    h2_tags = soup.find_all('h2')
+    h3_tags = soup.find_all('h3')
+
+    can_tag = soup.find('link', attrs={'rel': 'canonical'})
+    canonical = can_tag['href'] if can_tag and can_tag.get('href') else None
+    rob_tag = soup.find('meta', attrs={'name': 'robots'})
+    robots_meta = rob_tag['content'] if rob_tag and rob_tag.get('content') else None
+    html_tag = soup.find('html')
+    lang = html_tag.get('lang') if html_tag else None
+
+    og = _extract_og(soup); tc = _extract_twitter_card(soup)
+    hreflang = _extract_hreflang(soup)
+    jt, jc, bj = _extract_jsonld(soup)
+    sha256_dom = _dom_hash(soup)
+
+    # v4: collect links + edge samples
+    il, el, int_sample, ext_sample = _collect_links(soup, page_domain)
+    a11y_pct, img_count = _a11y_alt(soup)
+
+    for s in soup(["script","style"]): s.extract()
+    tl, sha256_text, wc, top_words = _text_stats(soup)
+    timings["parse_ms"] = int((time.time() - t1) * 1000)
+
+    # hreflang consistency
+    hreflang_bad = False
+    if hreflang:
+        norm = seo_database.normalize_url(final_url)
+        if not any(seo_database.normalize_url(h['href']) == norm for h in hreflang):
+            hreflang_bad = True
+
+    t2 = time.time()
+    analysis = {
+        "target_url": url, "final_url": final_url, "redirect_chain": redirect_chain,
+        "status_code": status_code,
+        "page_title": title, "meta_description": meta_desc,
+        "canonical": canonical, "robots_meta": robots_meta, "lang": lang,
+        "structure": {"h1_count": len(h1_list), "h1_content": h1_list,
+                     "h2_count": len(h2_tags), "h2_sample": [t.get_text(strip=True) for t in h2_tags[:5]],
+                     "h3_count": len(h3_tags)},
+        "word_count": wc, "text_len": tl, "sha256_text": sha256_text, "sha256_dom": sha256_dom,
+        "jsonld_types": jt, "jsonld_count": jc, "broken_jsonld": bj,
+        "open_graph": og, "twitter_card": tc,
+        "hreflang": hreflang, "hreflang_inconsistent": hreflang_bad,
+        "internal_links_count": il, "external_links_count": el,
+        "images_count": img_count, "a11y_alt_coverage_pct": a11y_pct,
+        "keyword_dominance": top_words,
+    }
+
+    # v4: edge emission data
+    edge_data = {
+        "internal_links_sample": int_sample,
+        "external_links_sample": ext_sample,
+        "canonical_url_norm": seo_database.normalize_url(canonical) if canonical else None,
+        "hreflang_map": {h["lang"]: h["href"] for h in hreflang} if hreflang else None,
+    }
+
+    timings["audit_ms"] = int((time.time() - t2) * 1000)
+    return analysis, edge_data
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Fetch + save v4
+# ═══════════════════════════════════════════════════════════════════════
+_SYSTEM_GETADDRINFO = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """socket.getaddrinfo that answers from the DNS prefetch cache (positive entries) first."""
+    entry = seo_database.dns_cache_lookup(host.lower()) if isinstance(host, str) else None
+    if entry and entry["ok"] and entry["ips"]:
+        out = []
+        for ip in entry["ips"]:
+            try:
+                out += _SYSTEM_GETADDRINFO(ip, port, family, type, proto, flags | socket.AI_NUMERICHOST)
+            except socket.gaierror:
+                continue  # e.g. an IPv6 address when family=AF_INET
+        if out:
+            return out
+    return _SYSTEM_GETADDRINFO(host, port, family, type, proto, flags)
+
+
+@contextmanager
+def _dns_cache_scope():
+    """DNS_PREFETCH_GATE (v16): route fetch-time lookups through the prefetch cache for the crawl loop only."""
+    prev = socket.getaddrinfo
+    socket.getaddrinfo = _cached_getaddrinfo
+    try:
+        yield
+    finally:
+        socket.getaddrinfo = prev
+
+
 def analyze_competitor_url(url, job_id=None, http_hints=None):
     """Full analysis with timing + edge emission. http_hints = {"etag":..., "last_modified":...}"""
     timings = {}
@@ -155,77 +314,8 @@ def analyze_competitor_url(url, job_id=None, http_hints=None):
             return {"status": "error", "code": status_code, "page_id": pid, "db_status": st}
 
         # ── PARSE ──
-        t1 = time.time()
-        soup = BeautifulSoup(raw_html, 'html.parser')
-        page_domain = (urlparse(final_url).hostname or "").lower()
-
-        title = soup.title.string.strip() if soup.title and soup.title.string else None
-        meta_tag = soup.find('meta', attrs={'name': 'description'})
-        meta_desc = meta_tag['content'].strip() if meta_tag and meta_tag.get('content') else None
-
-        h1_list = [t.get_text(strip=True) for t in soup.find_all('h1')]
-        h2_tags = soup.find_all('h2')
-        h3_tags = soup.find_all('h3')
-
-        can_tag = soup.find('link', attrs={'rel': 'canonical'})
-        canonical = can_tag['href'] if can_tag and can_tag.get('href') else None
-        rob_tag = soup.find('meta', attrs={'name': 'robots'})
-        robots_meta = rob_tag['content'] if rob_tag and rob_tag.get('content') else None
-        html_tag = soup.find('html')
-        lang = html_tag.get('lang') if html_tag else None
-
-        og = _extract_og(soup); tc = _extract_twitter_card(soup)
-        hreflang = _extract_hreflang(soup)
-        jt, jc, bj = _extract_jsonld(soup)
-        sha256_dom = _dom_hash(soup)
-
-        # v4: collect links + edge samples
-        il, el, int_sample, ext_sample = _collect_links(soup, page_domain)
-        a11y_pct, img_count = _a11y_alt(soup)
-
-        for s in soup(["script","style"]): s.extract()
-        text = soup.get_text()
-        tl = len(text)
-        sha256_text = hashlib.sha256(text.encode()).hexdigest()
-        words = [w for w in re.findall(r'\w+', text.lower()) if len(w) > 2]
-        wc = len(words)
-        top_words = Counter(words).most_common(10)
-        timings["parse_ms"] = int((time.time() - t1) * 1000)
-
-        # hreflang consistency
-        hreflang_bad = False
-        if hreflang:
-            norm = seo_database.normalize_url(final_url)
-            if not any(seo_database.normalize_url(h['href']) == norm for h in hreflang):
-                hreflang_bad = True
-
-        t2 = time.time()
-        analysis = {
-            "target_url": url, "final_url": final_url, "redirect_chain": redirect_chain,
-            "status_code": status_code,
-            "page_title": title, "meta_description": meta_desc,
-            "canonical": canonical, "robots_meta": robots_meta, "lang": lang,
-            "structure": {"h1_count": len(h1_list), "h1_content": h1_list,
-                         "h2_count": len(h2_tags), "h2_sample": [t.get_text(strip=True) for t in h2_tags[:5]],
-                         "h3_count": len(h3_tags)},
-            "word_count": wc, "text_len": tl, "sha256_text": sha256_text, "sha256_dom": sha256_dom,
-            "jsonld_types": jt, "jsonld_count": jc, "broken_jsonld": bj,
-            "open_graph": og, "twitter_card": tc,
-            "hreflang": hreflang, "hreflang_inconsistent": hreflang_bad,
-            "internal_links_count": il, "external_links_count": el,
-            "images_count": img_count, "a11y_alt_coverage_pct": a11y_pct,
-            "keyword_dominance": top_words,
-        }
-
-        # v4: edge emission data
-        edge_data = {
-            "internal_links_sample": int_sample,
-            "external_links_sample": ext_sample,
-            "canonical_url_norm": seo_database.normalize_url(canonical) if canonical else None,
-            "hreflang_map": {h["lang"]: h["href"] for h in hreflang} if hreflang else None,
-        }
-
-        timings["audit_ms"] = int((time.time() - t2) * 1000)
+        analysis, edge_data = extract_page(url, final_url, raw_html, status_code,
+                                           redirect_chain, timings)
 
         # ── SAVE (v4 pipeline with graph+cluster+alert gates) ──
         ok, pid, st = seo_database.save_analysis(analysis, job_id=job_id, raw_html=raw_html,
@@ -285,12 +375,205 @@ def batch_crawl(urls, rate_limit_ms=1000):
     return job_id, results
 
 
+# ═══════════════════════════════════════════════════════════════════════
+# robots.txt / sitemap fetchers (v16)
+# ═══════════════════════════════════════════════════════════════════════
+def _robots_fetcher(url, req_headers):
+    """Fetcher for seo_database.refresh_robots: (status, body, headers)."""
+    h = dict(HEADERS)
+    h.update(req_headers or {})
+    r = requests.get(url, headers=h, timeout=10, allow_redirects=True)
+    return r.status_code, r.content, dict(r.headers)
+
+
+def _stream_fetcher(url, req_headers):
+    """Streaming fetcher for seo_database.ingest_sitemap: body is the raw socket stream."""
+    h = dict(HEADERS)
+    h.update(req_headers or {})
+    r = requests.get(url, headers=h, timeout=30, allow_redirects=True, stream=True)
+    r.raw.decode_content = True  # undo transport Content-Encoding; .gz payloads stay gzip
+    return r.status_code, r.raw, dict(r.headers)
+
+
+def sitemap_ingest(sitemap_url, since=None):
+    """Ingest a sitemap / sitemap index under a SITEMAP job; only new/changed URLs are enqueued."""
+    seo_database.init_db()
+    job_id = seo_database.start_job(seed=sitemap_url, mode="SITEMAP")
+    res = seo_database.ingest_sitemap(sitemap_url, _stream_fetcher, job_id=job_id, since=since)
+    seo_database.finish_job(job_id, metrics={k: res[k] for k in ("files", "failed", "urls_seen",
+                                                                 "urls_new", "urls_changed",
+                                                                 "urls_enqueued")})
+    print(f"[SITEMAP] job_id={job_id} files={res['files']} seen={res['urls_seen']} "
+          f"new={res['urls_new']} changed={res['urls_changed']} enqueued={res['urls_enqueued']}")
+    return job_id, res
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Offline re-analysis from artifact_store (v16)
+# ═══════════════════════════════════════════════════════════════════════
+def _reanalyze_worker(item):
+    """Process-pool worker: parse stored HTML, no network / no DB access. Returns the analysis only."""
+    timings = {"fetch_ms": 0}
+    analysis, edge_data = extract_page(item["url"], item["final_url"],
+                                       item["html"].decode("utf-8", errors="replace"),
+                                       item["status_code"], item["redirect_chain"], timings)
+    return analysis, edge_data, timings
+
+
+def reanalyze_stored_html(domain=None, since=None, limit=None, workers=None):
+    """
+    Re-run the full extraction + 54-gate pipeline over HTML held in artifact_store.
+    Parsing fans out over a process pool; the parent is the single DB writer, so
+    saves stay serialized. Snapshots are tagged replay-derived (derived_from_snap_id).
+    """
+    seo_database.init_db()
+    snap_ids = seo_database.list_reanalysis_candidates(domain=domain, since=since, limit=limit)
+    job_id = seo_database.start_job(seed=domain or "artifact_store", mode="REFRESH",
+                                     settings={"domain": domain, "since": since, "count": len(snap_ids)},
+                                     notes="offline re-analysis", is_replay_derived=True)
+    workers = workers or os.cpu_count() or 2
+    metrics = {"success": 0, "failed": 0, "total_parse_ms": 0}
+    t0 = time.time()
+
+    def _drain(done):
+        for fut in done:
+            # the parent keeps each in-flight item, so HTML never travels back from the workers
+            item = pending.pop(fut)
+            try:
+                analysis, edge_data, timings = fut.result()
+                ok, pid, st = seo_database.save_analysis(analysis, job_id=job_id,
+                                                          raw_html=item["html"].decode("utf-8", errors="replace"),
+                                                          headers=item["headers"], timings=timings,
+                                                          edge_data=edge_data,
+                                                          replay_source_snap_id=item["snap_id"])
+            except Exception as e:
+                print(f"[REANALYZE] error: {e}")
+                metrics["failed"] += 1
+                continue
+            metrics["success" if ok else "failed"] += 1
+            metrics["total_parse_ms"] += timings.get("parse_ms", 0)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}  # future -> item
+        for item in seo_database.iter_snapshot_html(snap_ids):
+            pending[pool.submit(_reanalyze_worker, item)] = item
+            if len(pending) >= workers * 4:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                _drain(done)
+        _drain(list(pending))
+
+    n = metrics["success"] + metrics["failed"]
+    wall_s = time.time() - t0
+    metrics["avg_parse_ms"] = metrics["total_parse_ms"] / n if n else 0
+    metrics["pages_per_sec"] = n / wall_s if wall_s > 0 else 0
+    del metrics["total_parse_ms"]
+    seo_database.finish_job(job_id, metrics=metrics)
+    print(f"[REANALYZE] job_id={job_id} ok={metrics['success']} fail={metrics['failed']} "
+          f"rate={metrics['pages_per_sec']:.1f} pages/s workers={workers}")
+    return job_id, metrics
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # Frontier crawl with retry v4
 # ═══════════════════════════════════════════════════════════════════════
-def frontier_crawl(limit=10, rate_limit_ms=1000):
+def _crawl_frontier_item(item, job_id, metrics, robots_checked, worker_id=None):
+    """
+    Robots check + fetch/analyze one claimed frontier row, settle it (DONE/SKIPPED/retry) and
+    tally `metrics`. Returns (result, the domain's rate limit ms — None when nothing was fetched).
+    v16: worker_id settles the row only while that worker still holds its lease.
+    """
+    # ── ROBOTS_GATE (v16) ── refresh robots.txt once per host per run, skip disallowed
+    host = urlparse(item['url']).hostname
+    if host and host not in robots_checked:
+        robots_checked.add(host)
+        try:
+            seo_database.refresh_robots(host, _robots_fetcher, job_id=job_id)
+        except Exception as e:
+            print(f"[ROBOTS] refresh failed for {host}: {e}")
+    rb = seo_database.check_robots_url(item['url'])
+    if not rb["allowed"]:
+        seo_database.frontier_done(item['fid'], status="SKIPPED", error="ROBOTS_DISALLOW",
+                                   worker_id=worker_id)
+        metrics["skipped"] += 1
+        return {"status": "skipped", "msg": "ROBOTS_DISALLOW", "url": item['url']}, None
+    try:
+        result = analyze_competitor_url(item['url'], job_id=job_id,
+                                        http_hints=item.get('http_hints'))
+        st = result.get("data", {}).get("db_status", result.get("db_status", "ERROR"))
+        transient = result.get("transient", False)
+
+        if result.get("status") == "error" and transient:
+            seo_database.frontier_retry(item['fid'], error=result.get("msg"), worker_id=worker_id)
+            metrics["retried"] += 1
+        else:
+            seo_database.frontier_done(item['fid'], status="DONE", worker_id=worker_id)
+            if st == "SAVED": metrics["success"] += 1
+            elif st == "HTTP_304": metrics["http_304"] += 1
+            elif st == "DEDUP_SKIPPED": metrics["skipped"] += 1
+            else: metrics["failed"] += 1
+
+        tm = result.get("data", {}).get("timings", {})
+        metrics["total_fetch_ms"] += tm.get("fetch_ms", 0)
+    except Exception as e:
+        seo_database.frontier_retry(item['fid'], error=str(e), worker_id=worker_id)
+        metrics["retried"] += 1
+        result = {"status": "error", "msg": str(e)}
+    return result, rb["rate_limit_ms"] or 0
+
+
+def _domain_paced(items, ready_at):
+    """
+    Yield claimed items in order, passing over any whose host is still cooling down
+    (ready_at: host -> time.monotonic() of its next allowed fetch, set by the caller after
+    each fetch); sleeps only when every remaining host is cooling down.
+    """
+    pending = list(items)
+    while pending:
+        now = time.monotonic()
+        for i, item in enumerate(pending):
+            if ready_at.get(urlparse(item['url']).hostname, 0) <= now:
+                yield pending.pop(i)
+                break
+        else:
+            time.sleep(min(ready_at[urlparse(it['url']).hostname] for it in pending) - now)
+
+
+def _lease_heartbeat(owner, metrics=None, tag="FRONTIER"):
+    """
+    Daemon thread renewing every frontier lease `owner` holds each FRONTIER_HEARTBEAT_SECONDS
+    (metrics, when given, are published with it). Stop: set() the event, join() the thread.
+    """
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(seo_database.FRONTIER_HEARTBEAT_SECONDS):
+            try:
+                seo_database.frontier_heartbeat(owner, metrics=dict(metrics) if metrics is not None else None)
+            except Exception as e:
+                print(f"[{tag}] heartbeat failed: {e}")
+
+    hb = threading.Thread(target=beat, daemon=True)
+    hb.start()
+    return stop, hb
+
+
+def _db_settings():
+    """The coordinator's UPPER_CASE seo_database settings, replayed in spawned workers."""
+    return {k: v for k, v in vars(seo_database).items()
+            if k.isupper() and not k.startswith("_") and isinstance(v, (bool, int, float, str, tuple, list, dict, type(None)))}
+
+
+def frontier_crawl(limit=10, rate_limit_ms=1000, dns_lookahead=None, resolver=None):
     seo_database.init_db()
-    items = seo_database.frontier_next(limit=limit)
+    # ── DNS_PREFETCH_GATE (v16) ── warm resolver cache for the next items before claiming
+    try:
+        dns = seo_database.prefetch_frontier_dns(lookahead=dns_lookahead or limit * 2,
+                                                 resolver=resolver)
+        print(f"[DNS] hosts={dns['hosts']} resolved={dns['resolved']} failed={dns['failed']} cached={dns['cached']}")
+    except Exception as e:
+        print(f"[DNS] prefetch skipped: {e}")  # prefetch is best-effort
+    owner = f"local:{os.getpid()}"
+    items = seo_database.frontier_next(limit=limit, worker_id=owner)
     if not items:
         print("[FRONTIER] No pending URLs"); return []
 
@@ -301,34 +584,22 @@ def frontier_crawl(limit=10, rate_limit_ms=1000):
     metrics = {"success": 0, "failed": 0, "skipped": 0, "retried": 0, "http_304": 0,
                "total_fetch_ms": 0}
     results = []
-    for i, item in enumerate(items):
-        print(f"[CRAWL {i+1}/{len(items)}] {item['url']} (retry={item['retry_count']} source={item.get('source','?')})")
-        try:
-            result = analyze_competitor_url(item['url'], job_id=job_id,
-                                            http_hints=item.get('http_hints'))
-            st = result.get("data", {}).get("db_status", result.get("db_status", "ERROR"))
-            transient = result.get("transient", False)
-
-            if result.get("status") == "error" and transient:
-                seo_database.frontier_retry(item['fid'], error=result.get("msg"))
-                metrics["retried"] += 1
-            else:
-                seo_database.frontier_done(item['fid'], status="DONE")
-                if st == "SAVED": metrics["success"] += 1
-                elif st == "HTTP_304": metrics["http_304"] += 1
-                elif st == "DEDUP_SKIPPED": metrics["skipped"] += 1
-                else: metrics["failed"] += 1
-
-            tm = result.get("data", {}).get("timings", {})
-            metrics["total_fetch_ms"] += tm.get("fetch_ms", 0)
-            results.append(result)
-        except Exception as e:
-            seo_database.frontier_retry(item['fid'], error=str(e))
-            metrics["retried"] += 1
-            results.append({"status": "error", "msg": str(e)})
-
-        if i < len(items) - 1:
-            time.sleep(rate_limit_ms / 1000.0)
+    robots_checked = set()
+    ready_at = {}
+    # leases outlive FRONTIER_LEASE_SECONDS only while renewed — a long batch must heartbeat too
+    stop, hb = _lease_heartbeat(owner)
+    try:
+        with _dns_cache_scope():
+            for i, item in enumerate(_domain_paced(items, ready_at)):
+                print(f"[CRAWL {i+1}/{len(items)}] {item['url']} (retry={item['retry_count']} source={item.get('source','?')})")
+                result, delay_ms = _crawl_frontier_item(item, job_id, metrics, robots_checked, worker_id=owner)
+                results.append(result)
+                if delay_ms is not None:
+                    # per domain: the domain's (crawl-delay aware) rate limit, floored at rate_limit_ms
+                    ready_at[urlparse(item['url']).hostname] = time.monotonic() + max(rate_limit_ms, delay_ms) / 1000.0
+    finally:
+        stop.set()
+        hb.join()
 
     n = len(items)
     metrics["avg_fetch_ms"] = metrics["total_fetch_ms"] / n if n else 0
@@ -339,11 +610,609 @@ def frontier_crawl(limit=10, rate_limit_ms=1000):
     return results
 
 
+# ═══════════════════════════════════════════════════════════════════════
+# Frontier worker fleet (v16)
+# ═══════════════════════════════════════════════════════════════════════
+def frontier_worker(job_id, worker_id, batch=10, rate_limit_ms=1000, db_settings=None):
+    """
+    One fleet process: lease batches from crawl_frontier until nothing is claimable, renewing
+    its leases from a heartbeat thread. Metrics land on crawl_worker for the coordinator to merge.
+    """
+    for k, v in (db_settings or {}).items():
+        setattr(seo_database, k, v)
+    seo_database.register_worker(worker_id, job_id, pid=os.getpid(), host=socket.gethostname())
+    metrics = {"success": 0, "failed": 0, "skipped": 0, "retried": 0, "http_304": 0,
+               "total_fetch_ms": 0, "processed": 0}
+    stop, hb = _lease_heartbeat(worker_id, metrics, tag=f"WORKER {worker_id}")
+    robots_checked = set()
+    ready_at = {}
+    prefetch = True
+    try:
+        while True:
+            # ── DNS_PREFETCH_GATE (v16) ── a spawned worker starts with an empty in-process cache:
+            # seed it once per batch (resolver_cache rows the coordinator wrote, else resolve);
+            # a look-ahead that is already cached costs one read and writes nothing
+            if prefetch:
+                prefetch = False
+                try:
+                    seo_database.prefetch_frontier_dns(lookahead=batch)
+                except Exception as e:
+                    print(f"[WORKER {worker_id}] DNS prefetch skipped: {e}")
+            items = seo_database.frontier_next(limit=batch, worker_id=worker_id)
+            if not items:
+                # ready rows held back by another worker's domain lease: wait for it to free up
+                if seo_database.frontier_backlog()["ready"]:
+                    time.sleep(1.0); continue
+                break
+            with _dns_cache_scope():
+                for item in _domain_paced(items, ready_at):
+                    print(f"[WORKER {worker_id}] {item['url']} (retry={item['retry_count']})")
+                    _, delay_ms = _crawl_frontier_item(item, job_id, metrics, robots_checked,
+                                                       worker_id=worker_id)
+                    metrics["processed"] += 1
+                    if delay_ms is not None:
+                        ready_at[urlparse(item['url']).hostname] = time.monotonic() + max(rate_limit_ms, delay_ms) / 1000.0
+            prefetch = True
+    finally:
+        stop.set()
+        hb.join()
+        try:
+            seo_database.flush_gate_profiles(job_id)  # spans buffered in this process die with it
+        except Exception as e:
+            print(f"[WORKER {worker_id}] gate profile flush failed: {e}")
+        seo_database.finish_worker(worker_id, metrics=metrics)
+    return metrics
+
+
+def frontier_fleet(workers=4, batch=10, rate_limit_ms=1000, dns_lookahead=None):
+    """
+    Coordinator: one FRONTIER job, `workers` spawned processes sharing crawl_frontier through
+    leases. Workers that die are marked LOST (their rows go back to PENDING); expired leases are
+    swept while the fleet runs. Job metrics are merged from all workers at the end.
+    """
+    seo_database.init_db()
+    # ── DNS_PREFETCH_GATE (v16) ──
+    try:
+        dns = seo_database.prefetch_frontier_dns(lookahead=dns_lookahead or workers * batch * 2)
+        print(f"[DNS] hosts={dns['hosts']} resolved={dns['resolved']} failed={dns['failed']} cached={dns['cached']}")
+    except Exception as e:
+        print(f"[DNS] prefetch skipped: {e}")
+    if not seo_database.frontier_backlog()["ready"]:
+        print("[FLEET] No pending URLs"); return None
+
+    job_id = seo_database.start_job(seed="frontier", mode="FRONTIER",
+                                     settings={"batch": batch, "workers": workers})
+    db_settings = _db_settings()  # DB_PATH, SHARD_*, GATE_PROFILE_ENABLED, REPORT_MODE, ...
+    ctx = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    procs = {}
+    for n in range(workers):
+        wid = f"{host}:{os.getpid()}:w{n}"
+        p = ctx.Process(target=frontier_worker, args=(job_id, wid, batch, rate_limit_ms, db_settings),
+                        name=wid)
+        p.start()
+        procs[wid] = p
+    print(f"[FLEET] job_id={job_id} workers={workers} batch={batch}")
+
+    sweep_every = max(1.0, seo_database.FRONTIER_HEARTBEAT_SECONDS / 2)
+    last_sweep = time.monotonic()
+    while procs:
+        for wid, p in list(procs.items()):
+            p.join(timeout=0.5)
+            if p.is_alive():
+                continue
+            if p.exitcode != 0:
+                released = seo_database.finish_worker(wid, status="LOST")
+                print(f"[FLEET] worker {wid} exited {p.exitcode}, released={released}")
+            del procs[wid]
+        if time.monotonic() - last_sweep >= sweep_every:
+            last_sweep = time.monotonic()
+            n = seo_database.reclaim_expired_leases()
+            if n:
+                print(f"[FLEET] reclaimed {n} expired leases")
+
+    metrics = seo_database.merge_worker_metrics(job_id)
+    done = metrics.pop("processed", 0)
+    metrics["avg_fetch_ms"] = metrics.pop("total_fetch_ms", 0) / done if done else 0
+    seo_database.finish_job(job_id, metrics=metrics)
+    print(f"[FLEET] Done job_id={job_id} | ok={metrics.get('success', 0)} fail={metrics.get('failed', 0)} "
+          f"retry={metrics.get('retried', 0)} lost={metrics['workers_lost']} reclaimed={metrics['leases_reclaimed']}")
+    return job_id
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Benchmarks (v16)
+# ═══════════════════════════════════════════════════════════════════════
+def _synthetic_page(size_kb, seed=16):
+    """Deterministic text-heavy HTML of roughly size_kb (mixed scripts, inline tags)."""
+    import random
+    rnd = random.Random(seed)
+    vocab = ["seo", "crawler", "ΣΟΦΊΑ", "İstanbul", "straße", "データ", "ranking", "canonical",
+             "snake_case", "x2", "ok", "Ünïcödé", "hreflang", "sitemap", "robots"] + \
+            [f"term{i}" for i in range(2000)]
+    parts, size = ["<html lang='en'><head><title>bench</title><style>p{}</style></head><body>"], 0
+    while size < size_kb * 1024:
+        words = " ".join(rnd.choice(vocab) for _ in range(rnd.randint(5, 40)))
+        frag = f"<p>{words} <b>{rnd.choice(vocab)}</b>{rnd.choice(vocab)}, <i>{words[:20]}</i></p>\n"
+        if rnd.random() < 0.05:
+            frag += "<script>var x = 'not counted';</script>"
+        parts.append(frag); size += len(frag)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def bench_text_stats(size_kb=2048, rounds=3):
+    """Latency + peak-memory of _text_stats vs the get_text()/findall/Counter path."""
+    import tracemalloc
+    html = _synthetic_page(size_kb)
+
+    def legacy(soup):
+        text = soup.get_text()
+        words = [w for w in re.findall(r'\w+', text.lower()) if len(w) > 2]
+        return len(text), hashlib.sha256(text.encode()).hexdigest(), len(words), Counter(words).most_common(10)
+
+    results = {"size_kb": size_kb, "rounds": rounds}
+    outputs = {}
+    for name, fn in (("legacy", legacy), ("streaming", _text_stats)):
+        soup = BeautifulSoup(html, 'html.parser')
+        for s in soup(["script", "style"]): s.extract()
+        best = None
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            outputs[name] = fn(soup)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        tracemalloc.start()
+        fn(soup)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = {"best_ms": round(best * 1000, 1), "peak_kb": round(peak / 1024, 1)}
+    results["identical"] = outputs["legacy"] == outputs["streaming"]
+    print(json.dumps(results, indent=2))
+    return results
+
+
+def bench_redaction(rows=20000, seed=16):
+    """
+    Export-path throughput (rows/s, CSV to memory) with no redaction, the compiled
+    engine, and the per-cell apply_redaction() path (DB round trip per cell).
+    """
+    import csv, io, random
+    seo_database.init_db()
+    rnd = random.Random(seed)
+    words = ["seo", "contact", "pricing", "crawler", "page", "title", "about", "blog"]
+    def cell():
+        t = " ".join(rnd.choice(words) for _ in range(rnd.randint(2, 12)))
+        return t + (f" mail {rnd.choice(words)}@example.com" if rnd.random() < 0.02 else "")
+    data = [[cell() for _ in range(8)] + [rnd.randint(0, 100) for _ in range(6)] for _ in range(rows)]
+
+    conn = seo_database.get_conn()
+    try:
+        engine = seo_database.load_redaction_engine(conn.cursor(), "EXPORT")
+    finally:
+        conn.close()
+    modes = {
+        "none": lambda v: v,
+        "compiled": engine.apply,
+        "per_cell": lambda v: seo_database.apply_redaction(v, scope="EXPORT"),
+    }
+    results = {"rows": rows, "rules": len(engine.rules)}
+    for name, fn in modes.items():
+        n = rows if name != "per_cell" else max(1, rows // 20)
+        buf = io.StringIO(); w = csv.writer(buf)
+        t0 = time.perf_counter()
+        for row in data[:n]:
+            w.writerow([fn(v) if isinstance(v, str) and v else v for v in row])
+        dt = time.perf_counter() - t0
+        results[name] = {"rows_measured": n, "rows_per_sec": round(n / dt) if dt else None}
+    results["hits"] = {str(k): v for k, v in engine.hits.items()}
+    print(json.dumps(results, indent=2))
+    return results
+
+
+# ── v16 pipeline benchmark suite: synthetic sites + synthetic history → JSON results ──
+BENCH_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results")
+BENCH_SCENARIOS = ("frontier_crawl", "save_analysis", "compute_kpis", "execute_replay",
+                   "export_csv", "daily_gates")
+
+
+def _synthetic_site_page(site, i, n_pages, seed=16):
+    """Deterministic competitor-style page: title/meta/h1/JSON-LD/links/images vary with (site, i)."""
+    import random
+    rnd = random.Random(f"{seed}:{site}:{i}")
+    topics = ["pricing", "features", "rank tracker", "backlinks", "site audit", "keyword research",
+              "blog", "about", "contact", "login", "docs", "api"]
+    topic = topics[i % len(topics)]
+    words = " ".join(rnd.choice(topics + [f"term{k}" for k in range(300)]) for _ in range(rnd.randint(150, 600)))
+    links = "".join(f"<a href='/p{rnd.randrange(n_pages)}'>more {k}</a>" for k in range(rnd.randint(5, 25)))
+    jsonld = ('<script type="application/ld+json">{"@context":"https://schema.org","@type":"Product",'
+              f'"name":"{site} {topic}"}}</script>') if rnd.random() < 0.6 else ""
+    meta = f"<meta name='description' content='{site} {topic} page {i}'>" if rnd.random() < 0.8 else ""
+    h1 = "".join(f"<h1>{topic} {k}</h1>" for k in range(rnd.choice((0, 1, 1, 1, 2))))
+    imgs = "".join(f"<img src='/i{k}.png'" + (f" alt='{topic}'>" if rnd.random() < 0.7 else ">")
+                   for k in range(rnd.randint(0, 8)))
+    return (f"<html lang='en'><head><title>{site} — {topic} #{i}</title>{meta}"
+            f"<link rel='canonical' href='/p{i}'>{jsonld}</head><body>{h1}<h2>{topic}</h2>"
+            f"<p>{words}</p>{links}<a href='https://example.org/{topic}'>ext</a>{imgs}</body></html>")
+
+
+def synthetic_site_server(sites=4, pages=50, seed=16):
+    """
+    Serve `sites` deterministic competitor sites on loopback — one HTTP server per site on
+    127.0.0.<k+2> so each is its own domain (all on 127.0.0.1 if the host can't bind those).
+    /robots.txt allows everything; pages carry an ETag and answer If-None-Match with 304.
+    Returns (urls, stop).
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            srv = self.server
+            if self.path == "/robots.txt":
+                body, ctype = b"User-agent: *\nAllow: /\n", "text/plain"
+            elif self.path.startswith("/p") and self.path[2:].isdigit() and int(self.path[2:]) < srv.pages:
+                body = _synthetic_site_page(srv.site, int(self.path[2:]), srv.pages, srv.seed).encode()
+                ctype = "text/html; charset=utf-8"
+            else:
+                self.send_response(404); self.send_header("Content-Length", "0"); self.end_headers()
+                return
+            etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304); self.send_header("ETag", etag); self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    servers, urls = [], []
+    for k in range(sites):
+        try:
+            srv = ThreadingHTTPServer((f"127.0.0.{k + 2}", 0), _Handler)
+        except OSError:
+            srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        srv.site, srv.pages, srv.seed = f"site{k}", pages, seed
+        srv.daemon_threads = True
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        host, port = srv.server_address[:2]
+        urls += [f"http://{host}:{port}/p{i}" for i in range(pages)]
+
+    def stop():
+        for srv in servers:
+            srv.shutdown()
+            srv.server_close()
+    return urls, stop
+
+
+def synthetic_snapshot_history(snapshots=1_000_000, domains=200, days=30, seed=16, batch=50_000):
+    """
+    Bulk-load a deterministic page/page_snapshot history (one snapshot per page per day,
+    ending today) straight into the DB, bypassing save_analysis — for daily-gate benchmarks.
+    v16: one job per day; each day's KPIs go through compute_kpis_for_job (re-dated to that
+    day) and the KPI streams are replayed, so the stream-backed gates see real history.
+    Returns {"domains", "pages", "snapshots", "kpi_values", "load_ms"}.
+    """
+    import random
+    rnd = random.Random(seed)
+    pages_per_domain = max(1, -(-snapshots // (domains * days)))
+    today = datetime.datetime.utcnow().date()
+    insert = '''INSERT OR IGNORE INTO page_snapshot (page_id,job_id,fetched_at,http_status_family,
+        fetch_ms,parse_ms,audit_ms,score_total,issues_sha256,issues_count_critical,
+        issues_count_warning,issues_count_info,word_count) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)'''
+    t0 = time.perf_counter()
+    dates = [(today - datetime.timedelta(days=day)) for day in range(days - 1, -1, -1)]
+    job_ids = [seo_database.start_job(seed="synthetic", mode="SEED_ONLY", notes=f"benchmark history {d}")
+               for d in dates]
+    conn = seo_database.get_conn()
+    try:
+        c = conn.cursor()
+        page_ids = []
+        for d in range(domains):
+            name = f"hist{d}.bench.example"
+            c.execute("INSERT OR IGNORE INTO domain (domain) VALUES (?)", (name,))
+            c.execute("SELECT domain_id FROM domain WHERE domain=?", (name,))
+            did = c.fetchone()[0]
+            for p in range(pages_per_domain):
+                url = f"https://{name}/p{p}"
+                c.execute('''INSERT OR IGNORE INTO page (domain_id,domain,url,url_norm,is_representative)
+                             VALUES (?,?,?,?,?)''', (did, name, url, url, int(p < 3)))
+                c.execute("SELECT page_id FROM page WHERE url_norm=?", (url,))
+                page_ids.append(c.fetchone()[0])
+        conn.commit()
+
+        rows, n = [], 0
+        for date, job_id in zip(dates, job_ids):
+            ts = date.strftime('%Y-%m-%dT06:00:00Z')
+            for pid in page_ids:
+                crit, warn, info = rnd.choice((0, 0, 0, 1)), rnd.randint(0, 4), rnd.randint(0, 3)
+                score = max(0, 100 - crit * 25 - warn * 8 - info * 2)
+                rows.append((pid, job_id, ts, rnd.choice(("2xx",) * 19 + ("4xx",)), rnd.randint(50, 900),
+                             rnd.randint(5, 80), rnd.randint(1, 20), score,
+                             hashlib.sha256(f"{crit}{warn}{info}".encode()).hexdigest(),
+                             crit, warn, info, rnd.randint(100, 3000)))
+                if len(rows) >= batch:
+                    c.executemany(insert, rows)
+                    conn.commit()
+                    n += len(rows); rows = []
+        if rows:
+            c.executemany(insert, rows)
+            n += len(rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+    # ── KPI_STREAM_GATE (v16) ── kpi_value history per day (re-dated before the next day's
+    # rows would replace it), then replayed into kpi_stream_stat
+    kpi_values = 0
+    for date, job_id in zip(dates, job_ids):
+        kpi_values += seo_database.compute_kpis_for_job(job_id)
+        conn = seo_database.get_conn()
+        try:
+            conn.execute("UPDATE kpi_value SET as_of_date=? WHERE job_id=?", (date.strftime('%Y-%m-%d'), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+    seo_database.rebuild_kpi_stream_stats()
+    return {"domains": domains, "pages": len(page_ids), "snapshots": n, "kpi_values": kpi_values,
+            "load_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, round((time.perf_counter() - t0) * 1000, 1)
+
+
+def _rate(n, ms):
+    return round(n / (ms / 1000.0), 1) if ms else None
+
+
+def run_benchmarks(scenarios=None, urls=200, pages=300, snapshots=1_000_000, seed=16, out=None):
+    """
+    Standardized crawl-to-report benchmark suite on a throwaway DB (seo_database.DB_PATH is
+    restored afterwards). Scenarios: frontier crawl of `urls` URLs against the synthetic site
+    server, save_analysis ingest of `pages` pre-parsed pages, compute_kpis_for_job,
+    execute_replay over the ingested HTML, export_csv, and the daily gates over a synthetic
+    history of ~`snapshots` snapshots. Results (+ environment) are written as JSON to `out`
+    (default bench_results/bench_<UTC>.json) for compare_benchmarks().
+    """
+    import contextlib, io, platform, sqlite3, subprocess, tempfile
+    scenarios = tuple(scenarios or BENCH_SCENARIOS)
+    unknown = set(scenarios) - set(BENCH_SCENARIOS)
+    if unknown:
+        raise ValueError(f"unknown scenarios {sorted(unknown)}; choose from {BENCH_SCENARIOS}")
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        rev = None
+    results = {"suite": "pipeline", "version": "v16",
+               "started_at": datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+               "params": {"scenarios": list(scenarios), "urls": urls, "pages": pages,
+                          "snapshots": snapshots, "seed": seed},
+               "env": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                       "platform": platform.platform(), "cpus": os.cpu_count(), "git_rev": rev},
+               "scenarios": {}}
+    res = results["scenarios"]
+    saved_path = seo_database.DB_PATH
+    tmp = tempfile.mkdtemp(prefix="seobench_")
+    stop = None
+    try:
+        seo_database.DB_PATH = os.path.join(tmp, "bench.db")
+        seo_database.init_db()
+        log = io.StringIO()  # pipeline progress prints stay out of the report
+        with contextlib.redirect_stdout(log):
+            if "frontier_crawl" in scenarios:
+                crawl_urls, stop = synthetic_site_server(sites=4, pages=max(1, urls // 4), seed=seed)
+                crawl_urls = crawl_urls[:urls]
+                seo_database.frontier_add(crawl_urls, source="SEED")
+                conn = seo_database.get_conn()
+                try:  # measure pipeline throughput, not the per-domain politeness delay
+                    c = conn.cursor()
+                    for host in {urlparse(u).hostname for u in crawl_urls}:
+                        seo_database.ensure_domain(c, host)
+                    c.execute("UPDATE domain SET rate_limit_ms=0")
+                    conn.commit()
+                finally:
+                    conn.close()
+                out_rows, ms = _timed(frontier_crawl, limit=len(crawl_urls), rate_limit_ms=0)
+                ok = sum(1 for r in out_rows if r.get("status") == "success")
+                res["frontier_crawl"] = {"urls": len(crawl_urls), "ok": ok, "wall_ms": ms,
+                                         "per_sec": _rate(len(crawl_urls), ms)}
+
+            ingest_job = None
+            if set(scenarios) & {"save_analysis", "compute_kpis", "execute_replay", "export_csv"}:
+                ingest_job = seo_database.start_job(seed="bench", mode="SEED_ONLY", notes="benchmark ingest")
+                parsed, parse_ms = [], 0.0
+                for i in range(pages):
+                    site = f"ingest{i % 8}.bench.example"
+                    url = f"https://{site}/p{i}"
+                    html = _synthetic_site_page(site, i, pages, seed)
+                    (analysis, edge), ms = _timed(extract_page, url, url, html)
+                    parse_ms += ms
+                    parsed.append((analysis, html, edge))
+                conn = seo_database.get_conn()
+                try:  # tier A keeps HTML bytes, which execute_replay needs
+                    c = conn.cursor()
+                    for i in range(8):
+                        seo_database.ensure_domain(c, f"ingest{i}.bench.example")
+                    c.execute("UPDATE domain SET tier='A' WHERE domain LIKE 'ingest%.bench.example'")
+                    conn.commit()
+                finally:
+                    conn.close()
+                t0 = time.perf_counter()
+                for analysis, html, edge in parsed:
+                    seo_database.save_analysis(analysis, job_id=ingest_job, raw_html=html, edge_data=edge)
+                ms = round((time.perf_counter() - t0) * 1000, 1)
+                if "save_analysis" in scenarios:
+                    res["save_analysis"] = {"pages": pages, "wall_ms": ms, "per_sec": _rate(pages, ms),
+                                            "extract_ms": round(parse_ms, 1),
+                                            "extract_per_sec": _rate(pages, parse_ms)}
+
+            if "compute_kpis" in scenarios:
+                _, ms = _timed(seo_database.compute_kpis_for_job, ingest_job)
+                res["compute_kpis"] = {"job_pages": pages, "wall_ms": ms}
+
+            if "execute_replay" in scenarios:
+                rs = seo_database.get_active_rule_set()
+                rid = seo_database.create_replay_plan(rs["rule_set_id"], rs["rule_set_id"],
+                                                      name="bench", sample_size=pages)
+                items = seo_database.populate_replay_items(rid)
+                _, ms = _timed(seo_database.execute_replay, rid)
+                res["execute_replay"] = {"items": items, "wall_ms": ms, "per_sec": _rate(items, ms)}
+
+            if "export_csv" in scenarios:
+                (path, rows), ms = _timed(seo_database.export_csv, os.path.join(tmp, "bench.csv"))
+                res["export_csv"] = {"rows": rows, "wall_ms": ms, "per_sec": _rate(rows, ms)}
+
+            if "daily_gates" in scenarios:
+                hist = synthetic_snapshot_history(snapshots=snapshots, seed=seed)
+                gates = {}
+                for name, fn in (("data_quality_daily", seo_database.compute_data_quality_daily),
+                                 ("kpi_baseline_daily", seo_database.compute_kpi_baseline_daily),
+                                 ("evaluate_anomaly", seo_database.evaluate_anomaly),
+                                 ("domain_health_daily", seo_database.compute_domain_health_daily)):
+                    _, gates[name] = _timed(fn)
+                res["daily_gates"] = dict(hist, gates_ms=gates, wall_ms=round(sum(gates.values()), 1))
+    finally:
+        if stop:
+            stop()
+        seo_database.DB_PATH = saved_path
+        import shutil
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    results["finished_at"] = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    if not out:
+        os.makedirs(BENCH_RESULTS_DIR, exist_ok=True)
+        out = os.path.join(BENCH_RESULTS_DIR, f"bench_{results['started_at'].replace(':', '')}.json")
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+    results["output_path"] = out
+    print(json.dumps(results["scenarios"], indent=2))
+    print(f"[BENCH] results → {out}")
+    return results
+
+
+def compare_benchmarks(base_path, new_path, tolerance=0.10):
+    """Per-scenario wall_ms ratio new/base; ratio > 1+tolerance is flagged as a regression."""
+    with open(base_path, encoding="utf-8") as fh:
+        base_run = json.load(fh)
+    with open(new_path, encoding="utf-8") as fh:
+        new_run = json.load(fh)
+    if base_run.get("params") != new_run.get("params"):
+        print(f"[BENCH] warning: params differ {base_run.get('params')} vs {new_run.get('params')}")
+    base, new = base_run["scenarios"], new_run["scenarios"]
+    rows = []
+    for name in BENCH_SCENARIOS:
+        if name in base and name in new and base[name].get("wall_ms"):
+            ratio = new[name]["wall_ms"] / base[name]["wall_ms"]
+            verdict = "REGRESSION" if ratio > 1 + tolerance else "IMPROVED" if ratio < 1 - tolerance else "SAME"
+            rows.append({"scenario": name, "base_ms": base[name]["wall_ms"], "new_ms": new[name]["wall_ms"],
+                         "ratio": round(ratio, 3), "verdict": verdict})
+            print(f"  {name:16s} {base[name]['wall_ms']:>10.1f} → {new[name]['wall_ms']:>10.1f} ms "
+                  f"x{ratio:.2f} {verdict}")
+    return rows
+
+
+
+def run_index_advisor(snapshots=200_000, pages=200, seed=16, baseline_path=None, update=False, out=None):
+    """
+    Query-plan check on a generated fixture: synthetic history (~`snapshots` snapshots) plus
+    `pages` full save_analysis ingests in a throwaway DB, then seo_database.check_query_plans
+    with the daily/KPI gates and a save_analysis probe included. Prints flagged statements and
+    validated index suggestions; returns the check result (ok=False on plan regression or a
+    missing baseline — update=True rewrites query_plan_baseline.json).
+    """
+    import contextlib, io, shutil, tempfile
+    saved_path = seo_database.DB_PATH
+    tmp = tempfile.mkdtemp(prefix="seoplan_")
+    try:
+        seo_database.DB_PATH = os.path.join(tmp, "fixture.db")
+        seo_database.init_db()
+        with contextlib.redirect_stdout(io.StringIO()):
+            synthetic_snapshot_history(snapshots=snapshots, seed=seed)
+            job_id = seo_database.start_job(seed="plan-fixture", mode="SEED_ONLY")
+            for i in range(pages):
+                url = f"https://plan{i % 8}.bench.example/p{i}"
+                analysis, edge = extract_page(url, url, _synthetic_site_page(f"plan{i % 8}", i, pages, seed))
+                seo_database.save_analysis(analysis, job_id=job_id, raw_html=_synthetic_site_page(
+                    f"plan{i % 8}", i, pages, seed), edge_data=edge)
+            seo_database.finish_job(job_id)
+
+        probe_url = "https://plan0.bench.example/probe"
+        probe_html = _synthetic_site_page("plan0", pages + 1, pages, seed)
+        probe = extract_page(probe_url, probe_url, probe_html)
+        extra = [("save_analysis", seo_database.save_analysis,
+                  {"data": probe[0], "job_id": job_id, "raw_html": probe_html, "edge_data": probe[1]})]
+        report = seo_database.advise_query_plans(include_writes=True, extra_targets=extra)
+        result = seo_database.check_query_plans(baseline_path=baseline_path, update=update, report=report)
+    finally:
+        seo_database.DB_PATH = saved_path
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for e in report:
+        if not e.get("fingerprint"):
+            print(f"[PLAN] target errors: {json.dumps(e['errors'], ensure_ascii=False)}")
+            continue
+        if not e["flags"]:
+            continue
+        print(f"\n[PLAN] {e['fingerprint']} {','.join(e['sources'])}\n  {e['sql'][:220]}")
+        for f in e["flags"]:
+            print(f"  ! {f['kind']:22s} {f['detail']}")
+        for sug in e["suggestions"]:
+            print(f"  + {sug['index_sql']}  (validated={sug['validated']})")
+    if out:
+        with open(out, "w", encoding="utf-8") as fh:
+            json.dump({"report": report, "check": result}, fh, indent=1)
+    if result.get("baseline_missing"):
+        print(f"\n[PLAN] no baseline at {result['baseline_path']} — run --index-advisor --update and commit it")
+    for r in result["regressions"]:
+        print(f"[PLAN] REGRESSION {r['fingerprint']} {','.join(r['sources'])} gained {', '.join(r['gained'])}")
+    for r in result["new_flagged"]:
+        print(f"[PLAN] NEW {r['fingerprint']} {','.join(r['sources'])} {', '.join(r['flags'])}")
+    print(f"\n[PLAN] checked={result['checked']} regressions={len(result['regressions'])} "
+          f"new_flagged={len(result['new_flagged'])} ok={result['ok']} baseline={result['baseline_path']}")
+    return result
+
+
 # ═══════════════════════════════════════════════════════════════════════
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "--frontier":
+    if len(sys.argv) > 2 and sys.argv[1] == "--sitemap":
+        sitemap_ingest(sys.argv[2], since=sys.argv[3] if len(sys.argv) > 3 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--bench-text":
+        bench_text_stats(size_kb=int(sys.argv[2]) if len(sys.argv) > 2 else 2048)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--bench-redaction":
+        bench_redaction(rows=int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--bench-suite":
+        # --bench-suite [snapshots] [scenario,scenario,...]
+        run_benchmarks(snapshots=int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000,
+                       scenarios=sys.argv[3].split(",") if len(sys.argv) > 3 else None)
+    elif len(sys.argv) > 3 and sys.argv[1] == "--bench-compare":
+        compare_benchmarks(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 1 and sys.argv[1] == "--index-advisor":
+        # --index-advisor [snapshots] [--update]
+        args = [a for a in sys.argv[2:] if a != "--update"]
+        res = run_index_advisor(snapshots=int(args[0]) if args else 200_000, update="--update" in sys.argv)
+        sys.exit(0 if res["ok"] else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--compact":
+        # maintenance: full VACUUM (needs the database to itself); jobs never run this
+        print(json.dumps(seo_database.compact_database()))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--reanalyze":
+        reanalyze_stored_html(limit=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--frontier":
         lim = int(sys.argv[2]) if len(sys.argv) > 2 else 10
         frontier_crawl(limit=lim)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--fleet":
+        nw = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+        lim = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+        frontier_fleet(workers=nw, batch=lim)
     elif len(sys.argv) > 2:
         jid, res = batch_crawl(sys.argv[1:])
         print(f"\n[BATCH] job_id={jid}, crawled={len(res)}")
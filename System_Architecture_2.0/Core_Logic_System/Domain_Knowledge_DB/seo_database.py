@@ -3,8 +3,9 @@ competitor_intelligence v15 — Network-isolated, fingerprinted, health-monitore
 Tables: v14(58) + resolver_cache, http_fingerprint, domain_health_daily = 61
 Gates:  v14(58) + NETWORK_PRECHECK → FINGERPRINT → DOMAIN_HEALTH_DAILY → HEALTH_ALERT = 62 total
 """
-import sqlite3, json, os, hashlib, datetime, re, time, random
-from urllib.parse import urlparse, urlunparse, urlencode, parse_qs
+import sqlite3, json, os, hashlib, datetime, re, time, random, threading, fnmatch, bisect
+from urllib.parse import urlparse, urlunparse, urlencode, parse_qs, quote
+from contextlib import contextmanager
 
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "competitor_intelligence.db")
 
@@ -77,6 +78,8 @@ DETERMINISM_MODES = ("NORMAL", "STRICT")
 # v6 constants
 # ═══════════════════════════════════════════════════════════════════════
 PAGE_INTENT_FLAGS = ("HOME", "PRICING", "DOCS", "BLOG", "LOGIN", "SIGNUP")
+# v16: page_snapshot.intent_mask bit i == PAGE_INTENT_FLAGS[i] — only ever append new flags
+INTENT_FLAG_BITS = {f: 1 << i for i, f in enumerate(PAGE_INTENT_FLAGS)}
 TEMPLATE_FAMILIES = ("MARKETING", "DOCS", "APP", "UNKNOWN")
 
 SEGMENT_TEMPLATES = [
@@ -236,7 +239,7 @@ DEFAULT_INGEST_SOURCES = [
 # v13 lineage + sample_set + stability
 LINEAGE_EDGE_TYPES = ("CRAWL_TO_SNAPSHOT", "SNAPSHOT_TO_ISSUE", "SNAPSHOT_TO_ARTIFACT",
                       "SNAPSHOT_TO_DELTA", "SNAPSHOT_TO_KPI", "SNAPSHOT_TO_ALERT",
-                      "ALERT_TO_TICKET", "JOB_TO_EXPORT")
+                      "ALERT_TO_TICKET", "JOB_TO_EXPORT", "SNAPSHOT_TO_REPLAY")
 LINEAGE_KIND_MAP = {
     "crawl_job": "JOB", "page_snapshot": "SNAPSHOT", "page_issue": "ISSUE",
     "artifact_store": "ARTIFACT", "snapshot_delta": "DELTA",
@@ -290,6 +293,100 @@ RESOLVER_COOLDOWN_MINUTES = 15
 FINGERPRINT_HEADER_KEYS = ("server", "x-powered-by", "x-cdn", "cache-control",
                            "vary", "etag", "strict-transport-security")
 
+# v16 DNS prefetch (resolver cache warmer)
+DNS_PREFETCH_LOOKAHEAD = 50
+DNS_PREFETCH_WORKERS = 8
+DNS_POSITIVE_TTL_SECONDS = 300
+DNS_NEGATIVE_TTL_SECONDS = RESOLVER_COOLDOWN_MINUTES * 60
+
+# v16 robots.txt cache + compiled matcher
+ROBOTS_TTL_HOURS = 24
+ROBOTS_ERROR_TTL_HOURS = 1
+ROBOTS_USER_AGENT_TOKEN = "seobaike"
+ROBOTS_MAX_BYTES = 500_000
+ROBOTS_MAX_CRAWL_DELAY_MS = 60_000
+
+# v16 sitemap streaming ingest
+SITEMAP_MAX_URLS_PER_FILE = 50_000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024          # uncompressed, per protocol limit
+SITEMAP_MAX_INDEX_DEPTH = 2
+SITEMAP_DIFF_CHUNK = 500
+SITEMAP_SPOOL_MEMORY_BYTES = 4 * 1024 * 1024   # larger bodies spill to a temp file before parsing
+
+# v16 bulk lineage/cost writers + running cost totals
+BULK_WRITE_FLUSH_ROWS = 500
+COST_TIER_STAGES = ("FETCH", "PARSE", "AUDIT")
+COST_RECONCILE_TOLERANCE = 1e-6
+
+# v16 streaming KPI estimators (windowed Welford + EWMA + P² quantiles)
+KPI_STREAM_WINDOW_SAMPLES = 28                 # Welford weight floor 1/N once n > N
+KPI_STREAM_EWMA_ALPHA = 0.3
+KPI_STREAM_QUANTILES = (0.5, 0.75, 0.9)
+KPI_STREAM_DQ_METRICS = ("parse_fail_rate", "audit_incomplete_rate")
+
+# v16 query result cache
+QUERY_CACHE_ENABLED = True
+QUERY_CACHE_TTL_SECONDS = 30                   # staleness bound for writes that do not bump data_version
+QUERY_CACHE_MAX_ENTRIES = 256
+QUERY_CACHE_WARM_ON_FINISH = False
+QUERY_CACHE_WARM_QUERIES = ("query_score_leaderboard", "query_issue_heatmap", "query_alert_feed",
+                            "get_domain_summary", "query_kpi_dashboard")
+# cached-query inputs written outside the save path; crawl_frontier is left out on purpose — it
+# changes on every claim and heartbeat, and query_sitemap_coverage tolerates TTL staleness
+DATA_VERSION_TRIGGER_TABLES = ("domain", "alert_rule", "alert_event", "kpi_definition", "kpi_value")
+
+# v16 reporting replica + WAL checkpointing
+REPORT_MODE = "PRIMARY"                        # PRIMARY | REPLICA
+REPORT_REPLICA_PATH = None                     # default: <DB_PATH>.replica
+REPORT_REPLICA_MAX_STALENESS_SECONDS = 60
+WAL_AUTOCHECKPOINT_PAGES = 1000
+WAL_JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024      # WAL is truncated back to this on reset
+
+# v16 streaming export + columnar (Parquet / Arrow IPC) export
+EXPORT_FETCH_CHUNK = 1000
+EXPORT_ROW_GROUP_SIZE = 50_000
+EXPORT_COLUMNAR_FORMATS = ("PARQUET", "ARROW")
+EXPORT_PARTITION_KEYS = ("domain", "date")
+EXPORT_MAX_OPEN_PARTITIONS = 32                # partitioned export: open writers (+ row buffers) kept, LRU
+
+# v16 batch pair reports
+PAIR_REPORT_BATCH_FORMATS = ("JSONL", "PARQUET")
+
+# v16 event_log retention + archive
+EVENT_LOG_TTL_DAYS = {"INFO": 14, "WARN": 90, "ERROR": 365}   # None = keep forever
+EVENT_LOG_ARCHIVE = True                       # False → expired events are dropped, not archived
+EVENT_LOG_ARCHIVE_DIR = None                   # default: <DB dir>/event_archive
+EVENT_LOG_RETENTION_BATCH = 5000
+EVENT_LOG_RETENTION_INTERVAL_HOURS = 24        # finish_job runs retention at most this often
+EVENT_LOG_VACUUM_FREE_RATIO = 0.25             # incremental_vacuum once this share of pages is free
+EVENT_LOG_VACUUM_STEP_PAGES = 2000             # pages released per retention run (auto_vacuum=INCREMENTAL)
+
+# v16 per-gate profiling (save_analysis)
+GATE_PROFILE_ENABLED = False
+GATE_PROFILE_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+GATE_PROFILE_FLUSH_PAGES = 50                  # merge buffered spans into job_gate_profile this often
+
+# v16 query-plan advisor
+ADVISOR_MIN_SCAN_ROWS = 1000                   # full scans of smaller tables are not flagged
+QUERY_PLAN_BASELINE_PATH = None                # default: query_plan_baseline.json next to this module
+_SQL_CAPTURE = None                            # statement list while the advisor is capturing
+
+# v16 sharded storage (page-level tables partitioned by domain hash)
+SHARD_COUNT = 0                                # 0 = single file; N>0 → SHARDED_TABLES live in N shard files
+SHARD_DIR = None                               # default: next to DB_PATH (<db>.shardNN.db)
+SHARD_ID_STRIDE = 10 ** 12                     # shard i allocates AUTOINCREMENT ids from i*stride
+SHARD_FANOUT_WORKERS = 4
+SHARD_OUTBOX_DRAIN_PAGES = 200                 # routed saves per shard between catalog outbox drains
+SHARD_OUTBOX_DRAIN_BATCH = 5000                # outbox rows applied per catalog transaction
+SHARDED_TABLES = ("page", "page_snapshot", "page_issue", "snapshot_delta", "snapshot_rule_binding",
+                  "snapshot_integrity", "snapshot_artifact", "url_graph_edge",
+                  "canonical_cluster", "cluster_member", "http_cache", "artifact_store")
+
+# v16 crawl worker fleet (leased frontier claims)
+FRONTIER_LEASE_SECONDS = 300                   # claimed rows go back to PENDING unless renewed in time
+FRONTIER_HEARTBEAT_SECONDS = 60                # workers renew their leases this often
+FRONTIER_LEASE_DOMAIN_EXCLUSIVE = True         # one worker per domain at a time (politeness across processes)
+
 # ═══════════════════════════════════════════════════════════════════════
 # URL normalization
 # ═══════════════════════════════════════════════════════════════════════
@@ -331,6 +428,11 @@ def detect_page_intent(url, title=None):
     return sorted(set(flags))
 
 
+def intent_mask(intent_flags):
+    """v16: page_snapshot.intent_mask for a list of intent flags (unknown flags ignored)."""
+    return sum(INTENT_FLAG_BITS.get(f, 0) for f in set(intent_flags or ()))
+
+
 def detect_template_family(intent_flags, url):
     """v6: classify page template family from intent flags."""
     if any(f in intent_flags for f in ("DOCS",)):
@@ -345,19 +447,497 @@ def detect_template_family(intent_flags, url):
 # Connection
 # ═══════════════════════════════════════════════════════════════════════
 def get_conn():
-    conn = sqlite3.connect(DB_PATH, timeout=30)
+    """v16: with SHARD_COUNT set, opens the current shard_scope() shard or the catalog with shards attached."""
+    shard = current_shard()
+    conn = _open_conn(DB_PATH if shard is None else shard_path(shard))
+    if SHARD_COUNT:
+        _attach_shard_layout(conn, shard)
+    return conn
+
+
+def _open_conn(path):
+    conn = sqlite3.connect(path, timeout=30)
     conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
+    # v16: sharded mode references rows across files, which SQLite cannot enforce
+    conn.execute("PRAGMA foreign_keys=OFF" if SHARD_COUNT else "PRAGMA foreign_keys=ON")
     conn.execute("PRAGMA busy_timeout=10000")
+    # v16: bound WAL growth — auto-checkpoint often, shrink the file when it resets
+    conn.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT_PAGES}")
+    conn.execute(f"PRAGMA journal_size_limit={WAL_JOURNAL_SIZE_LIMIT}")
+    if _SQL_CAPTURE is not None:  # v16: query-plan advisor is recording statements
+        conn.set_trace_callback(_SQL_CAPTURE.append)
+    return conn
+
+# ═══════════════════════════════════════════════════════════════════════
+# v16 reporting replica + WAL checkpointing
+# ═══════════════════════════════════════════════════════════════════════
+def _report_replica_path():
+    return REPORT_REPLICA_PATH or DB_PATH + ".replica"
+
+
+def _open_readonly(path):
+    conn = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True, timeout=30)
+    if _SQL_CAPTURE is not None:
+        conn.set_trace_callback(_SQL_CAPTURE.append)
     return conn
 
+
+_REPLICA_REFRESHER = {"thread": None}
+_REPLICA_LOCK = threading.Lock()
+
+
+def _primary_signature():
+    """
+    Change signal for the primary file itself (not data_version, which only some writers bump):
+    in WAL mode every commit appends to or restarts the -wal file, so its size+mtime move on any
+    write; without a WAL the main file's do. Checkpoints don't touch the WAL, so they don't count.
+    """
+    wal = DB_PATH + "-wal"
+    try:
+        st = os.stat(wal if os.path.exists(wal) else DB_PATH)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _replica_signature(path):
+    conn = _open_readonly(path)
+    try:
+        rows = conn.execute("SELECT source_signature FROM replica_source").fetchall()
+        return rows[0][0] if rows else None
+    except sqlite3.Error:
+        return None  # replica from before v16 signatures
+    finally:
+        conn.close()
+
+
+def refresh_report_replica(force=False):
+    """
+    REPLICA_REFRESH_GATE (v16): copy the primary into the reporting replica with the online
+    backup API (one read snapshot, so concurrent writers never restart it), then swap it in
+    atomically. Skipped (mtime touched) when the primary has not changed since the last copy.
+    The replica's mtime is the moment its source signature was taken — its staleness clock.
+    """
+    path = _report_replica_path()
+    t0 = time.time()
+    signature = _primary_signature()
+    if not force and signature and os.path.exists(path) and _replica_signature(path) == signature:
+        os.utime(path)
+        return {"refreshed": False, "signature": signature, "path": path}
+    src = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        dst = sqlite3.connect(tmp)
+        try:
+            src.backup(dst)
+            dst.execute("PRAGMA journal_mode=DELETE")  # single-file replica, openable read-only
+            dst.execute("CREATE TABLE IF NOT EXISTS replica_source (source_signature TEXT)")
+            dst.execute("DELETE FROM replica_source")
+            dst.execute("INSERT INTO replica_source VALUES (?)", (signature,))
+            dst.commit()
+        finally:
+            dst.close()
+        os.utime(tmp, (t0, t0))
+        os.replace(tmp, path)
+    finally:
+        src.close()
+    checkpoint_wal()
+    return {"refreshed": True, "signature": signature, "path": path,
+            "copy_ms": int((time.time() - t0) * 1000)}
+
+
+def _refresh_replica_background():
+    """Start one background replica refresh unless one is already running."""
+    def run():
+        try:
+            refresh_report_replica()
+        except (sqlite3.Error, OSError):
+            pass  # next stale report call retries; readers use the primary meanwhile
+
+    with _REPLICA_LOCK:
+        t = _REPLICA_REFRESHER["thread"]
+        if t is not None and t.is_alive():
+            return
+        t = _REPLICA_REFRESHER["thread"] = threading.Thread(target=run, name="report-replica-refresh",
+                                                              daemon=True)
+        t.start()
+
+
+def _ensure_report_replica():
+    """
+    Replica path if it is within REPORT_REPLICA_MAX_STALENESS_SECONDS of the primary (or the
+    primary has not changed since it was copied), else None — the caller reads the primary and a
+    background refresh is started. A report call never copies the database inline.
+    """
+    path = _report_replica_path()
+    if os.path.exists(path):
+        if time.time() - os.path.getmtime(path) < REPORT_REPLICA_MAX_STALENESS_SECONDS:
+            return path
+        signature = _primary_signature()
+        if signature and _replica_signature(path) == signature:
+            os.utime(path)
+            return path
+    _refresh_replica_background()
+    return None
+
+
+def get_report_conn():
+    """
+    Connection for read-only reporting. REPORT_MODE=PRIMARY → the live DB; REPORT_MODE=REPLICA →
+    a read-only replica at most REPORT_REPLICA_MAX_STALENESS_SECONDS old, so long report scans
+    never pin the writer's WAL.
+    """
+    if REPORT_MODE == "REPLICA" and not SHARD_COUNT:  # v16: the replica only copies the catalog
+        path = _ensure_report_replica()
+        if path:
+            return _open_readonly(path)
+    return get_conn()
+
+
+def checkpoint_wal(mode="PASSIVE"):
+    """WAL_CHECKPOINT_GATE (v16): checkpoint the primary's WAL. Returns busy/log/checkpointed pages."""
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"unknown checkpoint mode {mode}")
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        busy, log_pages, done = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    finally:
+        conn.close()
+    wal = DB_PATH + "-wal"
+    return {"mode": mode, "busy": bool(busy), "log_pages": log_pages, "checkpointed": done,
+            "wal_bytes": os.path.getsize(wal) if os.path.exists(wal) else 0}
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # Schema v4
 # ═══════════════════════════════════════════════════════════════════════
+# ═══════════════════════════════════════════════════════════════════════
+# v16 sharded storage: page-level tables partitioned across files by domain hash
+# ═══════════════════════════════════════════════════════════════════════
+_SHARD_LOCAL = threading.local()   # .shard → index of the shard this thread's get_conn() opens
+_SHARD_MAX = 9                     # catalog + shards must fit SQLite's default limit of 10 attached DBs
+
+
+def shard_for_domain(domain):
+    """Stable shard index for a host: sha256(domain) mod SHARD_COUNT (None in single-file mode)."""
+    if not SHARD_COUNT:
+        return None
+    return int.from_bytes(hashlib.sha256((domain or "").lower().encode()).digest()[:8], "big") % SHARD_COUNT
+
+
+def shard_path(i):
+    root = os.path.splitext(os.path.abspath(DB_PATH))[0]
+    if SHARD_DIR:
+        root = os.path.join(SHARD_DIR, os.path.basename(root))
+    return f"{root}.shard{i:02d}.db"
+
+
+def current_shard():
+    return getattr(_SHARD_LOCAL, "shard", None) if SHARD_COUNT else None
+
+
+@contextmanager
+def shard_scope(i):
+    """Route this thread's get_conn() to shard i — page-level writes must run inside one."""
+    prev = getattr(_SHARD_LOCAL, "shard", None)
+    _SHARD_LOCAL.shard = i
+    try:
+        yield i
+    finally:
+        _SHARD_LOCAL.shard = prev
+
+
+def _attach_shard_layout(conn, shard):
+    """
+    Shard connection: attach the catalog, so unqualified global tables (domain, issue, event_log…)
+    resolve there. Catalog connection: attach every shard and shadow each sharded table with a
+    TEMP UNION ALL view, so unscoped readers (daily gates, KPIs, exports) see all shards.
+    Writes through those views fail on purpose — route them with shard_scope().
+    Catalog writes made inside a shard_scope() go to the shard's catalog_outbox (see
+    _catalog_deferred), so a routed transaction only ever commits its own shard file.
+    """
+    if shard is not None:
+        conn.execute("ATTACH DATABASE ? AS catalog", (DB_PATH,))
+        return
+    for i in range(SHARD_COUNT):
+        conn.execute(f"ATTACH DATABASE ? AS s{i}", (shard_path(i),))
+    for t in SHARDED_TABLES:
+        conn.execute(f"CREATE TEMP VIEW {t} AS " +
+                     " UNION ALL ".join(f"SELECT * FROM s{i}.{t}" for i in range(SHARD_COUNT)))
+
+
+def _init_shards(c):
+    """
+    Create/migrate every shard with the same _create_tables/_migrate as the catalog, then drop
+    everything but SHARDED_TABLES (and the shard's catalog_outbox) so global tables fall through
+    to the attached catalog.
+    Each shard's AUTOINCREMENT sequences start at i*SHARD_ID_STRIDE → ids stay globally unique.
+    """
+    if SHARD_COUNT > _SHARD_MAX:
+        raise ValueError(f"SHARD_COUNT={SHARD_COUNT} exceeds {_SHARD_MAX} (SQLite attach limit)")
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='page'")
+    if c.fetchone() and c.execute("SELECT EXISTS(SELECT 1 FROM page)").fetchone()[0]:
+        raise RuntimeError(f"{DB_PATH} already holds single-file page data — sharded mode needs a fresh catalog")
+    for i in range(SHARD_COUNT):
+        if SHARD_DIR:
+            os.makedirs(SHARD_DIR, exist_ok=True)
+        conn = _open_conn(shard_path(i))
+        try:
+            sc = conn.cursor()
+            _create_tables(sc)
+            _migrate(sc)
+            sc.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+            for (name,) in sc.fetchall():
+                if name not in SHARDED_TABLES and name != "catalog_outbox":
+                    sc.execute(f'DROP TABLE "{name}"')
+            # catalog writes made by routed saves, applied to the catalog by drain_shard_outbox()
+            sc.execute('''CREATE TABLE IF NOT EXISTS catalog_outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload_json TEXT NOT NULL)''')
+            for t in SHARDED_TABLES:
+                sc.execute('''INSERT INTO sqlite_sequence (name,seq) SELECT ?,?
+                              WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name=?)''',
+                           (t, i * SHARD_ID_STRIDE, t))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _fan_out(fn, args, kwargs):
+    """fn(*args, **kwargs) once per shard (SHARD_FANOUT_WORKERS threads); results in shard order."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def run(i):
+        with shard_scope(i):
+            return fn(*args, **kwargs)
+    with ThreadPoolExecutor(max_workers=max(1, min(SHARD_FANOUT_WORKERS, SHARD_COUNT))) as ex:
+        return list(ex.map(run, range(SHARD_COUNT)))
+
+
+# ── v16 per-shard id cursors: striped ids are never compared across shards ──
+def _shard_id_ranges():
+    """[(shard, lo, hi)] AUTOINCREMENT id range of each shard; one open range in single-file mode."""
+    if not SHARD_COUNT:
+        return [(0, 0, None)]
+    return [(i, i * SHARD_ID_STRIDE, (i + 1) * SHARD_ID_STRIDE) for i in range(SHARD_COUNT)]
+
+
+def _load_id_marks(marks_json, legacy=0):
+    """{shard: high-water id} from a *_marks_json column; a legacy global mark counts for its own shard only."""
+    if marks_json:
+        return {int(k): v for k, v in json.loads(marks_json).items()}
+    if not legacy:
+        return {}
+    return {legacy // SHARD_ID_STRIDE if SHARD_COUNT else 0: legacy}
+
+
+def _ids_after_marks(col, marks):
+    """(sql, params) matching rows whose `col` is past its own shard's high-water mark."""
+    parts, params = [], []
+    for i, lo, hi in _shard_id_ranges():
+        parts.append(f"({col}>?" + (f" AND {col}<?)" if hi else ")"))
+        params += [max(lo - 1, marks.get(i, 0))] + ([hi] if hi else [])
+    return "(" + " OR ".join(parts) + ")", params
+
+
+def _shard_fanout(order=(), limit="limit", owner=None, key=None, sums=(), merge=None):
+    """
+    SHARD_FANOUT_GATE (v16): in sharded mode run a report query once per shard and merge the
+    rows back into the single-file shape. owner — row field holding a domain; the row is kept
+    only from that domain's shard (catalog-driven LEFT JOINs repeat in every shard). key —
+    rows sharing it are combined: `sums` fields added, other fields coalesced. order — (field or
+    callable, desc) pairs, or a callable of the call's arguments returning them. limit —
+    argument name (or callable) capping the merged list. merge(parts) replaces all of this for
+    non-list results. Single-file mode and calls already inside a shard_scope() pass through.
+    """
+    import inspect
+
+    def wrap(fn):
+        sig = inspect.signature(fn)
+
+        def fanned(*args, **kwargs):
+            if not SHARD_COUNT or current_shard() is not None:
+                return fn(*args, **kwargs)
+            parts = _fan_out(fn, args, kwargs)
+            if merge:
+                return merge(parts)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            rows = []
+            for i, part in enumerate(parts):
+                rows.extend(r for r in part if not owner or
+                            (shard_for_domain(r[owner]) if r[owner] is not None else 0) == i)
+            if key:
+                merged = {}
+                for r in rows:
+                    cur = merged.get(r[key])
+                    if cur is None:
+                        merged[r[key]] = dict(r)
+                        continue
+                    for f, v in r.items():
+                        if f in sums:
+                            cur[f] = (cur[f] or 0) + (v or 0)
+                        elif cur[f] is None:
+                            cur[f] = v
+                rows = list(merged.values())
+            for k, desc in reversed(order(bound.arguments) if callable(order) else order):
+                get = k if callable(k) else (lambda r, f=k: r[f])
+                rows.sort(key=lambda r: (get(r) is not None, get(r)), reverse=desc)
+            cap = limit(bound.arguments) if callable(limit) else bound.arguments.get(limit)
+            return rows[:cap] if cap is not None and cap >= 0 else rows
+
+        fanned.__name__, fanned.__doc__, fanned.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return fanned
+    return wrap
+
+
+def _merge_snapshot_rates(parts):
+    total = sum(p["total"] for p in parts)
+    incomplete = sum(p["incomplete"] for p in parts)
+    return {"total": total, "incomplete": incomplete,
+            "rate": round(incomplete / total, 4) if total > 0 else 0}
+
+
+def _score_order(args):
+    return (("score", str(args.get("order", "DESC")).upper() == "DESC"),)
+
+
+# ── v16 shard catalog outbox: routed saves never write (or lock) the catalog ──
+_SHARD_SAVES = {}        # (DB_PATH, shard) -> routed saves since this process last drained it
+_SHARD_DOMAINS = set()   # (DB_PATH, domain) known to exist in the catalog
+
+
+def _catalog_deferred():
+    """True inside a shard_scope(): catalog writes are queued in the shard's catalog_outbox."""
+    return bool(SHARD_COUNT) and current_shard() is not None
+
+
+def _outbox(c, kind, payload):
+    c.connection.execute("INSERT INTO catalog_outbox (kind,payload_json) VALUES (?,?)",
+                         (kind, json.dumps(payload, ensure_ascii=False, default=str)))
+
+
+def _outbox_costs(c):
+    """Cost rows queued in this shard's outbox and not drained yet (budget/tier checks count them)."""
+    rows = []
+    for (p,) in c.connection.execute("SELECT payload_json FROM catalog_outbox WHERE kind='COST'").fetchall():
+        rows.extend(tuple(r) for r in json.loads(p))
+    return rows
+
+
+def _ensure_catalog_domain(name):
+    """Create a new domain row in its own short catalog transaction, before the shard one."""
+    if (DB_PATH, name) in _SHARD_DOMAINS:
+        return
+    conn = _open_conn(DB_PATH)
+    try:
+        ensure_domain(conn.cursor(), name)
+        conn.commit()
+    finally:
+        conn.close()
+    _SHARD_DOMAINS.add((DB_PATH, name))
+
+
+def _apply_outbox(c, items):
+    """Replay outbox items [(kind, payload)] on a catalog cursor, in order."""
+    tiers, budgets, bump = set(), set(), False
+    for kind, p in items:
+        if kind == "EVENT":
+            c.execute(_EVENT_INSERT_TS, p)
+        elif kind == "LINEAGE":
+            c.executemany(_LINEAGE_INSERT, p)
+        elif kind == "COST":
+            c.executemany(_COST_INSERT, p)
+            _apply_cost_rollup(c, p)
+        elif kind == "SITE_HINT":
+            upsert_site_hint(c, *p)
+        elif kind == "FINGERPRINT":
+            c.execute(_FINGERPRINT_INSERT, p)
+        elif kind == "DRIFT":
+            c.execute(_DRIFT_INSERT, p)
+        elif kind == "PAGE_GATES":
+            p = dict(p)
+            saved, budget = p.pop("saved"), p.pop("budget")
+            segment_ids, tickets_created = _catalog_page_gates(c, **p)
+            _log(c, "AUDIT", "INFO", "SAVED",
+                 f"{saved} seg={segment_ids} tickets={tickets_created} budget={budget}",
+                 job_id=p["job_id"], domain_id=p["domain_id"], page_id=p["page_id"], snap_id=p["snap_id"])
+        elif kind == "COST_TIER":
+            tiers.add(p)
+        elif kind == "BUDGET":
+            budgets.add(p)
+        elif kind == "VERSION":
+            bump = True
+        else:
+            raise ValueError(f"unknown outbox kind {kind}")
+    for did in sorted(tiers):
+        compute_domain_cost_tier(c, did)
+    for jid in sorted(budgets):
+        evaluate_budget(c, jid)
+    if bump:
+        _bump_data_version(c)
+
+
+def drain_shard_outbox(shard=None, batch=None):
+    """
+    SHARD_OUTBOX_DRAIN_GATE (v16): apply queued catalog writes (event_log, cost ledger, lineage,
+    alert/QA/segment/ticket gates, …) from each shard's catalog_outbox to the catalog, in seq
+    order. A batch commits together with its shard_outbox_mark high-water mark in one catalog-only
+    transaction, so every row applies exactly once without a cross-file commit; applied rows are
+    then trimmed from the shard. Concurrent drainers serialize on the mark row. Returns rows applied.
+    """
+    if not SHARD_COUNT:
+        return 0
+    batch = batch or SHARD_OUTBOX_DRAIN_BATCH
+    applied = 0
+    for i in (range(SHARD_COUNT) if shard is None else [shard]):
+        while True:
+            with shard_scope(None):
+                conn = get_conn()  # catalog + shard views: the page gates read sharded tables
+                try:
+                    c = conn.cursor()
+                    # first write of the txn takes the catalog write lock → the mark read below is current
+                    c.execute('INSERT OR IGNORE INTO shard_outbox_mark (shard,applied_seq) VALUES (?,0)', (i,))
+                    c.execute('SELECT applied_seq FROM shard_outbox_mark WHERE shard=?', (i,))
+                    hwm = c.fetchone()[0]
+                    c.execute(f'''SELECT seq,kind,payload_json FROM s{i}.catalog_outbox
+                                 WHERE seq>? ORDER BY seq LIMIT ?''', (hwm, batch))
+                    rows = c.fetchall()
+                    if rows:
+                        _apply_outbox(c, [(k, json.loads(pj)) for _, k, pj in rows])
+                        hwm = rows[-1][0]
+                        c.execute('''UPDATE shard_outbox_mark SET applied_seq=?,
+                                     drained_at=strftime('%Y-%m-%dT%H:%M:%SZ','now') WHERE shard=?''', (hwm, i))
+                    conn.commit()
+                finally:
+                    conn.close()
+            if hwm:
+                with shard_scope(i):
+                    sconn = _open_conn(shard_path(i))
+                    try:
+                        sconn.execute('DELETE FROM catalog_outbox WHERE seq<=?', (hwm,))
+                        sconn.commit()
+                    finally:
+                        sconn.close()
+            applied += len(rows)
+            if len(rows) < batch:
+                break
+    return applied
+
+
 def init_db():
-    conn = get_conn()
+    """v16: with SHARD_COUNT set, also creates/migrates the shard files (see _init_shards)."""
+    conn = _open_conn(DB_PATH)
     try:
         c = conn.cursor()
+        c.execute("SELECT EXISTS(SELECT 1 FROM sqlite_master)")
+        if not c.fetchone()[0]:
+            # v16: fresh file → incremental auto-vacuum, so event retention can release pages in steps
+            c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            c.execute("VACUUM")
+        if SHARD_COUNT:
+            _init_shards(c)
         _create_tables(c)
         _seed_issues(c)
         _migrate(c)
@@ -699,7 +1279,8 @@ def _create_tables(c):
     c.execute('''CREATE TABLE IF NOT EXISTS export_job (
         export_id INTEGER PRIMARY KEY AUTOINCREMENT,
         job_id INTEGER REFERENCES crawl_job(job_id),
-        export_type TEXT NOT NULL CHECK(export_type IN ('CSV','JSON','HTML','PDF','PAIR_REPORT')),
+        export_type TEXT NOT NULL CHECK(export_type IN ('CSV','JSON','HTML','PDF','PAIR_REPORT',
+                                                       'PARQUET','ARROW')),
         output_path TEXT NOT NULL,
         row_count INTEGER NOT NULL DEFAULT 0,
         artifact_sha256 TEXT,
@@ -1088,7 +1669,9 @@ def _create_tables(c):
         meta_json TEXT DEFAULT '{}',
         UNIQUE(from_kind, from_id, to_kind, to_id, edge_type))''')
     c.execute('CREATE INDEX IF NOT EXISTS idx_le_from ON lineage_edge(from_kind, from_id)')
-    c.execute('CREATE INDEX IF NOT EXISTS idx_le_to ON lineage_edge(to_kind, to_id)')
+    # v16: covering index for upstream recursive traversal (downstream uses the UNIQUE prefix);
+    # it replaces idx_le_to(to_kind, to_id), dropped in _migrate
+    c.execute('CREATE INDEX IF NOT EXISTS idx_le_to_from ON lineage_edge(to_kind, to_id, from_kind, from_id)')
     c.execute('CREATE INDEX IF NOT EXISTS idx_le_edge ON lineage_edge(edge_type)')
     c.execute('CREATE INDEX IF NOT EXISTS idx_le_job ON lineage_edge(job_id)')
 
@@ -1183,14 +1766,14 @@ def _create_tables(c):
         scope_id INTEGER,
         rule_set_id INTEGER,
         metric_key TEXT NOT NULL,
-        window_days INTEGER NOT NULL DEFAULT 14,
+        window_samples INTEGER NOT NULL DEFAULT 28,
         mean REAL NOT NULL DEFAULT 0,
         stddev REAL NOT NULL DEFAULT 0,
         p50 REAL NOT NULL DEFAULT 0,
         p75 REAL NOT NULL DEFAULT 0,
         p90 REAL NOT NULL DEFAULT 0,
         created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
-        UNIQUE(as_of_date, scope, scope_id, rule_set_id, metric_key, window_days))''')
+        UNIQUE(as_of_date, scope, scope_id, rule_set_id, metric_key, window_samples))''')
     c.execute('CREATE INDEX IF NOT EXISTS idx_kbd_date ON kpi_baseline_daily(as_of_date)')
     c.execute('CREATE INDEX IF NOT EXISTS idx_kbd_scope ON kpi_baseline_daily(scope)')
     c.execute('CREATE INDEX IF NOT EXISTS idx_kbd_sid ON kpi_baseline_daily(scope_id)')
@@ -1244,6 +1827,223 @@ def _create_tables(c):
     c.execute('CREATE INDEX IF NOT EXISTS idx_dhd_date ON domain_health_daily(as_of_date)')
     c.execute('CREATE INDEX IF NOT EXISTS idx_dhd_fsr ON domain_health_daily(fetch_success_rate)')
 
+    # ═══════════════════════════════════════════════════════════════════
+    # v16 new tables
+    # ═══════════════════════════════════════════════════════════════════
+
+    # ── robots_cache: per-domain robots.txt rules with TTL + validators ──
+    c.execute('''CREATE TABLE IF NOT EXISTS robots_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        domain_id INTEGER NOT NULL UNIQUE REFERENCES domain(domain_id),
+        robots_url TEXT,
+        http_status INTEGER,
+        etag TEXT,
+        last_modified TEXT,
+        sha256 TEXT,
+        rules_json TEXT NOT NULL DEFAULT '[]',
+        crawl_delay_ms INTEGER,
+        fetched_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
+        expires_at TEXT)''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_rbc_expires ON robots_cache(expires_at)')
+
+    # ── sitemap_ingest: per-sitemap-file ingest run stats ──
+    c.execute('''CREATE TABLE IF NOT EXISTS sitemap_ingest (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        domain_id INTEGER REFERENCES domain(domain_id),
+        job_id INTEGER REFERENCES crawl_job(job_id),
+        sitemap_url TEXT NOT NULL,
+        parent_url TEXT,
+        kind TEXT NOT NULL DEFAULT 'URLSET' CHECK(kind IN ('URLSET','INDEX')),
+        http_status INTEGER,
+        etag TEXT,
+        last_modified TEXT,
+        lastmod TEXT,
+        sha256 TEXT,
+        bytes INTEGER NOT NULL DEFAULT 0,
+        is_gzip INTEGER NOT NULL DEFAULT 0,
+        urls_seen INTEGER NOT NULL DEFAULT 0,
+        urls_new INTEGER NOT NULL DEFAULT 0,
+        urls_changed INTEGER NOT NULL DEFAULT 0,
+        urls_unchanged INTEGER NOT NULL DEFAULT 0,
+        urls_enqueued INTEGER NOT NULL DEFAULT 0,
+        children INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'DONE' CHECK(status IN ('DONE','NOT_MODIFIED','SKIPPED','FAILED')),
+        error TEXT,
+        ingested_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_smi_url ON sitemap_ingest(sitemap_url)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_smi_did ON sitemap_ingest(domain_id)')
+
+    # ── sitemap_url_state: last seen lastmod per URL (ingest diff base) ──
+    c.execute('''CREATE TABLE IF NOT EXISTS sitemap_url_state (
+        url_norm TEXT PRIMARY KEY,
+        domain_id INTEGER REFERENCES domain(domain_id),
+        sitemap_url TEXT,
+        lastmod TEXT,
+        first_seen_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
+        last_seen_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_sus_did ON sitemap_url_state(domain_id)')
+
+    # ── redaction_hit: per-rule hit counts per export (compiled redaction engine) ──
+    c.execute('''CREATE TABLE IF NOT EXISTS redaction_hit (
+        hit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        export_id INTEGER REFERENCES export_job(export_id),
+        rid INTEGER NOT NULL REFERENCES redaction_rule(rid),
+        scope TEXT NOT NULL,
+        cells_matched INTEGER NOT NULL DEFAULT 0,
+        matches INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_rh_rid ON redaction_hit(rid)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_rh_export ON redaction_hit(export_id)')
+
+    # ── cost_running_total: O(1) budget/tier lookups (0 / '*' = rolled up over that key) ──
+    c.execute('''CREATE TABLE IF NOT EXISTS cost_running_total (
+        job_id INTEGER NOT NULL DEFAULT 0,
+        domain_id INTEGER NOT NULL DEFAULT 0,
+        stage TEXT NOT NULL DEFAULT '*',
+        entries INTEGER NOT NULL DEFAULT 0,
+        cost_total REAL NOT NULL DEFAULT 0,
+        cost_min REAL,
+        cost_max REAL,
+        updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
+        PRIMARY KEY (job_id, domain_id, stage))''')
+
+    # ── kpi_stream_stat: streaming KPI estimators per metric x scope (scope_id 0 = GLOBAL) ──
+    c.execute('''CREATE TABLE IF NOT EXISTS kpi_stream_stat (
+        metric_key TEXT NOT NULL,
+        scope TEXT NOT NULL CHECK(scope IN ('DOMAIN','SEGMENT','PAIR','GLOBAL')),
+        scope_id INTEGER NOT NULL DEFAULT 0,
+        n INTEGER NOT NULL DEFAULT 0,
+        mean REAL NOT NULL DEFAULT 0,
+        var REAL NOT NULL DEFAULT 0,
+        ewma REAL,
+        quantiles_json TEXT NOT NULL DEFAULT '{}',
+        last_value REAL,
+        last_as_of TEXT,
+        prior_json TEXT,
+        updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
+        PRIMARY KEY (metric_key, scope, scope_id))''')
+
+    # ── sample_stratum: per-stratum population + quota of a reservoir sample set ──
+    c.execute('''CREATE TABLE IF NOT EXISTS sample_stratum (
+        ssid INTEGER NOT NULL REFERENCES snapshot_sample_set(ssid),
+        stratum INTEGER NOT NULL,
+        population INTEGER NOT NULL DEFAULT 0,
+        quota INTEGER NOT NULL DEFAULT 0,
+        pop_sig TEXT,
+        updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
+        PRIMARY KEY (ssid, stratum))''')
+
+    # ── data_version: monotonic write counter driving query cache invalidation ──
+    c.execute('''CREATE TABLE IF NOT EXISTS data_version (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+    # every write to segment (any writer) bumps data_version 'SEGMENT' → _segment_matcher recompiles
+    for op in ("INSERT", "UPDATE", "DELETE"):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS segment_version_{op.lower()} AFTER {op} ON segment
+            BEGIN
+                INSERT INTO data_version (name,version) VALUES ('SEGMENT',1)
+                ON CONFLICT(name) DO UPDATE SET version=version+1,
+                  updated_at=strftime('%Y-%m-%dT%H:%M:%SZ','now');
+            END''')
+    # catalog tables read by cached dashboards but written outside the save path bump 'GLOBAL'
+    for table in DATA_VERSION_TRIGGER_TABLES:
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_version_{op.lower()} AFTER {op} ON {table}
+                BEGIN
+                    INSERT INTO data_version (name,version) VALUES ('GLOBAL',1)
+                    ON CONFLICT(name) DO UPDATE SET version=version+1,
+                      updated_at=strftime('%Y-%m-%dT%H:%M:%SZ','now');
+                END''')
+
+    # ── query_result_cache: precomputed dashboard results (valid for one data_version) ──
+    c.execute('''CREATE TABLE IF NOT EXISTS query_result_cache (
+        cache_key TEXT PRIMARY KEY,
+        query_name TEXT NOT NULL,
+        data_version INTEGER NOT NULL,
+        result_json TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        computed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+
+    # ── pair_report_state: last batch report per comparison_pair (incremental regeneration) ──
+    c.execute('''CREATE TABLE IF NOT EXISTS pair_report_state (
+        pid INTEGER PRIMARY KEY REFERENCES comparison_pair(pid),
+        pair_sig TEXT NOT NULL,
+        report_json TEXT NOT NULL,
+        report_sha256 TEXT NOT NULL,
+        rep_sig TEXT,
+        updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+
+    # ── event_archive_segment: catalogue of archived event_log segment files ──
+    c.execute('''CREATE TABLE IF NOT EXISTS event_archive_segment (
+        seg_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rel_path TEXT NOT NULL UNIQUE,
+        day TEXT NOT NULL,
+        min_eid INTEGER NOT NULL, max_eid INTEGER NOT NULL,
+        min_ts TEXT NOT NULL, max_ts TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        bytes INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_eas_ts ON event_archive_segment(min_ts, max_ts)')
+
+    # ── event_retention_run: one row per retention pass ──
+    c.execute('''CREATE TABLE IF NOT EXISTS event_retention_run (
+        run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        archived INTEGER NOT NULL DEFAULT 0,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        segments INTEGER NOT NULL DEFAULT 0,
+        archive_bytes INTEGER NOT NULL DEFAULT 0,
+        vacuumed INTEGER NOT NULL DEFAULT 0,
+        duration_ms INTEGER,
+        run_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+
+    # ── job_gate_profile: per-job save_analysis gate latency histograms ──
+    c.execute('''CREATE TABLE IF NOT EXISTS job_gate_profile (
+        job_id INTEGER NOT NULL,
+        gate TEXT NOT NULL,
+        calls INTEGER NOT NULL DEFAULT 0,
+        total_ms REAL NOT NULL DEFAULT 0,
+        max_ms REAL NOT NULL DEFAULT 0,
+        sql_statements INTEGER NOT NULL DEFAULT 0,
+        hist_json TEXT NOT NULL,
+        updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
+        PRIMARY KEY (job_id, gate))''')
+
+    # ── shard_outbox_mark: per-shard high-water seq of catalog_outbox rows applied (sharded mode) ──
+    c.execute('''CREATE TABLE IF NOT EXISTS shard_outbox_mark (
+        shard INTEGER PRIMARY KEY,
+        applied_seq INTEGER NOT NULL DEFAULT 0,
+        drained_at TEXT)''')
+
+    # ── event_rollup: per (domain, stage, code, level) counts of events pruned by retention ──
+    c.execute('''CREATE TABLE IF NOT EXISTS event_rollup (
+        domain_id INTEGER NOT NULL DEFAULT 0,
+        stage TEXT NOT NULL,
+        code TEXT NOT NULL,
+        level TEXT NOT NULL,
+        n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (domain_id, stage, code, level))''')
+
+    # ── crawl_worker: fleet worker registry (heartbeat + per-worker metrics) ──
+    c.execute('''CREATE TABLE IF NOT EXISTS crawl_worker (
+        worker_id TEXT PRIMARY KEY,
+        job_id INTEGER REFERENCES crawl_job(job_id),
+        pid INTEGER,
+        host TEXT,
+        status TEXT NOT NULL DEFAULT 'RUNNING' CHECK(status IN ('RUNNING','STOPPED','LOST')),
+        claimed INTEGER NOT NULL DEFAULT 0,
+        reclaimed INTEGER NOT NULL DEFAULT 0,
+        metrics_json TEXT NOT NULL DEFAULT '{}',
+        started_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
+        heartbeat_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_cw_job ON crawl_worker(job_id)')
+
+    # ── schema_migration: one-shot data migrations already applied (run once, not per init) ──
+    c.execute('''CREATE TABLE IF NOT EXISTS schema_migration (
+        name TEXT PRIMARY KEY,
+        applied_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')))''')
+
 
 def _seed_issues(c):
     for code, severity, family, penalty, message in ISSUE_TAXONOMY:
@@ -1393,25 +2193,85 @@ def get_export_view(c, view_name):
     return None
 
 
-def apply_redaction(text_value, scope="EXPORT"):
-    """Apply enabled redaction rules to a text value. Returns sanitized text."""
-    conn = get_conn()
-    try:
-        c = conn.cursor()
-        c.execute('SELECT pattern,action FROM redaction_rule WHERE is_enabled=1 AND scope=?', (scope,))
-        rules = c.fetchall()
-        result = text_value
-        if result is None:
-            return None
-        for pattern, action in rules:
+_REDACTION_BACKREF = re.compile(r'\\[1-9]|\(\?P=')
+
+
+class _RedactionEngine:
+    """
+    Enabled redaction rules for one scope, compiled once (rid order).
+    A combined alternation of all patterns is the fast path: a cell it does
+    not match cannot be touched by any rule, so it is returned as-is. Cells
+    that pass go through the rules sequentially, exactly as before.
+    hits = {rid: [cells_matched, matches]}.
+    """
+
+    def __init__(self, rules):
+        self.rules = []
+        for rid, pattern, action in rules:
+            try:
+                self.rules.append((rid, re.compile(pattern), action))
+            except re.error as e:
+                # never export with a rule silently missing
+                raise ValueError(f"redaction rule {rid}: invalid pattern {pattern!r} ({e})") from e
+        self.hits = {rid: [0, 0] for rid, _, _ in self.rules}
+        self.prefilter = None
+        if self.rules and not any(_REDACTION_BACKREF.search(rx.pattern) for _, rx, _ in self.rules):
+            try:
+                self.prefilter = re.compile("|".join(f"(?:{rx.pattern})" for _, rx, _ in self.rules))
+            except re.error:
+                self.prefilter = None  # e.g. inline global flags — fall back to per-rule path
+
+    @staticmethod
+    def _hash_match(m):
+        return hashlib.sha256(m.group().encode()).hexdigest()[:16]
+
+    def apply(self, value):
+        if value is None or not self.rules:
+            return value
+        result = str(value)
+        if self.prefilter is not None and not self.prefilter.search(result):
+            return value
+        for rid, rx, action in self.rules:
             if action == "MASK":
-                result = re.sub(pattern, "***REDACTED***", str(result))
+                result, n = rx.subn("***REDACTED***", result)
             elif action == "DROP":
-                if re.search(pattern, str(result)):
+                if rx.search(result):
+                    self.hits[rid][0] += 1; self.hits[rid][1] += 1
                     return None
+                n = 0
             elif action == "HASH":
-                result = re.sub(pattern, lambda m: hashlib.sha256(m.group().encode()).hexdigest()[:16], str(result))
+                result, n = rx.subn(self._hash_match, result)
+            else:
+                n = 0
+            if n:
+                self.hits[rid][0] += 1; self.hits[rid][1] += n
         return result
+
+
+def load_redaction_engine(c, scope="EXPORT"):
+    """
+    Load + compile enabled redaction rules for a scope (once per export).
+    An invalid pattern logs REDACTION_RULE_INVALID (ERROR) and raises ValueError.
+    """
+    c.execute('SELECT rid,pattern,action FROM redaction_rule WHERE is_enabled=1 AND scope=? ORDER BY rid',
+              (scope,))
+    try:
+        return _RedactionEngine(c.fetchall())
+    except ValueError as e:
+        conn = get_conn()  # c may be a read-only replica cursor
+        try:
+            _log(conn.cursor(), "EXPORT", "ERROR", "REDACTION_RULE_INVALID", str(e))
+            conn.commit()
+        finally:
+            conn.close()
+        raise
+
+
+def apply_redaction(text_value, scope="EXPORT"):
+    """Apply enabled redaction rules to a text value. Returns sanitized text."""
+    conn = get_conn()
+    try:
+        return load_redaction_engine(conn.cursor(), scope).apply(text_value)
     finally:
         conn.close()
 
@@ -1511,17 +2371,206 @@ def bind_budget(c, job_id, bid=None):
     return bid
 
 
+# ── v16 bulk writers: per-connection buffers for append-only lineage_edge / cost_ledger ──
+_BULK_WRITERS = {}  # id(conn) -> {"lineage": [...], "cost": [...]}
+
+_LINEAGE_INSERT = '''INSERT OR IGNORE INTO lineage_edge
+    (from_kind,from_id,to_kind,to_id,edge_type,job_id,meta_json)
+    VALUES (?,?,?,?,?,?,?)'''
+_COST_INSERT = '''INSERT INTO cost_ledger (job_id,domain_id,page_id,snap_id,stage,units,unit_type,unit_cost,currency,cost_total,meta_json)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?)'''
+
+
+def begin_bulk_writes(conn):
+    """Buffer lineage_edge / cost_ledger inserts on this connection until flush_bulk_writes()."""
+    _BULK_WRITERS[id(conn)] = {"lineage": [], "cost": []}
+
+
+def end_bulk_writes(conn):
+    """Drop this connection's buffer (unflushed rows are discarded with the rolled-back txn)."""
+    _BULK_WRITERS.pop(id(conn), None)
+
+
+def _bulk_buffer(c):
+    return _BULK_WRITERS.get(id(c.connection)) if _BULK_WRITERS else None
+
+
+def flush_bulk_writes(c):
+    """
+    BULK_FLUSH_GATE: executemany buffered rows inside the caller's open transaction,
+    so they commit (or roll back) together with the snapshot that produced them.
+    """
+    buf = _bulk_buffer(c)
+    if not buf:
+        return 0
+    n = len(buf["lineage"]) + len(buf["cost"])
+    if _catalog_deferred():  # v16: routed save → rows go to the shard's catalog outbox
+        for kind, key in (("LINEAGE", "lineage"), ("COST", "cost")):
+            if buf[key]:
+                _outbox(c, kind, buf[key])
+                buf[key] = []
+        return n
+    if buf["lineage"]:
+        c.executemany(_LINEAGE_INSERT, buf["lineage"])
+        buf["lineage"] = []
+    if buf["cost"]:
+        c.executemany(_COST_INSERT, buf["cost"])
+        _apply_cost_rollup(c, buf["cost"])
+        buf["cost"] = []
+    return n
+
+
+def _pending_costs(c, job_id=None, domain_id=None):
+    """
+    Buffered (not yet flushed) cost rows matching job/domain — row tuples in _COST_INSERT order.
+    v16: inside a shard_scope() also the shard's undrained outbox cost rows.
+    """
+    buf = _bulk_buffer(c)
+    rows = list(buf["cost"]) if buf else []
+    if _catalog_deferred():
+        rows += _outbox_costs(c)
+    return [r for r in rows
+            if (job_id is None or r[0] == job_id) and (domain_id is None or r[1] == domain_id)]
+
+
+def _cost_rollup_keys(job_id, domain_id, stage):
+    """cost_running_total keys touched by one ledger row."""
+    keys = []
+    if job_id:
+        keys += [(job_id, 0, '*'), (job_id, 0, stage)]
+        if domain_id:
+            keys.append((job_id, domain_id, '*'))
+    if domain_id:
+        keys += [(0, domain_id, '*'), (0, domain_id, stage)]
+    return keys
+
+
+def _write_cost_rollups(c, agg, replace=False):
+    """Upsert {key: [entries, total, min, max]} into cost_running_total (add, or overwrite if replace)."""
+    if not agg:
+        return
+    rows = [(k[0], k[1], k[2], v[0], v[1], v[2], v[3]) for k, v in agg.items()]
+    if replace:
+        c.executemany('''INSERT OR REPLACE INTO cost_running_total
+                         (job_id,domain_id,stage,entries,cost_total,cost_min,cost_max) VALUES (?,?,?,?,?,?,?)''', rows)
+        return
+    c.executemany('''INSERT INTO cost_running_total (job_id,domain_id,stage,entries,cost_total,cost_min,cost_max)
+                     VALUES (?,?,?,?,?,?,?)
+                     ON CONFLICT(job_id,domain_id,stage) DO UPDATE SET
+                       entries=entries+excluded.entries,
+                       cost_total=cost_total+excluded.cost_total,
+                       cost_min=MIN(COALESCE(cost_min,excluded.cost_min),excluded.cost_min),
+                       cost_max=MAX(COALESCE(cost_max,excluded.cost_max),excluded.cost_max),
+                       updated_at=strftime('%Y-%m-%dT%H:%M:%SZ','now')''', rows)
+
+
+def _apply_cost_rollup(c, cost_rows):
+    """COST_ROLLUP_GATE (v16): fold ledger rows (in _COST_INSERT order) into running totals."""
+    agg = {}
+    for r in cost_rows:
+        for key in _cost_rollup_keys(r[0], r[1], r[4]):
+            a = agg.get(key)
+            if a is None:
+                agg[key] = [1, r[9], r[9], r[9]]
+            else:
+                a[0] += 1; a[1] += r[9]
+                a[2] = min(a[2], r[9]); a[3] = max(a[3], r[9])
+    _write_cost_rollups(c, agg)
+
+
+def _ledger_cost_rollups(c, job_id=None):
+    """Recompute running-total keys straight from cost_ledger (only job-scoped keys if job_id)."""
+    agg = {}
+    jw = "job_id=?" if job_id else "job_id IS NOT NULL AND job_id<>0"
+    queries = [
+        ("SELECT job_id, 0, '*'", f"WHERE {jw} GROUP BY job_id"),
+        ("SELECT job_id, 0, stage", f"WHERE {jw} GROUP BY job_id, stage"),
+        ("SELECT job_id, domain_id, '*'",
+         f"WHERE {jw} AND domain_id IS NOT NULL AND domain_id<>0 GROUP BY job_id, domain_id"),
+    ]
+    if not job_id:
+        queries += [
+            ("SELECT 0, domain_id, '*'", "WHERE domain_id IS NOT NULL AND domain_id<>0 GROUP BY domain_id"),
+            ("SELECT 0, domain_id, stage", "WHERE domain_id IS NOT NULL AND domain_id<>0 GROUP BY domain_id, stage"),
+        ]
+    for head, tail in queries:
+        c.execute(f"{head}, COUNT(*), SUM(cost_total), MIN(cost_total), MAX(cost_total) FROM cost_ledger {tail}",
+                  (job_id,) if job_id else ())
+        for r in c.fetchall():
+            agg[(r[0], r[1], r[2])] = [r[3], r[4], r[5], r[6]]
+    return agg
+
+
+def _cost_running_total(c, job_id=0, domain_id=0, stage='*'):
+    """Point lookup: (entries, cost_total, cost_min, cost_max) for one rollup key."""
+    c.execute('''SELECT entries,cost_total,cost_min,cost_max FROM cost_running_total
+                 WHERE job_id=? AND domain_id=? AND stage=?''', (job_id or 0, domain_id or 0, stage))
+    r = c.fetchone()
+    return r if r else (0, 0.0, None, None)
+
+
+def reconcile_cost_totals(job_id=None, fix=True):
+    """
+    COST_RECONCILE_GATE (v16): verify cost_running_total against cost_ledger
+    (all keys, or only one job's keys). Drifted / missing / orphan keys are
+    logged (COST_TOTALS_DRIFT) and rewritten when fix=True.
+    Returns {"keys_checked", "mismatched", "fixed"}.
+    """
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        truth = _ledger_cost_rollups(c, job_id=job_id)
+        if job_id:
+            c.execute('''SELECT job_id,domain_id,stage,entries,cost_total,cost_min,cost_max
+                         FROM cost_running_total WHERE job_id=?''', (job_id,))
+        else:
+            c.execute('SELECT job_id,domain_id,stage,entries,cost_total,cost_min,cost_max FROM cost_running_total')
+        stored = {(r[0], r[1], r[2]): list(r[3:]) for r in c.fetchall()}
+
+        def _same(a, b):
+            if a[0] != b[0]:
+                return False
+            return all((x is None and y is None) or
+                       (x is not None and y is not None and abs(x - y) <= COST_RECONCILE_TOLERANCE)
+                       for x, y in zip(a[1:], b[1:]))
+
+        bad = [k for k in set(truth) | set(stored)
+               if k not in truth or k not in stored or not _same(truth[k], stored[k])]
+        for k in sorted(bad, key=str)[:20]:
+            _log(c, "BUDGET", "WARN", "COST_TOTALS_DRIFT",
+                 f"key={k} ledger={truth.get(k)} running={stored.get(k)}", job_id=job_id)
+        if bad and fix:
+            c.executemany('''DELETE FROM cost_running_total WHERE job_id=? AND domain_id=? AND stage=?''',
+                          [k for k in bad if k not in truth])
+            _write_cost_rollups(c, {k: truth[k] for k in bad if k in truth}, replace=True)
+        _log(c, "BUDGET", "INFO", "COST_TOTALS_RECONCILED",
+             f"keys={len(truth)} mismatched={len(bad)} fixed={bool(bad and fix)}", job_id=job_id)
+        conn.commit()
+        return {"keys_checked": len(set(truth) | set(stored)), "mismatched": len(bad),
+                "fixed": len(bad) if fix else 0}
+    finally:
+        conn.close()
+
+
 def record_cost(c, job_id, stage, units, domain_id=None, page_id=None, snap_id=None, meta=None):
-    """COST_ACCOUNTING_GATE: record a cost entry in cost_ledger."""
+    """COST_ACCOUNTING_GATE: record a cost entry in cost_ledger (buffered under begin_bulk_writes)."""
     cm = COST_MODEL_DEFAULTS.get(stage, {"unit_type": "REQ", "unit_cost": 0.0, "currency": "USD"})
     unit_type = cm["unit_type"]
     unit_cost = cm["unit_cost"]
     currency = cm["currency"]
     cost_total = round(units * unit_cost, 8)
-    c.execute('''INSERT INTO cost_ledger (job_id,domain_id,page_id,snap_id,stage,units,unit_type,unit_cost,currency,cost_total,meta_json)
-                 VALUES (?,?,?,?,?,?,?,?,?,?,?)''',
-              (job_id, domain_id, page_id, snap_id, stage, units, unit_type, unit_cost, currency, cost_total,
-               json.dumps(meta or {}, ensure_ascii=False)))
+    row = (job_id, domain_id, page_id, snap_id, stage, units, unit_type, unit_cost, currency, cost_total,
+           json.dumps(meta or {}, ensure_ascii=False))
+    buf = _bulk_buffer(c)
+    if buf is not None:
+        buf["cost"].append(row)
+        if len(buf["cost"]) + len(buf["lineage"]) >= BULK_WRITE_FLUSH_ROWS:
+            flush_bulk_writes(c)
+    elif _catalog_deferred():
+        _outbox(c, "COST", [row])
+    else:
+        c.execute(_COST_INSERT, row)
+        _apply_cost_rollup(c, [row])
     return cost_total
 
 
@@ -1546,9 +2595,8 @@ def evaluate_budget(c, job_id):
     actions = json.loads(actions_json)
     soft_threshold = actions.get("soft_stop_threshold", 0.8)
 
-    # Compute total spend for this job
-    c.execute('SELECT COALESCE(SUM(cost_total),0) FROM cost_ledger WHERE job_id=?', (job_id,))
-    spent = c.fetchone()[0]
+    # Compute total spend for this job (v16: running total + buffered rows, O(1))
+    spent = _cost_running_total(c, job_id=job_id)[1] + sum(r[9] for r in _pending_costs(c, job_id=job_id))
 
     # Determine status
     now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -1559,9 +2607,12 @@ def evaluate_budget(c, job_id):
     else:
         status = "OK"
 
-    # Update crawl_job
-    c.execute('UPDATE crawl_job SET budget_status=?,budget_spent=?,budget_last_calc_at=? WHERE job_id=?',
-              (status, spent, now, job_id))
+    # Update crawl_job (v16: routed saves leave that to the outbox drain)
+    if _catalog_deferred():
+        _outbox(c, "BUDGET", job_id)
+    else:
+        c.execute('UPDATE crawl_job SET budget_status=?,budget_spent=?,budget_last_calc_at=? WHERE job_id=?',
+                  (status, spent, now, job_id))
 
     return status, spent, limit_total
 
@@ -1576,9 +2627,8 @@ def evaluate_domain_budget(c, job_id, domain_id):
     pol = c.fetchone()
     if not pol or not pol[0]:
         return True
-    c.execute('SELECT COALESCE(SUM(cost_total),0) FROM cost_ledger WHERE job_id=? AND domain_id=?',
-              (job_id, domain_id))
-    spent = c.fetchone()[0]
+    spent = (_cost_running_total(c, job_id=job_id, domain_id=domain_id)[1]
+             + sum(r[9] for r in _pending_costs(c, job_id=job_id, domain_id=domain_id)))
     return spent < pol[0]
 
 
@@ -1586,19 +2636,30 @@ def compute_domain_cost_tier(c, domain_id):
     """
     DOMAIN_COST_TIER_GATE: classify domain into cost tier A/B/C based on ledger history.
     Requires >= COST_TIER_MIN_ENTRIES entries.
+    v16: inside a shard_scope() the classification is queued for the outbox drain.
     """
-    c.execute('SELECT COUNT(*) FROM cost_ledger WHERE domain_id=?', (domain_id,))
-    cnt = c.fetchone()[0]
+    if _catalog_deferred():
+        _outbox(c, "COST_TIER", domain_id)
+        return None
+    pending = _pending_costs(c, domain_id=domain_id)
+    cnt = _cost_running_total(c, domain_id=domain_id)[0] + len(pending)
     if cnt < COST_TIER_MIN_ENTRIES:
         return None  # not enough data
 
-    # Compute avg cost per snapshot + volatility (stddev proxy)
-    c.execute('''SELECT AVG(cost_total), MAX(cost_total), MIN(cost_total)
-                 FROM cost_ledger WHERE domain_id=? AND stage IN ('FETCH','PARSE','AUDIT')''',
-              (domain_id,))
-    avg_cost, max_cost, min_cost = c.fetchone()
-    if avg_cost is None:
+    # Compute avg cost per snapshot + volatility (stddev proxy) — v16: from per-stage running totals
+    n_cost, sum_cost, mins, maxs = 0, 0.0, [], []
+    for stage in COST_TIER_STAGES:
+        e, t, lo, hi = _cost_running_total(c, domain_id=domain_id, stage=stage)
+        n_cost += e; sum_cost += t
+        if lo is not None: mins.append(lo)
+        if hi is not None: maxs.append(hi)
+    extra = [r[9] for r in pending if r[4] in COST_TIER_STAGES]
+    n_cost += len(extra); sum_cost += sum(extra)
+    mins += extra; maxs += extra
+    if not n_cost:
         return None
+    avg_cost = sum_cost / n_cost
+    max_cost, min_cost = max(maxs), min(mins)
 
     spread = (max_cost - min_cost) if (max_cost and min_cost) else 0
     # Tier A: expensive or high volatility; B: normal; C: cheap
@@ -1790,6 +2851,146 @@ def _migrate(c):
     if 'network_stage' not in elcols:
         c.execute('ALTER TABLE event_log ADD COLUMN network_stage TEXT')
 
+    # v16 migration: replay-derived snapshots (offline re-analysis)
+    c.execute("PRAGMA table_info(page_snapshot)")
+    if 'derived_from_snap_id' not in {r[1] for r in c.fetchall()}:
+        c.execute('ALTER TABLE page_snapshot ADD COLUMN derived_from_snap_id INTEGER')
+    c.execute("PRAGMA table_info(crawl_job)")
+    if 'is_replay_derived' not in {r[1] for r in c.fetchall()}:
+        c.execute('ALTER TABLE crawl_job ADD COLUMN is_replay_derived INTEGER NOT NULL DEFAULT 0')
+
+    # v16 migration: persistent stratified reservoir for sample sets
+    c.execute("PRAGMA table_info(sample_member)")
+    smcols = {r[1] for r in c.fetchall()}
+    if 'stratum' not in smcols:
+        c.execute('ALTER TABLE sample_member ADD COLUMN stratum INTEGER')
+    if 'sample_key' not in smcols:
+        c.execute('ALTER TABLE sample_member ADD COLUMN sample_key REAL')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_sm_stratum ON sample_member(ssid, stratum)')
+    c.execute("PRAGMA table_info(snapshot_sample_set)")
+    if 'reservoir_hwm' not in {r[1] for r in c.fetchall()}:
+        c.execute('ALTER TABLE snapshot_sample_set ADD COLUMN reservoir_hwm INTEGER NOT NULL DEFAULT 0')
+
+    # v16 migration: per-shard id cursors (striped shard ids break a single global high-water mark)
+    c.execute("PRAGMA table_info(snapshot_sample_set)")
+    if 'reservoir_marks_json' not in {r[1] for r in c.fetchall()}:
+        c.execute('ALTER TABLE snapshot_sample_set ADD COLUMN reservoir_marks_json TEXT')
+
+    # v16 migration: pair reports keyed on representative-set signatures (NULL → regenerated once)
+    c.execute("PRAGMA table_info(pair_report_state)")
+    if 'rep_sig' not in {r[1] for r in c.fetchall()}:
+        c.execute('ALTER TABLE pair_report_state ADD COLUMN rep_sig TEXT')
+
+    # v16 migration: sample_stratum population fingerprint (NULL → stratum rescanned once)
+    c.execute("PRAGMA table_info(sample_stratum)")
+    if 'pop_sig' not in {r[1] for r in c.fetchall()}:
+        c.execute('ALTER TABLE sample_stratum ADD COLUMN pop_sig TEXT')
+
+    # v16 migration: backfill cost_running_total from the ledger (once — marker in schema_migration)
+    c.execute("SELECT 1 FROM schema_migration WHERE name='v16_cost_running_total'")
+    if not c.fetchone():
+        _write_cost_rollups(c, _ledger_cost_rollups(c), replace=True)
+        c.execute("INSERT INTO schema_migration (name) VALUES ('v16_cost_running_total')")
+
+    # v16 migration: seed streaming KPI estimators from stored KPI / data-quality history
+    # (prior_json = estimator state before the latest fold; replay to fill it for old streams)
+    c.execute("PRAGMA table_info(kpi_stream_stat)")
+    no_prior = 'prior_json' not in {r[1] for r in c.fetchall()}
+    if no_prior:
+        c.execute('ALTER TABLE kpi_stream_stat ADD COLUMN prior_json TEXT')
+    c.execute('SELECT EXISTS(SELECT 1 FROM kpi_stream_stat), EXISTS(SELECT 1 FROM kpi_value), '
+              'EXISTS(SELECT 1 FROM data_quality_daily)')
+    has_streams, has_kpi, has_dq = c.fetchone()
+    if (has_kpi or has_dq) and (no_prior or not has_streams):
+        _rebuild_kpi_streams(c)
+
+    # v16 migration: page_snapshot.intent_mask — indexable mirror of intent_flags_json
+    c.execute("PRAGMA table_info(page_snapshot)")
+    if 'intent_mask' not in {r[1] for r in c.fetchall()}:
+        c.execute('ALTER TABLE page_snapshot ADD COLUMN intent_mask INTEGER NOT NULL DEFAULT 0')
+        _backfill_intent_mask(c)
+
+    # v16 migration: fetch outcome per snapshot, so re-analysis replays what was stored
+    # (status_code NULL = older snapshot; final_url / redirect_chain_json NULL = same as url / none)
+    c.execute("PRAGMA table_info(page_snapshot)")
+    snap_cols = {r[1] for r in c.fetchall()}
+    for col, decl in (("status_code", "INTEGER"), ("final_url", "TEXT"), ("redirect_chain_json", "TEXT")):
+        if col not in snap_cols:
+            c.execute(f'ALTER TABLE page_snapshot ADD COLUMN {col} {decl}')
+
+    # v16 migration: baselines come from the streaming estimators, whose window counts samples
+    c.execute("PRAGMA table_info(kpi_baseline_daily)")
+    if 'window_days' in {r[1] for r in c.fetchall()}:
+        c.execute('ALTER TABLE kpi_baseline_daily RENAME COLUMN window_days TO window_samples')
+
+    # v16 migration: crawl_frontier leases (worker fleet)
+    c.execute("PRAGMA table_info(crawl_frontier)")
+    frcols = {r[1] for r in c.fetchall()}
+    if 'lease_owner' not in frcols:
+        c.execute('ALTER TABLE crawl_frontier ADD COLUMN lease_owner TEXT')
+    if 'lease_expires_at' not in frcols:
+        c.execute('ALTER TABLE crawl_frontier ADD COLUMN lease_expires_at TEXT')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_fr_lease ON crawl_frontier(status, lease_expires_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_fr_owner ON crawl_frontier(lease_owner)')
+
+    # v16 migration: queued rows added without a domain_id get their host's domain, so
+    # domain-exclusive leases cover them (frontier_add resolves it for new rows)
+    c.execute("SELECT fid,url FROM crawl_frontier WHERE domain_id IS NULL AND status IN ('PENDING','RUNNING')")
+    by_host = {}
+    for fid, url in c.fetchall():
+        host = (urlparse(url).hostname or "").lower()
+        if host:
+            by_host.setdefault(host, []).append(fid)
+    for host, fids in by_host.items():
+        did = ensure_domain(c, host)
+        for i in range(0, len(fids), 500):
+            part = fids[i:i + 500]
+            c.execute(f"UPDATE crawl_frontier SET domain_id=? WHERE fid IN ({','.join('?' * len(part))})",
+                      [did] + part)
+
+    # v16 migration: event_rollup — count events already pruned into archive segments
+    c.execute('SELECT EXISTS(SELECT 1 FROM event_rollup), EXISTS(SELECT 1 FROM event_archive_segment)')
+    has_rollup, has_segments = c.fetchone()
+    if has_segments and not has_rollup:
+        _rollup_archived_events(c)
+
+    # v16 migration: idx_le_to_from covers idx_le_to's (to_kind, to_id) prefix
+    c.execute('DROP INDEX IF EXISTS idx_le_to')
+
+    # v16 migration: crawl_frontier no longer bumps data_version (see DATA_VERSION_TRIGGER_TABLES)
+    for op in ("insert", "update", "delete"):
+        c.execute(f'DROP TRIGGER IF EXISTS crawl_frontier_version_{op}')
+
+    # v16 migration: columnar export types — widen export_job CHECK via table rebuild
+    c.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='export_job'")
+    r = c.fetchone()
+    if r and "'PARQUET'" not in r[0]:
+        _rebuild_export_job_check(c, r[0])
+
+
+def _backfill_intent_mask(c):
+    """Derive intent_mask from intent_flags_json for existing snapshots; returns rows updated."""
+    c.execute('''UPDATE page_snapshot SET intent_mask=(
+            SELECT COALESCE(SUM(b.value),0) FROM json_each(page_snapshot.intent_flags_json) je
+            JOIN json_each(?) b ON b.key=je.value)
+        WHERE intent_flags_json IS NOT NULL AND intent_flags_json NOT IN ('','[]')
+        AND json_valid(intent_flags_json)''', (json.dumps(INTENT_FLAG_BITS),))
+    return c.rowcount
+
+
+def _rebuild_export_job_check(c, table_sql):
+    """Recreate export_job with PARQUET/ARROW in the export_type CHECK, keeping all rows/columns."""
+    new_sql = table_sql.replace("'PAIR_REPORT')", "'PAIR_REPORT','PARQUET','ARROW')", 1)
+    new_sql = re.sub(r'^CREATE TABLE\s+"?export_job"?', 'CREATE TABLE export_job_v16', new_sql, count=1)
+    c.execute("SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name='export_job' AND sql IS NOT NULL")
+    index_sql = [r[0] for r in c.fetchall()]
+    c.execute(new_sql)
+    c.execute('INSERT INTO export_job_v16 SELECT * FROM export_job')
+    c.execute('DROP TABLE export_job')
+    c.execute('ALTER TABLE export_job_v16 RENAME TO export_job')
+    for sql in index_sql:
+        c.execute(sql)
+
 
 # ═══════════════════════════════════════════════════════════════════════
 # Scoring
@@ -1893,6 +3094,9 @@ def update_domain_sitemap(c, domain_id, sitemap_url, sitemap_sha256):
 # ═══════════════════════════════════════════════════════════════════════
 def upsert_site_hint(c, domain_id, appears_multilingual=None, has_sitemap=None,
                      sitemap_url=None, cms_fingerprint=None):
+    if _catalog_deferred():
+        _outbox(c, "SITE_HINT", [domain_id, appears_multilingual, has_sitemap, sitemap_url, cms_fingerprint])
+        return
     now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
     c.execute('SELECT domain_id FROM site_hint WHERE domain_id=?', (domain_id,))
     if c.fetchone():
@@ -1917,47 +3121,319 @@ def upsert_site_hint(c, domain_id, appears_multilingual=None, has_sitemap=None,
 # ═══════════════════════════════════════════════════════════════════════
 # Event log
 # ═══════════════════════════════════════════════════════════════════════
-def _log(c, stage, level, code, message, job_id=None, domain_id=None, page_id=None, snap_id=None, payload=None):
-    c.execute('''INSERT INTO event_log (job_id,domain_id,page_id,snap_id,stage,level,code,message,payload_json)
-                 VALUES (?,?,?,?,?,?,?,?,?)''',
-              (job_id, domain_id, page_id, snap_id, stage, level, code, message,
-               json.dumps(payload, ensure_ascii=False) if payload else None))
-
+_EVENT_INSERT_TS = '''INSERT INTO event_log
+    (ts,job_id,domain_id,page_id,snap_id,stage,level,code,message,payload_json,network_stage)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?)'''
 
-# ═══════════════════════════════════════════════════════════════════════
-# Artifact store
-# ═══════════════════════════════════════════════════════════════════════
-def _store_artifact(c, sha256, kind, raw_bytes, policy_store):
-    c.execute('SELECT artifact_id FROM artifact_store WHERE sha256=?', (sha256,))
-    r = c.fetchone()
-    if r:
-        return r[0]
-    blob = raw_bytes if policy_store else None
-    size = len(raw_bytes) if raw_bytes else 0
-    c.execute('INSERT INTO artifact_store (sha256,kind,bytes,size) VALUES (?,?,?,?)',
-              (sha256, kind, blob, size))
-    return c.lastrowid
 
-def _link_artifact(c, snap_id, artifact_id):
-    c.execute('INSERT OR IGNORE INTO snapshot_artifact (snap_id,artifact_id) VALUES (?,?)',
-              (snap_id, artifact_id))
+def _log(c, stage, level, code, message, job_id=None, domain_id=None, page_id=None, snap_id=None, payload=None,
+         network_stage=None):
+    if _catalog_deferred():  # v16: routed save → shard outbox, stamped with the event's own ts
+        _outbox(c, "EVENT", [datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'), job_id, domain_id,
+                             page_id, snap_id, stage, level, code, message,
+                             json.dumps(payload, ensure_ascii=False) if payload else None, network_stage])
+        return
+    c.execute('''INSERT INTO event_log (job_id,domain_id,page_id,snap_id,stage,level,code,message,payload_json,network_stage)
+                 VALUES (?,?,?,?,?,?,?,?,?,?)''',
+              (job_id, domain_id, page_id, snap_id, stage, level, code, message,
+               json.dumps(payload, ensure_ascii=False) if payload else None, network_stage))
 
 
 # ═══════════════════════════════════════════════════════════════════════
-# HTTP cache
+# v16 event_log retention: TTL per level → gzip JSONL archive segments → compaction
 # ═══════════════════════════════════════════════════════════════════════
-def get_http_hints(page_id):
+_EVENT_COLS = ('eid', 'job_id', 'domain_id', 'page_id', 'snap_id', 'stage', 'level', 'code',
+               'message', 'payload_json', 'ts', 'network_stage')
+
+
+def _event_archive_dir():
+    return EVENT_LOG_ARCHIVE_DIR or os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "event_archive")
+
+
+def _write_event_segment(c, rows):
+    """Write one append-only segment (rows of a single UTC day) and catalogue it. Returns bytes."""
+    import gzip
+    day = rows[0][10][:10]
+    rel = f"day={day}/events-{rows[0][0]}-{rows[-1][0]}.jsonl.gz"
+    path = os.path.join(_event_archive_dir(), rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as gz:
+            for r in rows:
+                gz.write((json.dumps(dict(zip(_EVENT_COLS, r)), ensure_ascii=False) + "\n").encode())
+        raw.flush()
+        os.fsync(raw.fileno())
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    c.execute('''INSERT INTO event_archive_segment (rel_path,day,min_eid,max_eid,min_ts,max_ts,
+                 row_count,bytes,sha256) VALUES (?,?,?,?,?,?,?,?,?)''',
+              (rel, day, rows[0][0], rows[-1][0], min(r[10] for r in rows), max(r[10] for r in rows),
+               len(rows), len(data), hashlib.sha256(data).hexdigest()))
+    return len(data)
+
+
+def run_event_log_retention(ttl_days=None, archive=None, compact=None, batch=EVENT_LOG_RETENTION_BATCH):
+    """
+    EVENT_RETENTION_GATE (v16): move event_log rows older than their level's TTL
+    (EVENT_LOG_TTL_DAYS, None = keep) into gzip JSONL segments under _event_archive_dir(),
+    partitioned by UTC day and catalogued in event_archive_segment, then delete them.
+    Events cited as ticket evidence (ticket_link kind=EVENT) are never pruned; pruned events
+    are counted in event_rollup so aggregate reports (query_304_ratio) keep their history.
+    Each batch commits its segments and deletes together, so a crash leaves at most an
+    uncatalogued orphan file, never a gap or a duplicate.
+    compact=None → PRAGMA incremental_vacuum (at most EVENT_LOG_VACUUM_STEP_PAGES) when freelist
+    pages exceed EVENT_LOG_VACUUM_FREE_RATIO; a no-op unless the file uses auto_vacuum=INCREMENTAL.
+    A full VACUUM only runs with compact=True (see compact_database()). The run is recorded
+    before compaction, so a busy database never loses it.
+    """
+    ttl_days = EVENT_LOG_TTL_DAYS if ttl_days is None else ttl_days
+    archive = EVENT_LOG_ARCHIVE if archive is None else archive
+    t0 = time.time()
+    now = datetime.datetime.utcnow()
+    cutoffs = {lvl: (now - datetime.timedelta(days=d)).strftime('%Y-%m-%dT%H:%M:%SZ')
+               for lvl, d in ttl_days.items() if d is not None}
+    stats = {"archived": 0, "deleted": 0, "segments": 0, "archive_bytes": 0, "vacuumed": False,
+             "released_pages": 0}
     conn = get_conn()
     try:
         c = conn.cursor()
-        c.execute('SELECT etag,last_modified FROM http_cache WHERE page_id=?', (page_id,))
-        r = c.fetchone()
-        return {"etag": r[0], "last_modified": r[1]} if r else {}
-    finally:
-        conn.close()
-
-def _upsert_http_cache(c, page_id, etag, last_modified):
-    now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+        if cutoffs:
+            # eid grows with ts: everything eligible sits below the first row at/after the latest
+            # cutoff, so the scan walks the primary key instead of needing an index on ts.
+            c.execute('SELECT eid FROM event_log WHERE ts>=? ORDER BY eid LIMIT 1', (max(cutoffs.values()),))
+            r = c.fetchone()
+            if r is None:
+                c.execute('SELECT COALESCE(MAX(eid),0)+1 FROM event_log')
+                r = c.fetchone()
+            upper = r[0]
+            level_sql = ' OR '.join('(el.level=? AND el.ts<?)' for _ in cutoffs)
+            level_args = [v for kv in cutoffs.items() for v in kv]
+            last = 0
+            while True:
+                c.execute(f'''SELECT {",".join("el." + col for col in _EVENT_COLS)} FROM event_log el
+                    WHERE el.eid>? AND el.eid<? AND ({level_sql})
+                      AND NOT EXISTS (SELECT 1 FROM ticket_link tl WHERE tl.kind='EVENT' AND tl.ref_id=el.eid)
+                    ORDER BY el.eid LIMIT ?''', [last, upper] + level_args + [batch])
+                rows = c.fetchall()
+                if not rows:
+                    break
+                last = rows[-1][0]
+                if archive:
+                    by_day = {}
+                    for r in rows:
+                        by_day.setdefault(r[10][:10], []).append(r)
+                    for day_rows in by_day.values():
+                        stats["archive_bytes"] += _write_event_segment(c, day_rows)
+                        stats["segments"] += 1
+                    stats["archived"] += len(rows)
+                _rollup_events(c, rows)
+                c.execute('DELETE FROM event_log WHERE eid IN (SELECT value FROM json_each(?))',
+                          (json.dumps([r[0] for r in rows]),))
+                stats["deleted"] += c.rowcount
+                conn.commit()
+
+        c.execute('PRAGMA freelist_count')
+        free = c.fetchone()[0]
+        c.execute('PRAGMA page_count')
+        pages = c.fetchone()[0] or 1
+        stats["free_ratio"] = round(free / pages, 4)
+        stats["duration_ms"] = int((time.time() - t0) * 1000)
+        c.execute('''INSERT INTO event_retention_run (archived,deleted,segments,archive_bytes,vacuumed,
+                     duration_ms) VALUES (?,?,?,?,?,?)''',
+                  (stats["archived"], stats["deleted"], stats["segments"], stats["archive_bytes"],
+                   0, stats["duration_ms"]))
+        run_id = c.lastrowid
+        conn.commit()
+
+        try:
+            if compact:
+                conn.execute('VACUUM')
+                stats["vacuumed"] = True
+            elif compact is None and free / pages > EVENT_LOG_VACUUM_FREE_RATIO:
+                c.execute('PRAGMA auto_vacuum')
+                if c.fetchone()[0] == 2:  # INCREMENTAL
+                    # executescript steps the pragma to completion (execute() frees a single page)
+                    conn.executescript(f'PRAGMA incremental_vacuum({int(EVENT_LOG_VACUUM_STEP_PAGES)});')
+                    c.execute('PRAGMA freelist_count')
+                    stats["released_pages"] = free - c.fetchone()[0]
+                    stats["vacuumed"] = stats["released_pages"] > 0
+        except sqlite3.OperationalError as e:
+            stats["vacuum_error"] = str(e)  # busy/locked: the pages are reclaimed by a later run
+        if stats["vacuumed"]:
+            c.execute('UPDATE event_retention_run SET vacuumed=1 WHERE run_id=?', (run_id,))
+            conn.commit()
+    finally:
+        conn.close()
+    if stats["vacuumed"]:
+        checkpoint_wal("TRUNCATE")  # VACUUM rewrites the whole file through the WAL
+    return stats
+
+
+def compact_database():
+    """
+    Maintenance command (never run by jobs): full VACUUM of the catalog, switching it to
+    auto_vacuum=INCREMENTAL so retention runs can then release free pages in bounded steps.
+    Needs the database to itself. Returns {"pages_before","pages_after","duration_ms"}.
+    """
+    t0 = time.time()
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        c.execute('PRAGMA page_count')
+        before = c.fetchone()[0]
+        c.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        c.execute('VACUUM')
+        c.execute('PRAGMA page_count')
+        after = c.fetchone()[0]
+    finally:
+        conn.close()
+    checkpoint_wal("TRUNCATE")
+    return {"pages_before": before, "pages_after": after, "duration_ms": int((time.time() - t0) * 1000)}
+
+
+def _rollup_events(c, rows):
+    """Add pruned event rows (_EVENT_COLS order) to event_rollup."""
+    counts = {}
+    for r in rows:
+        key = (r[2] or 0, r[5] or '', r[7] or '', r[6] or '')
+        counts[key] = counts.get(key, 0) + 1
+    c.executemany('''INSERT INTO event_rollup (domain_id,stage,code,level,n) VALUES (?,?,?,?,?)
+                     ON CONFLICT(domain_id,stage,code,level) DO UPDATE SET n=n+excluded.n''',
+                  [k + (n,) for k, n in counts.items()])
+
+
+def _rollup_archived_events(c):
+    """Rebuild event_rollup from the archive segments (events pruned before the rollup existed)."""
+    import gzip
+    c.execute('SELECT rel_path FROM event_archive_segment ORDER BY seg_id')
+    for (rel,) in c.fetchall():
+        try:
+            with gzip.open(os.path.join(_event_archive_dir(), rel), 'rt', encoding='utf-8') as fh:
+                _rollup_events(c, [tuple(ev.get(col) for col in _EVENT_COLS) for ev in map(json.loads, fh)])
+        except OSError:
+            continue  # missing segment file: its counts are lost with it
+
+
+def _archived_event(c, eid):
+    """One archived event by eid (located through event_archive_segment), or None."""
+    import gzip
+    c.execute('SELECT rel_path FROM event_archive_segment WHERE min_eid<=? AND max_eid>=?', (eid, eid))
+    for (rel,) in c.fetchall():
+        try:
+            with gzip.open(os.path.join(_event_archive_dir(), rel), 'rt', encoding='utf-8') as fh:
+                for ev in map(json.loads, fh):
+                    if ev["eid"] == eid:
+                        return ev
+        except OSError:
+            continue
+    return None
+
+
+def _event_retention_due():
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        c.execute('SELECT MAX(run_at) FROM event_retention_run')
+        last = c.fetchone()[0]
+    finally:
+        conn.close()
+    if not last:
+        return True
+    last_dt = datetime.datetime.strptime(last, '%Y-%m-%dT%H:%M:%SZ')
+    return (datetime.datetime.utcnow() - last_dt).total_seconds() >= EVENT_LOG_RETENTION_INTERVAL_HOURS * 3600
+
+
+def _event_matches(ev, since, until, filters):
+    if since and ev["ts"] < since:
+        return False
+    if until and ev["ts"] >= until:
+        return False
+    return all(ev.get(k) == v for k, v in filters.items())
+
+
+def query_event_log(since=None, until=None, level=None, stage=None, code=None,
+                    job_id=None, domain_id=None, page_id=None, limit=500):
+    """
+    Event log over [since, until) (ISO-8601 UTC), newest first, reading the live event_log
+    and — when the range reaches past it — the archived segments transparently.
+    Each event carries "archived": True/False.
+    """
+    filters = {k: v for k, v in (("level", level), ("stage", stage), ("code", code), ("job_id", job_id),
+                                 ("domain_id", domain_id), ("page_id", page_id)) if v is not None}
+    conn = get_report_conn()
+    try:
+        c = conn.cursor()
+        where, args = [], []
+        if since:
+            where.append('ts>=?'); args.append(since)
+        if until:
+            where.append('ts<?'); args.append(until)
+        for k, v in filters.items():
+            where.append(f'{k}=?'); args.append(v)
+        c.execute(f'''SELECT {",".join(_EVENT_COLS)} FROM event_log
+            {"WHERE " + " AND ".join(where) if where else ""} ORDER BY eid DESC LIMIT ?''', args + [limit])
+        events = [dict(zip(_EVENT_COLS, r), archived=False) for r in c.fetchall()]
+
+        seg_where, seg_args = [], []
+        if since:
+            seg_where.append('max_ts>=?'); seg_args.append(since)
+        if until:
+            seg_where.append('min_ts<?'); seg_args.append(until)
+        c.execute(f'''SELECT rel_path,max_eid FROM event_archive_segment
+            {"WHERE " + " AND ".join(seg_where) if seg_where else ""} ORDER BY max_eid DESC''', seg_args)
+        segments = c.fetchall()
+    finally:
+        conn.close()
+
+    # Retained WARN/ERROR rows interleave with archived ones by eid: merge, newest first, and stop
+    # once the next segment cannot contain anything newer than the current limit-th event.
+    import gzip
+    base = _event_archive_dir()
+    for rel, max_eid in segments:
+        if len(events) >= limit and max_eid < events[-1]["eid"]:
+            break
+        with gzip.open(os.path.join(base, rel), 'rt', encoding='utf-8') as fh:
+            events.extend(dict(ev, archived=True) for ev in map(json.loads, fh)
+                          if _event_matches(ev, since, until, filters))
+        events.sort(key=lambda ev: ev["eid"], reverse=True)
+        del events[limit:]
+    return events
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Artifact store
+# ═══════════════════════════════════════════════════════════════════════
+def _store_artifact(c, sha256, kind, raw_bytes, policy_store):
+    c.execute('SELECT artifact_id FROM artifact_store WHERE sha256=?', (sha256,))
+    r = c.fetchone()
+    if r:
+        return r[0]
+    blob = raw_bytes if policy_store else None
+    size = len(raw_bytes) if raw_bytes else 0
+    c.execute('INSERT INTO artifact_store (sha256,kind,bytes,size) VALUES (?,?,?,?)',
+              (sha256, kind, blob, size))
+    return c.lastrowid
+
+def _link_artifact(c, snap_id, artifact_id):
+    c.execute('INSERT OR IGNORE INTO snapshot_artifact (snap_id,artifact_id) VALUES (?,?)',
+              (snap_id, artifact_id))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# HTTP cache
+# ═══════════════════════════════════════════════════════════════════════
+def get_http_hints(page_id):
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        c.execute('SELECT etag,last_modified FROM http_cache WHERE page_id=?', (page_id,))
+        r = c.fetchone()
+        return {"etag": r[0], "last_modified": r[1]} if r else {}
+    finally:
+        conn.close()
+
+def _upsert_http_cache(c, page_id, etag, last_modified):
+    now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
     c.execute('''INSERT INTO http_cache (page_id,etag,last_modified,last_checked_at)
                  VALUES (?,?,?,?) ON CONFLICT(page_id)
                  DO UPDATE SET etag=excluded.etag, last_modified=excluded.last_modified,
@@ -1969,8 +3445,11 @@ def _upsert_http_cache(c, page_id, etag, last_modified):
 # Job management
 # ═══════════════════════════════════════════════════════════════════════
 def start_job(seed, mode="SEED_ONLY", max_pages=None, max_depth=None, settings=None, notes=None,
-              rule_set_id=None, determinism_mode="NORMAL"):
-    """Start a crawl job. v5: validates rule_set_id against golden_rule if provided."""
+              rule_set_id=None, determinism_mode="NORMAL", is_replay_derived=False):
+    """
+    Start a crawl job. v5: validates rule_set_id against golden_rule if provided.
+    v16: is_replay_derived flags offline re-analysis jobs (no network).
+    """
     conn = get_conn()
     try:
         c = conn.cursor()
@@ -1982,10 +3461,10 @@ def start_job(seed, mode="SEED_ONLY", max_pages=None, max_depth=None, settings=N
             c.execute('SELECT rule_set_id FROM golden_rule WHERE rule_set_id=?', (rule_set_id,))
             if not c.fetchone():
                 raise ValueError(f"rule_set_id={rule_set_id} not found in golden_rule")
-        c.execute('''INSERT INTO crawl_job (seed,mode,max_pages,max_depth,notes,settings_json,rule_set_id,determinism_mode)
-                     VALUES (?,?,?,?,?,?,?,?)''',
+        c.execute('''INSERT INTO crawl_job (seed,mode,max_pages,max_depth,notes,settings_json,rule_set_id,determinism_mode,
+                     is_replay_derived) VALUES (?,?,?,?,?,?,?,?,?)''',
                   (seed, mode, max_pages, max_depth, notes, json.dumps(settings or {}),
-                   rule_set_id, determinism_mode))
+                   rule_set_id, determinism_mode, int(bool(is_replay_derived))))
         jid = c.lastrowid
         # ── POLICY_GATE (v8) ── bind active policy to this job
         bind_policy(c, 'JOB', jid)
@@ -1997,6 +3476,8 @@ def start_job(seed, mode="SEED_ONLY", max_pages=None, max_depth=None, settings=N
         conn.close()
 
 def finish_job(job_id, metrics=None):
+    # ── SHARD_OUTBOX_DRAIN_GATE (v16) ── routed saves' queued catalog writes land before the KPIs
+    drain_shard_outbox()
     conn = get_conn()
     try:
         c = conn.cursor()
@@ -2008,61 +3489,159 @@ def finish_job(job_id, metrics=None):
         conn.commit()
     finally:
         conn.close()
+    # ── GATE_PROFILE_GATE (v16) ── persist this process's remaining gate spans for the job
+    try:
+        flush_gate_profiles(job_id)
+    except sqlite3.Error:
+        pass  # profiling is best-effort, don't fail the job
     # ── KPI_COMPUTE_GATE (v7) ── compute KPIs at job finish
     try:
         compute_kpis_for_job(job_id)
     except Exception:
         pass  # KPI compute is best-effort, don't fail the job
+    # ── SAMPLE_RESERVOIR_GATE (v16) ── offer this job's new pages to reservoir sample sets
+    try:
+        refresh_sample_reservoirs()
+    except Exception:
+        pass  # sampling is best-effort, don't fail the job
+    # ── COST_RECONCILE_GATE (v16) ── verify this job's running cost totals against the ledger
+    try:
+        reconcile_cost_totals(job_id=job_id)
+    except Exception:
+        pass  # reconciliation is best-effort, don't fail the job
+    # ── EVENT_RETENTION_GATE (v16) ── archive + prune expired event_log rows (throttled)
+    try:
+        if _event_retention_due():
+            run_event_log_retention()
+    except (sqlite3.Error, OSError):
+        pass  # retention is best-effort, don't fail the job
+    # ── DATA_VERSION_GATE (v16) ── KPIs/samples changed: invalidate cached reports
+    bump_data_version()
+    # ── WAL_CHECKPOINT_GATE (v16) ── fold the job's WAL back; refresh the reporting replica
+    try:
+        checkpoint_wal()
+        if REPORT_MODE == "REPLICA":
+            refresh_report_replica()
+    except (sqlite3.Error, OSError):
+        pass  # housekeeping is best-effort, don't fail the job
+    if QUERY_CACHE_WARM_ON_FINISH:
+        try:
+            warm_query_cache()
+        except Exception:
+            pass  # warming is best-effort, don't fail the job
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # Frontier v4
 # ═══════════════════════════════════════════════════════════════════════
 def frontier_add(urls, domain_id=None, priority=0, depth=0, discovered_from=None, source="SEED", cluster_key_hint=None):
+    """v16: without domain_id each URL gets its host's domain row, so domain-exclusive leases apply to seeds too."""
     conn = get_conn()
     try:
         c = conn.cursor()
         added = 0
-        for url in urls:
+        by_host = {}
+        items = []
+        for u in urls:
+            did = domain_id
+            if did is None:
+                host = (urlparse(u).hostname or "").lower()
+                if host and host not in by_host:
+                    by_host[host] = ensure_domain(c, host)
+                did = by_host.get(host)
+            items.append({"url": u, "domain_id": did})
+        # ── ROBOTS_GATE (v16) ── never enqueue URLs disallowed by cached robots.txt
+        items, _ = _robots_filter_items(c, items)
+        for item in items:
+            url = item["url"]
             c.execute('''INSERT OR IGNORE INTO crawl_frontier
                          (domain_id,url,url_norm,priority,depth,discovered_from,source,cluster_key_hint)
                          VALUES (?,?,?,?,?,?,?,?)''',
-                      (domain_id, url, normalize_url(url), priority, depth, discovered_from, source, cluster_key_hint))
+                      (item["domain_id"], url, normalize_url(url), priority, depth, discovered_from, source, cluster_key_hint))
             if c.rowcount > 0: added += 1
         conn.commit()
         return added
     finally:
         conn.close()
 
-def frontier_add_batch(c, items):
-    """Batch insert into frontier within an existing transaction. items = list of dicts."""
+def frontier_add_batch(c, items, job_id=None, robots_filtered=False):
+    """
+    Batch insert into frontier within an existing transaction. items = list of dicts.
+    v16: disallowed URLs (cached robots.txt) are filtered in bulk before insert;
+    robots_filtered=True when the caller already ran _robots_filter_items.
+    """
     added = 0
+    # ── ROBOTS_GATE (v16) ──
+    if not robots_filtered:
+        items, _ = _robots_filter_items(c, items, job_id=job_id)
     for item in items:
         c.execute('''INSERT OR IGNORE INTO crawl_frontier
                      (domain_id,url,url_norm,priority,depth,discovered_from,source,cluster_key_hint)
                      VALUES (?,?,?,?,?,?,?,?)''',
-                  (item.get("domain_id"), item["url"], normalize_url(item["url"]),
+                  (item.get("domain_id"), item["url"], item.get("url_norm") or normalize_url(item["url"]),
                    item.get("priority", 0), item.get("depth", 0),
                    item.get("discovered_from"), item.get("source", "SEED"),
                    item.get("cluster_key_hint")))
         if c.rowcount > 0: added += 1
     return added
 
-def frontier_next(limit=10):
+def frontier_next(limit=10, worker_id=None, lease_seconds=None):
+    """
+    Claim up to `limit` ready PENDING rows (priority order) as RUNNING.
+    v16: every claim is a lease — lease_owner (worker_id, default local:<pid>) + lease_expires_at.
+    Expired leases are reclaimed first; candidates are selected and flipped under BEGIN IMMEDIATE,
+    so concurrent workers serialize on the claim and never pick the same rows. With
+    FRONTIER_LEASE_DOMAIN_EXCLUSIVE, domains currently leased by another worker are left alone.
+    """
+    owner = worker_id or f"local:{os.getpid()}"
     conn = get_conn()
     try:
         c = conn.cursor()
-        now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
-        c.execute('''SELECT fid,url,url_norm,domain_id,priority,depth,retry_count,http_hint_json,source
+        now_dt = datetime.datetime.utcnow()
+        now = now_dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+        expires = (now_dt + datetime.timedelta(seconds=lease_seconds or FRONTIER_LEASE_SECONDS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        c.execute('BEGIN IMMEDIATE')  # the candidate SELECT must see other workers' claims
+        # ── LEASE_RECLAIM_GATE (v16) ──
+        _reclaim_leases(c, now)
+        exclusive, params = "", [now, now]
+        if FRONTIER_LEASE_DOMAIN_EXCLUSIVE:
+            exclusive = '''AND (domain_id IS NULL OR domain_id NOT IN (
+                           SELECT domain_id FROM crawl_frontier WHERE status='RUNNING'
+                           AND domain_id IS NOT NULL AND COALESCE(lease_owner,'')<>?))'''
+            params.append(owner)
+        c.execute(f'''SELECT fid,url,url_norm,domain_id,priority,depth,retry_count,http_hint_json,source
                      FROM crawl_frontier
                      WHERE status='PENDING' AND (next_retry_at IS NULL OR next_retry_at<=?)
-                       AND (cooldown_until IS NULL OR cooldown_until<=?)
-                     ORDER BY priority DESC, fid ASC LIMIT ?''', (now, now, limit))
+                       AND (cooldown_until IS NULL OR cooldown_until<=?) {exclusive}
+                     ORDER BY priority DESC, fid ASC LIMIT ?''', params + [limit])
         rows = c.fetchall()
+        # ── DNS_FAIL_FAST_GATE (v16) ── known dns_ok=0 hosts never take a worker slot
+        blocked = _dns_blocked_domains(c, [r[3] for r in rows], now)
+        keep, skipped = [], {}
+        for r in rows:
+            host = extract_domain(r[1])
+            neg = dns_cache_lookup(host)
+            if r[3] in blocked or (neg and not neg["ok"]):
+                until = blocked.get(r[3]) or (datetime.datetime.utcnow() + datetime.timedelta(
+                    seconds=neg["expires"] - time.monotonic())).strftime('%Y-%m-%dT%H:%M:%SZ')
+                skipped.setdefault((host, r[3], until), []).append(r[0])
+            else:
+                keep.append(r)
+        for (host, did, until), sfids in skipped.items():
+            c.execute(f"UPDATE crawl_frontier SET cooldown_until=? WHERE fid IN ({','.join('?'*len(sfids))})",
+                      [until] + sfids)
+            _log(c, "FRONTIER", "WARN", "DOMAIN_IN_COOLDOWN",
+                 f"host={host} dns_ok=0 until={until} deferred={len(sfids)}",
+                 domain_id=did, network_stage="DNS")
+        rows = keep
         fids = [r[0] for r in rows]
         if fids:
-            c.execute(f"UPDATE crawl_frontier SET status='RUNNING',scheduled_at=? WHERE fid IN ({','.join('?'*len(fids))})",
-                      [now]+fids)
+            c.execute(f'''UPDATE crawl_frontier SET status='RUNNING',scheduled_at=?,lease_owner=?,lease_expires_at=?
+                          WHERE status='PENDING' AND fid IN ({','.join('?' * len(fids))})''',
+                      [now, owner, expires] + fids)
+            if worker_id:
+                c.execute('UPDATE crawl_worker SET claimed=claimed+?,heartbeat_at=? WHERE worker_id=?',
+                          (len(rows), now, worker_id))
         conn.commit()
         return [{"fid":r[0],"url":r[1],"url_norm":r[2],"domain_id":r[3],"priority":r[4],
                  "depth":r[5],"retry_count":r[6],"http_hints":json.loads(r[7] or '{}'),
@@ -2070,26 +3649,40 @@ def frontier_next(limit=10):
     finally:
         conn.close()
 
-def frontier_done(fid, status="DONE", error=None):
+def frontier_done(fid, status="DONE", error=None, worker_id=None):
+    """
+    v16: releases the lease. With worker_id, only while that worker still holds it — returns False
+    when the lease was reclaimed meanwhile (the row belongs to someone else now).
+    """
     conn = get_conn()
     try:
-        conn.execute("UPDATE crawl_frontier SET status=?,last_error=? WHERE fid=?", (status, error, fid))
+        sql = "UPDATE crawl_frontier SET status=?,last_error=?,lease_owner=NULL,lease_expires_at=NULL WHERE fid=?"
+        params = [status, error, fid]
+        if worker_id:
+            sql += " AND lease_owner=?"
+            params.append(worker_id)
+        cur = conn.execute(sql, params)
         conn.commit()
+        return cur.rowcount > 0
     finally:
         conn.close()
 
-def frontier_retry(fid, error=None):
+def frontier_retry(fid, error=None, worker_id=None):
+    """v16: releases the lease; with worker_id, a no-op (False) once the lease has been reclaimed."""
     conn = get_conn()
     try:
         c = conn.cursor()
-        c.execute('SELECT retry_count,domain_id FROM crawl_frontier WHERE fid=?', (fid,))
+        guard, gp = (" AND lease_owner=?", [worker_id]) if worker_id else ("", [])
+        c.execute('SELECT retry_count,domain_id FROM crawl_frontier WHERE fid=?' + guard, [fid] + gp)
         r = c.fetchone()
-        if not r: return
+        if not r: return False
         count, did = r
         new_count = count + 1
         if new_count > RETRY_POLICY["max_retries"]:
-            c.execute("UPDATE crawl_frontier SET status='FAILED',retry_count=?,last_error=? WHERE fid=?",
-                      (new_count, error, fid))
+            c.execute('''UPDATE crawl_frontier SET status='FAILED',retry_count=?,last_error=?,
+                         lease_owner=NULL,lease_expires_at=NULL WHERE fid=?''' + guard, [new_count, error, fid] + gp)
+            if not c.rowcount:
+                return False
             if did:
                 cool = (datetime.datetime.utcnow() + datetime.timedelta(minutes=RETRY_POLICY["cooldown_minutes"])).strftime('%Y-%m-%dT%H:%M:%SZ')
                 c.execute("UPDATE crawl_frontier SET cooldown_until=? WHERE domain_id=? AND status='PENDING'",
@@ -2098,9 +3691,159 @@ def frontier_retry(fid, error=None):
             idx = min(new_count - 1, len(RETRY_POLICY["backoff_seconds"]) - 1)
             wait = RETRY_POLICY["backoff_seconds"][idx]
             nxt = (datetime.datetime.utcnow() + datetime.timedelta(seconds=wait)).strftime('%Y-%m-%dT%H:%M:%SZ')
-            c.execute("UPDATE crawl_frontier SET status='PENDING',retry_count=?,next_retry_at=?,last_error=? WHERE fid=?",
-                      (new_count, nxt, error, fid))
+            c.execute('''UPDATE crawl_frontier SET status='PENDING',retry_count=?,next_retry_at=?,last_error=?,
+                         lease_owner=NULL,lease_expires_at=NULL WHERE fid=?''' + guard, [new_count, nxt, error, fid] + gp)
+            if not c.rowcount:
+                return False
         conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# v16 crawl worker fleet: frontier leases, heartbeats, reclaim
+# ═══════════════════════════════════════════════════════════════════════
+def _reclaim_leases(c, now, owner=None, penalize=True):
+    """
+    LEASE_RECLAIM_GATE (v16): RUNNING rows whose lease expired — or, with owner, every row that
+    worker holds — go back to PENDING. penalize counts it as a retry (LEASE_EXPIRED), so a URL
+    that keeps killing workers ends FAILED after RETRY_POLICY["max_retries"]. Pre-lease RUNNING
+    rows are treated as expired FRONTIER_LEASE_SECONDS after scheduled_at. Returns rows reclaimed.
+    """
+    if owner:
+        c.execute('''SELECT fid,lease_owner,lease_expires_at,retry_count FROM crawl_frontier
+                     WHERE status='RUNNING' AND lease_owner=?''', (owner,))
+    else:
+        stale = (datetime.datetime.strptime(now, '%Y-%m-%dT%H:%M:%SZ') -
+                 datetime.timedelta(seconds=FRONTIER_LEASE_SECONDS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        c.execute('''SELECT fid,lease_owner,lease_expires_at,retry_count FROM crawl_frontier
+                     WHERE status='RUNNING' AND (lease_expires_at<?
+                       OR (lease_expires_at IS NULL AND COALESCE(scheduled_at,'')<?))''', (now, stale))
+    max_retries = RETRY_POLICY["max_retries"]
+    rows = []
+    for fid, who, until, n in c.fetchall():
+        # guarded on the lease we saw: a concurrent sweep or renewal since our SELECT wins
+        c.execute('''UPDATE crawl_frontier SET status=?,retry_count=?,last_error=?,
+                     lease_owner=NULL,lease_expires_at=NULL
+                     WHERE fid=? AND status='RUNNING' AND lease_owner IS ? AND lease_expires_at IS ?''',
+                  ("FAILED" if penalize and n + 1 > max_retries else "PENDING", n + 1 if penalize else n,
+                   f"LEASE_EXPIRED:{who or '-'}" if penalize else None, fid, who, until))
+        if c.rowcount:
+            rows.append((fid, who, n))
+    if not rows:
+        return 0
+    per_owner = {}
+    for _, who, _ in rows:
+        per_owner[who] = per_owner.get(who, 0) + 1
+    c.executemany('UPDATE crawl_worker SET reclaimed=reclaimed+? WHERE worker_id=?',
+                  [(n, who) for who, n in per_owner.items() if who])
+    if penalize:
+        failed = sum(1 for _, _, n in rows if n + 1 > max_retries)
+        _log(c, "FRONTIER", "WARN", "LEASE_RECLAIMED",
+             f"reclaimed={len(rows)} failed={failed} owners={','.join(sorted(str(w) for w in per_owner))}")
+    return len(rows)
+
+
+def reclaim_expired_leases():
+    """Coordinator sweep: return expired frontier leases to PENDING. Returns rows reclaimed."""
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        n = _reclaim_leases(c, datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'))
+        conn.commit()
+        return n
+    finally:
+        conn.close()
+
+
+def register_worker(worker_id, job_id, pid=None, host=None):
+    conn = get_conn()
+    try:
+        conn.execute('''INSERT OR REPLACE INTO crawl_worker (worker_id,job_id,pid,host,status)
+                        VALUES (?,?,?,?,'RUNNING')''', (worker_id, job_id, pid or os.getpid(), host))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def frontier_heartbeat(worker_id, metrics=None, lease_seconds=None):
+    """
+    Renew every lease worker_id holds and record liveness (+ its running metrics).
+    Returns the number of leases renewed.
+    """
+    now_dt = datetime.datetime.utcnow()
+    now = now_dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    expires = (now_dt + datetime.timedelta(seconds=lease_seconds or FRONTIER_LEASE_SECONDS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        c.execute("UPDATE crawl_frontier SET lease_expires_at=? WHERE status='RUNNING' AND lease_owner=?",
+                  (expires, worker_id))
+        renewed = c.rowcount
+        c.execute('''UPDATE crawl_worker SET heartbeat_at=?,metrics_json=COALESCE(?,metrics_json)
+                     WHERE worker_id=?''', (now, json.dumps(metrics) if metrics is not None else None, worker_id))
+        conn.commit()
+        return renewed
+    finally:
+        conn.close()
+
+
+def finish_worker(worker_id, metrics=None, status="STOPPED"):
+    """
+    Close a worker's registry row. Leases it still holds go back to PENDING — as a penalized
+    retry when status='LOST' (the process died mid-item), free of charge otherwise.
+    """
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+        released = _reclaim_leases(c, now, owner=worker_id, penalize=status == "LOST")
+        c.execute('''UPDATE crawl_worker SET status=?,heartbeat_at=?,metrics_json=COALESCE(?,metrics_json)
+                     WHERE worker_id=?''',
+                  (status, now, json.dumps(metrics) if metrics is not None else None, worker_id))
+        if status == "LOST":
+            c.execute('SELECT job_id FROM crawl_worker WHERE worker_id=?', (worker_id,))
+            r = c.fetchone()
+            _log(c, "FRONTIER", "ERROR", "WORKER_LOST", f"worker={worker_id} released={released}",
+                 job_id=r[0] if r else None)
+        conn.commit()
+        return released
+    finally:
+        conn.close()
+
+
+def frontier_backlog():
+    """Claimable-now PENDING rows vs. rows under lease."""
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+        c.execute('''SELECT COALESCE(SUM(status='PENDING' AND (next_retry_at IS NULL OR next_retry_at<=?)
+                                          AND (cooldown_until IS NULL OR cooldown_until<=?)),0),
+                            COALESCE(SUM(status='RUNNING'),0)
+                     FROM crawl_frontier WHERE status IN ('PENDING','RUNNING')''', (now, now))
+        ready, leased = c.fetchone()
+        return {"ready": ready, "leased": leased}
+    finally:
+        conn.close()
+
+
+def merge_worker_metrics(job_id):
+    """Job-level metrics: numeric worker metrics summed, plus workers / workers_lost / leases_reclaimed."""
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        c.execute('SELECT status,reclaimed,metrics_json FROM crawl_worker WHERE job_id=?', (job_id,))
+        merged = {"workers": 0, "workers_lost": 0, "leases_reclaimed": 0}
+        for status, reclaimed, mj in c.fetchall():
+            merged["workers"] += 1
+            merged["workers_lost"] += status == "LOST"
+            merged["leases_reclaimed"] += reclaimed
+            for k, v in json.loads(mj or '{}').items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    merged[k] = merged.get(k, 0) + v
+        return merged
     finally:
         conn.close()
 
@@ -2354,6 +4097,142 @@ def _qa_sample_check(c, snap_id, job_id, page_id, domain_id,
     return reasons
 
 
+# ═══════════════════════════════════════════════════════════════════════
+# v16 compiled segment matcher + bulk reassignment
+# ═══════════════════════════════════════════════════════════════════════
+# In-process compiled matchers: DB_PATH -> (data_version 'SEGMENT', matcher). The segment_version_*
+# triggers bump that version on every segment write, invalidating the entry on next lookup.
+_SEGMENT_MATCHERS = {}
+_SEGMENT_OUTLIER_REASONS = ("SEARCH_ENGINE_SEGMENT", "NO_SEGMENT")
+
+
+def _norm_domain(name):
+    return (name or "").strip().lower().rstrip(".")
+
+
+def compile_segment_matcher(segments):
+    """
+    Compile [(segment_id, name, definition_json, is_enabled), ...] into a matcher.
+    Rules come from definition_json "domain_list" / "domain_patterns" of enabled segments:
+    exact names → hash index, "*.suffix" → reversed-label trie, other globs → regex.
+    """
+    exact, trie, globs, ruled, by_name = {}, {}, [], set(), {}
+    for seg_id, name, def_json, enabled in segments:
+        by_name[name] = seg_id
+        if not enabled:
+            continue
+        defn = json.loads(def_json or '{}')
+        for pat in list(defn.get("domain_list", [])) + list(defn.get("domain_patterns", [])):
+            pat = _norm_domain(pat)
+            if not pat:
+                continue
+            ruled.add(seg_id)
+            if not any(ch in pat for ch in '*?['):
+                exact.setdefault(pat, set()).add(seg_id)
+            elif pat.startswith('*.') and not any(ch in pat[2:] for ch in '*?['):
+                node = trie
+                for label in reversed(pat[2:].split('.')):
+                    node = node.setdefault(label, {})
+                node.setdefault(None, set()).add(seg_id)
+            else:
+                globs.append((re.compile(fnmatch.translate(pat)), seg_id))
+    return {"exact": exact, "trie": trie, "globs": globs, "ruled": ruled, "by_name": by_name}
+
+
+def match_segments(matcher, domain_name):
+    """Sorted segment_ids whose rules match domain_name."""
+    d = _norm_domain(domain_name)
+    hits = set(matcher["exact"].get(d, ()))
+    labels = d.split('.')
+    node = matcher["trie"]
+    for depth, label in enumerate(reversed(labels), 1):
+        node = node.get(label)
+        if node is None:
+            break
+        if None in node and depth < len(labels):  # "*.gov" needs at least one more label
+            hits |= node[None]
+    for rx, seg_id in matcher["globs"]:
+        if seg_id not in hits and rx.match(d):
+            hits.add(seg_id)
+    return sorted(hits)
+
+
+def _segment_matcher(c):
+    """Compiled matcher for this DB; recompiled only when data_version 'SEGMENT' moves (one-row read)."""
+    c.execute("SELECT version FROM data_version WHERE name='SEGMENT'")
+    r = c.fetchone()
+    version = r[0] if r else 0
+    cached = _SEGMENT_MATCHERS.get(DB_PATH)
+    if not cached or cached[0] != version:
+        c.execute('SELECT segment_id,name,definition_json,is_enabled FROM segment ORDER BY segment_id')
+        cached = _SEGMENT_MATCHERS[DB_PATH] = (version, compile_segment_matcher(c.fetchall()))
+    return cached[1]
+
+
+def assign_segments(domain_ids=None, chunk=500):
+    """
+    SEGMENT_REASSIGN_GATE (v16): recompute rule-driven segment membership in bulk (all domains
+    when domain_ids is None), e.g. after a segment definition changes. Memberships in segments
+    without domain rules are treated as manual and kept; UNCLASSIFIED fills in when nothing
+    else applies. Returns {"domains", "added", "removed", "outliers"}.
+    """
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        m = _segment_matcher(c)
+        se_id = m["by_name"].get("SEARCH_ENGINE")
+        uc_id = m["by_name"].get("UNCLASSIFIED")
+        managed = m["ruled"] | ({uc_id} if uc_id else set())
+        if domain_ids is None:
+            c.execute('SELECT domain_id FROM domain ORDER BY domain_id')
+            domain_ids = [r[0] for r in c.fetchall()]
+
+        stats = {"domains": 0, "added": 0, "removed": 0, "outliers": 0}
+        for i in range(0, len(domain_ids), chunk):
+            ids = list(domain_ids[i:i + chunk])
+            ph = ','.join('?' * len(ids))
+            c.execute(f'SELECT domain_id,domain,outlier_reason FROM domain WHERE domain_id IN ({ph})', ids)
+            doms = c.fetchall()
+            c.execute(f'SELECT domain_id,segment_id FROM domain_segment WHERE domain_id IN ({ph})', ids)
+            have = {}
+            for did, sid in c.fetchall():
+                have.setdefault(did, set()).add(sid)
+
+            adds, dels, flags, clears = [], [], [], []
+            for did, name, reason in doms:
+                cur = have.get(did, set())
+                manual = cur - managed
+                want = set(match_segments(m, name))
+                if not want and not manual and uc_id:
+                    want = {uc_id}
+                adds += [(did, s) for s in want - cur]
+                dels += [(did, s) for s in (cur & managed) - want]
+                final = manual | want
+                new_reason = ("SEARCH_ENGINE_SEGMENT" if se_id in final
+                              else "NO_SEGMENT" if not final else None)
+                if new_reason:
+                    flags.append((new_reason, did))
+                elif reason in _SEGMENT_OUTLIER_REASONS:
+                    clears.append((did,))
+            c.executemany('INSERT OR IGNORE INTO domain_segment (domain_id,segment_id) VALUES (?,?)', adds)
+            c.executemany('DELETE FROM domain_segment WHERE domain_id=? AND segment_id=?', dels)
+            c.executemany('UPDATE domain SET is_outlier=1,outlier_reason=? WHERE domain_id=?', flags)
+            c.executemany('UPDATE domain SET is_outlier=0,outlier_reason=NULL WHERE domain_id=?', clears)
+            stats["domains"] += len(doms)
+            stats["added"] += len(adds)
+            stats["removed"] += len(dels)
+            stats["outliers"] += len(flags)
+
+        _log(c, "SEGMENT", "INFO", "SEGMENTS_REASSIGNED",
+             f"domains={stats['domains']} added={stats['added']} removed={stats['removed']} "
+             f"outliers={stats['outliers']}")
+        _bump_data_version(c)
+        conn.commit()
+        return stats
+    finally:
+        conn.close()
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # Segment management v6
 # ═══════════════════════════════════════════════════════════════════════
@@ -2362,43 +4241,33 @@ def _assign_segment(c, domain_id, domain_name):
     SEGMENT_ASSIGN_GATE: assign domain to segment(s).
     Uses SEARCH_ENGINE domain_list for exact match, else UNCLASSIFIED.
     Returns list of segment_ids, and whether domain is outlier.
+    v16: matches via the cached compiled matcher (exact / *.suffix / glob rules).
     """
+    m = _segment_matcher(c)
+    se_id = m["by_name"].get("SEARCH_ENGINE")
+
     # Check if already assigned
     c.execute('SELECT segment_id FROM domain_segment WHERE domain_id=?', (domain_id,))
     existing = [r[0] for r in c.fetchall()]
     if existing:
         # Check if in SEARCH_ENGINE segment → outlier
-        c.execute("SELECT segment_id FROM segment WHERE name='SEARCH_ENGINE'")
-        se_row = c.fetchone()
-        is_outlier = se_row and se_row[0] in existing
-        return existing, is_outlier
+        return existing, se_id is not None and se_id in existing
 
     # Auto-assign based on segment templates
-    assigned = []
-    c.execute('SELECT segment_id,name,definition_json FROM segment WHERE is_enabled=1')
-    segments = c.fetchall()
-
-    for seg_id, seg_name, def_json in segments:
-        defn = json.loads(def_json or '{}')
-        domain_list = defn.get("domain_list", [])
-        if domain_name in domain_list:
-            c.execute('INSERT OR IGNORE INTO domain_segment (domain_id,segment_id) VALUES (?,?)',
-                      (domain_id, seg_id))
-            assigned.append(seg_id)
+    assigned = match_segments(m, domain_name)
+    c.executemany('INSERT OR IGNORE INTO domain_segment (domain_id,segment_id) VALUES (?,?)',
+                  [(domain_id, seg_id) for seg_id in assigned])
 
     # If no match, assign to UNCLASSIFIED
     if not assigned:
-        c.execute("SELECT segment_id FROM segment WHERE name='UNCLASSIFIED'")
-        uc = c.fetchone()
-        if uc:
+        uc_id = m["by_name"].get("UNCLASSIFIED")
+        if uc_id:
             c.execute('INSERT OR IGNORE INTO domain_segment (domain_id,segment_id) VALUES (?,?)',
-                      (domain_id, uc[0]))
-            assigned.append(uc[0])
+                      (domain_id, uc_id))
+            assigned.append(uc_id)
 
     # Mark outlier if in SEARCH_ENGINE
-    c.execute("SELECT segment_id FROM segment WHERE name='SEARCH_ENGINE'")
-    se_row = c.fetchone()
-    is_outlier = se_row and se_row[0] in assigned
+    is_outlier = se_id is not None and se_id in assigned
     if is_outlier:
         c.execute('UPDATE domain SET is_outlier=1,outlier_reason=? WHERE domain_id=?',
                   ('SEARCH_ENGINE_SEGMENT', domain_id))
@@ -2517,10 +4386,67 @@ def _evaluate_relative_alert(c, domain_id, snap_id, job_id, segment_ids, score,
     return fired
 
 
+def _pair_latest_snaps(c, domain_ids):
+    """
+    Latest representative snapshot per domain in one grouped query: newest snapshot of each
+    representative page, then the best-scoring one per domain.
+    Returns {domain_id: (score, crit, warn, info, issues_sha256, fetched_at, issue_codes, snap_id)}.
+    """
+    c.execute('''WITH latest AS (
+            SELECT p.domain_id, MAX(ps.snap_id) AS snap_id
+            FROM page p JOIN page_snapshot ps ON ps.page_id=p.page_id
+            WHERE p.is_representative=1 AND p.domain_id IN (SELECT value FROM json_each(?))
+            GROUP BY p.page_id),
+        ranked AS (
+            SELECT l.domain_id, ps.snap_id, ps.score_total, ps.issues_count_critical,
+                ps.issues_count_warning, ps.issues_count_info, ps.issues_sha256, ps.fetched_at,
+                ROW_NUMBER() OVER (PARTITION BY l.domain_id
+                                   ORDER BY ps.score_total DESC, ps.snap_id) AS rn
+            FROM latest l JOIN page_snapshot ps ON ps.snap_id=l.snap_id)
+        SELECT r.domain_id, r.score_total, r.issues_count_critical, r.issues_count_warning,
+            r.issues_count_info, r.issues_sha256, r.fetched_at,
+            (SELECT GROUP_CONCAT(i.code,'; ') FROM page_issue pi JOIN issue i ON pi.issue_id=i.issue_id
+             WHERE pi.snap_id=r.snap_id),
+            r.snap_id
+        FROM ranked r WHERE r.rn=1''', (json.dumps(sorted(set(domain_ids))),))
+    return {r[0]: r[1:] for r in c.fetchall()}
+
+
+def _pair_domain_sigs(c, domain_ids):
+    """
+    Representative-set signature per domain: sha256 over (page_id, latest snap_id) of every
+    representative page. Changes with new snapshots, is_representative flips and deletions —
+    anything that can change what _pair_latest_snaps returns. Returns {domain_id: hex16}.
+    """
+    c.execute('''SELECT p.domain_id, p.page_id, MAX(ps.snap_id)
+        FROM page p JOIN page_snapshot ps ON ps.page_id=p.page_id
+        WHERE p.is_representative=1 AND p.domain_id IN (SELECT value FROM json_each(?))
+        GROUP BY p.page_id ORDER BY p.domain_id, p.page_id''', (json.dumps(sorted(set(domain_ids))),))
+    sigs = {}
+    for did, pid, snap_id in c.fetchall():
+        sigs.setdefault(did, hashlib.sha256()).update(f"{pid}:{snap_id};".encode())
+    return {did: h.hexdigest()[:16] for did, h in sigs.items()}
+
+
+def _pair_report_payload(pair_name, seg_id, left_dom, right_dom, left_snap, right_snap):
+    def _side(dom, snap):
+        return {"domain": dom, "score": snap[0] if snap else None,
+                "crit": snap[1] if snap else 0, "warn": snap[2] if snap else 0,
+                "issues": snap[6] if snap else "", "fetched_at": snap[5] if snap else None}
+    return {
+        "pair_name": pair_name, "segment_id": seg_id,
+        "left": _side(left_dom, left_snap),
+        "right": _side(right_dom, right_snap),
+        "delta_score": ((left_snap[0] or 0) - (right_snap[0] or 0)) if left_snap and right_snap else None,
+    }
+
+
 def generate_pair_report(pair_id):
     """
     PAIR_REPORT_GATE: generate A/B comparison for a fixed pair.
     Returns delta summary and persists export_job(kind=PAIR_REPORT).
+    v16: latest snapshots via the grouped _pair_latest_snaps query; see generate_pair_reports
+    for the batch / incremental path.
     """
     conn = get_conn()
     try:
@@ -2537,32 +4463,10 @@ def generate_pair_report(pair_id):
 
         pair_name, seg_id, left_did, right_did, left_dom, right_dom = pair
 
-        def _latest_snap(did):
-            c.execute('''SELECT ps.score_total,ps.issues_count_critical,ps.issues_count_warning,
-                ps.issues_count_info,ps.issues_sha256,ps.fetched_at,
-                GROUP_CONCAT(i.code,'; ')
-                FROM page_snapshot ps JOIN page p ON ps.page_id=p.page_id
-                LEFT JOIN page_issue pi ON ps.snap_id=pi.snap_id
-                LEFT JOIN issue i ON pi.issue_id=i.issue_id
-                WHERE p.domain_id=? AND p.is_representative=1
-                  AND ps.snap_id=(SELECT MAX(s2.snap_id) FROM page_snapshot s2 WHERE s2.page_id=ps.page_id)
-                GROUP BY ps.snap_id
-                ORDER BY ps.score_total DESC LIMIT 1''', (did,))
-            return c.fetchone()
-
-        left_snap = _latest_snap(left_did)
-        right_snap = _latest_snap(right_did)
-
-        report = {
-            "pair_name": pair_name, "segment_id": seg_id,
-            "left": {"domain": left_dom, "score": left_snap[0] if left_snap else None,
-                     "crit": left_snap[1] if left_snap else 0, "warn": left_snap[2] if left_snap else 0,
-                     "issues": left_snap[6] if left_snap else "", "fetched_at": left_snap[5] if left_snap else None},
-            "right": {"domain": right_dom, "score": right_snap[0] if right_snap else None,
-                      "crit": right_snap[1] if right_snap else 0, "warn": right_snap[2] if right_snap else 0,
-                      "issues": right_snap[6] if right_snap else "", "fetched_at": right_snap[5] if right_snap else None},
-            "delta_score": ((left_snap[0] or 0) - (right_snap[0] or 0)) if left_snap and right_snap else None,
-        }
+        snaps = _pair_latest_snaps(c, (left_did, right_did))
+        left_snap = snaps.get(left_did)
+        right_snap = snaps.get(right_did)
+        report = _pair_report_payload(pair_name, seg_id, left_dom, right_dom, left_snap, right_snap)
 
         # Persist export_job
         report_json = json.dumps(report, ensure_ascii=False)
@@ -2579,6 +4483,145 @@ def generate_pair_report(pair_id):
         conn.close()
 
 
+_PAIR_REPORT_COLUMNS = (("pair_id", "int"), ("pair_name", "str"), ("segment_id", "int"),
+                        ("left_domain", "str"), ("left_score", "float"), ("left_crit", "int"),
+                        ("left_warn", "int"), ("left_issues", "str"), ("left_fetched_at", "str"),
+                        ("right_domain", "str"), ("right_score", "float"), ("right_crit", "int"),
+                        ("right_warn", "int"), ("right_issues", "str"), ("right_fetched_at", "str"),
+                        ("delta_score", "float"))
+
+
+def _write_pair_report_columnar(path, reports):
+    """Flatten pair reports into one Parquet file (one row per pair). Requires pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow is required for PARQUET pair reports (pip install pyarrow)")
+    types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+    schema = pa.schema([pa.field(name, types[kind]) for name, kind in _PAIR_REPORT_COLUMNS],
+                       metadata={"seobaike.export": "v16", "seobaike.kind": "PAIR_REPORT"})
+    cols = {name: [] for name, _ in _PAIR_REPORT_COLUMNS}
+    for rep in reports:
+        cols["pair_id"].append(rep["pair_id"])
+        cols["pair_name"].append(rep["pair_name"])
+        cols["segment_id"].append(rep["segment_id"])
+        cols["delta_score"].append(rep["delta_score"])
+        for side in ("left", "right"):
+            s = rep[side]
+            cols[f"{side}_domain"].append(s["domain"])
+            cols[f"{side}_score"].append(s["score"])
+            cols[f"{side}_crit"].append(s["crit"])
+            cols[f"{side}_warn"].append(s["warn"])
+            cols[f"{side}_issues"].append(s["issues"])
+            cols[f"{side}_fetched_at"].append(s["fetched_at"])
+    table = pa.table({name: pa.array(cols[name], type=schema.field(name).type)
+                      for name, _ in _PAIR_REPORT_COLUMNS}, schema=schema)
+    pq.write_table(table, path, write_statistics=True)
+    h = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def generate_pair_reports(incremental=True, fmt="JSONL", output_path=None):
+    """
+    PAIR_REPORT_BATCH_GATE (v16): every enabled comparison_pair in one consolidated, hashed
+    artifact (JSONL line or Parquet row per pair) and a single export_job(kind=PAIR_REPORT).
+    Latest representative snapshots for all pairs come from one grouped query.
+    incremental=True only recomputes pairs that are new, whose definition/domain names changed,
+    or whose domains' representative set changed since the last run (pair_report_state.rep_sig:
+    new snapshots, is_representative flips, deleted snapshots); the rest reuse their stored report. When nothing changed the previous artifact is kept.
+    Returns {"pairs","regenerated","output_path","sha256","export_id","skipped"}.
+    """
+    fmt = fmt.upper()
+    if fmt not in PAIR_REPORT_BATCH_FORMATS:
+        raise ValueError(f"fmt must be one of {PAIR_REPORT_BATCH_FORMATS}")
+    if not output_path:
+        output_path = os.path.join(os.path.dirname(DB_PATH),
+                                   "pair_reports" + (".jsonl" if fmt == "JSONL" else ".parquet"))
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        c.execute('''SELECT cp.pid,cp.name,cp.segment_id,cp.left_domain_id,cp.right_domain_id,
+            dl.domain, dr.domain
+            FROM comparison_pair cp
+            JOIN domain dl ON cp.left_domain_id=dl.domain_id
+            JOIN domain dr ON cp.right_domain_id=dr.domain_id
+            WHERE cp.is_enabled=1 ORDER BY cp.pid''')
+        pairs = c.fetchall()
+        dom_sigs = _pair_domain_sigs(c, [d for p in pairs for d in (p[3], p[4])]) if pairs else {}
+
+        c.execute('''SELECT pid,pair_sig,report_json,report_sha256,rep_sig FROM pair_report_state''')
+        state = {r[0]: r[1:] for r in c.fetchall()}
+        live = {p[0] for p in pairs}
+        gone = [(pid,) for pid in state if pid not in live]
+
+        def _sig(p):
+            return hashlib.sha256(json.dumps(p[1:], ensure_ascii=False).encode()).hexdigest()
+
+        def _rep_sig(p):
+            return f"{dom_sigs.get(p[3], '-')}:{dom_sigs.get(p[4], '-')}"
+
+        todo = [p for p in pairs
+                if not incremental or p[0] not in state or state[p[0]][0] != _sig(p)
+                or state[p[0]][3] != _rep_sig(p)]
+
+        c.execute('''SELECT output_path FROM export_job WHERE export_type='PAIR_REPORT' AND notes LIKE ?
+            ORDER BY export_id DESC LIMIT 1''', (f"batch fmt={fmt} %",))
+        last = c.fetchone()
+        if incremental and not todo and not gone and last and last[0] == output_path \
+                and os.path.exists(output_path):
+            return {"pairs": len(pairs), "regenerated": 0, "output_path": output_path,
+                    "sha256": None, "export_id": None, "skipped": True}
+
+        snaps = _pair_latest_snaps(c, [d for p in todo for d in (p[3], p[4])]) if todo else {}
+        rows = []
+        for p in todo:
+            pid, name, seg_id, left_did, right_did, left_dom, right_dom = p
+            report = _pair_report_payload(name, seg_id, left_dom, right_dom,
+                                          snaps.get(left_did), snaps.get(right_did))
+            report_json = json.dumps(report, ensure_ascii=False)
+            rows.append((pid, _sig(p), report_json, hashlib.sha256(report_json.encode()).hexdigest(),
+                         _rep_sig(p)))
+        c.executemany('''INSERT INTO pair_report_state (pid,pair_sig,report_json,report_sha256,rep_sig)
+            VALUES (?,?,?,?,?)
+            ON CONFLICT(pid) DO UPDATE SET pair_sig=excluded.pair_sig,report_json=excluded.report_json,
+              report_sha256=excluded.report_sha256,rep_sig=excluded.rep_sig,
+              updated_at=strftime('%Y-%m-%dT%H:%M:%SZ','now')''', rows)
+        c.executemany('DELETE FROM pair_report_state WHERE pid=?', gone)
+        fresh = {r[0]: r[2] for r in rows}
+        reports = [(pid, fresh[pid] if pid in fresh else state[pid][1]) for pid in sorted(live)]
+
+        # Atomic replace: readers never see a half-written artifact
+        tmp_path = output_path + ".tmp"
+        if fmt == "JSONL":
+            with open(tmp_path, 'wb') as fh:
+                sink = _HashingTextSink(fh)
+                for pid, report_json in reports:
+                    sink.write('{"pair_id": %d, %s\n' % (pid, report_json[1:]))
+            sha = sink.sha.hexdigest()
+        else:
+            sha = _write_pair_report_columnar(
+                tmp_path, [dict(json.loads(rj), pair_id=pid) for pid, rj in reports])
+        os.replace(tmp_path, output_path)
+
+        c.execute('''INSERT INTO export_job (export_type,output_path,row_count,artifact_sha256,notes)
+                     VALUES (?,?,?,?,?)''',
+                  ('PAIR_REPORT', output_path, len(reports), sha,
+                   f"batch fmt={fmt} pairs={len(reports)} regenerated={len(rows)}"))
+        export_id = c.lastrowid
+        _log(c, "PAIR_REPORT", "INFO", "PAIR_REPORT_BATCH",
+             f"pairs={len(reports)} regenerated={len(rows)} removed={len(gone)} fmt={fmt} sha={sha[:12]}")
+        conn.commit()
+        return {"pairs": len(reports), "regenerated": len(rows), "output_path": output_path,
+                "sha256": sha, "export_id": export_id, "skipped": False}
+    finally:
+        conn.close()
+
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # KPI Compute v7
 # ═══════════════════════════════════════════════════════════════════════
@@ -2617,6 +4660,8 @@ def compute_kpis_for_job(job_id):
                     (kpi_id,scope,scope_id,window_days,value,as_of_date,job_id)
                     VALUES (?,?,?,?,?,?,?)''',
                     (kpi_id, 'JOB', job_id, 0, val, today, job_id))
+                # ── KPI_STREAM_GATE (v16) ── per-job KPIs feed the GLOBAL stream
+                _kpi_stream_update(c, key, 'JOB', job_id, val, today)
                 count += 1
 
         # ── scope=DOMAIN: rolling KPIs per domain touched in this job ──
@@ -2632,6 +4677,7 @@ def compute_kpis_for_job(job_id):
                         (kpi_id,scope,scope_id,window_days,value,as_of_date,job_id)
                         VALUES (?,?,?,?,?,?,?)''',
                         (kpi_id, 'DOMAIN', did, 7, val, today, job_id))
+                    _kpi_stream_update(c, key, 'DOMAIN', did, val, today)
                     count += 1
 
         # ── scope=SEGMENT: rolling KPIs per segment ──
@@ -2645,6 +4691,7 @@ def compute_kpis_for_job(job_id):
                         (kpi_id,scope,scope_id,window_days,value,as_of_date,job_id)
                         VALUES (?,?,?,?,?,?,?)''',
                         (kpi_id, 'SEGMENT', seg_id, 7, val, today, job_id))
+                    _kpi_stream_update(c, key, 'SEGMENT', seg_id, val, today)
                     count += 1
 
         _log(c, "KPI_COMPUTE", "INFO", "KPI_COMPUTED", f"count={count}",
@@ -2842,16 +4889,245 @@ def link_ticket_evidence(tid, kind, ref_id):
         conn.close()
 
 
+# ═══════════════════════════════════════════════════════════════════════
+# v16 per-gate profiling for save_analysis
+# ═══════════════════════════════════════════════════════════════════════
+# In-process accumulators: (DB_PATH, job_id) -> {"pages": n, "gates": {gate: [calls, total_ms,
+# max_ms, sql_statements, hist]}}; merged into job_gate_profile by flush_gate_profiles().
+_GATE_PROFILE = {}
+_GATE_PROFILE_LOCK = threading.Lock()
+
+
+class _GateProfiler:
+    """Per-save gate spans: wall time + SQL statements between consecutive mark() calls."""
+    __slots__ = ("job_id", "spans", "_gate", "_t0", "_sql", "_sql0")
+
+    def __init__(self, conn, job_id):
+        self.job_id = job_id or 0
+        self.spans = []
+        self._gate = None
+        self._sql = 0
+        conn.set_trace_callback(self._count)
+
+    def _count(self, _statement):
+        self._sql += 1
+
+    def mark(self, gate):
+        now = time.perf_counter()
+        if self._gate is not None:
+            self.spans.append((self._gate, (now - self._t0) * 1000.0, self._sql - self._sql0))
+        self._gate, self._t0, self._sql0 = gate, now, self._sql
+
+    def finish(self):
+        self.mark(None)  # called after conn.close(), which also drops the trace callback
+        _gate_profile_record(self.job_id, self.spans)
+
+
+class _NullProfiler:
+    """GATE_PROFILE_ENABLED=False: marks cost one no-op call each."""
+    __slots__ = ()
+
+    def mark(self, gate):
+        pass
+
+    def finish(self):
+        pass
+
+
+_NULL_PROFILER = _NullProfiler()
+
+
+def _gate_profile_record(job_id, spans):
+    flush = False
+    with _GATE_PROFILE_LOCK:
+        acc = _GATE_PROFILE.setdefault((DB_PATH, job_id), {"pages": 0, "gates": {}})
+        acc["pages"] += 1
+        for gate, ms, sql in spans:
+            g = acc["gates"].get(gate)
+            if g is None:
+                g = acc["gates"][gate] = [0, 0.0, 0.0, 0, [0] * (len(GATE_PROFILE_BUCKETS_MS) + 1)]
+            g[0] += 1
+            g[1] += ms
+            g[2] = max(g[2], ms)
+            g[3] += sql
+            g[4][bisect.bisect_left(GATE_PROFILE_BUCKETS_MS, ms)] += 1
+        flush = acc["pages"] >= GATE_PROFILE_FLUSH_PAGES
+    if flush:
+        try:
+            flush_gate_profiles(job_id)
+        except sqlite3.Error:
+            pass  # profiling is best-effort; rows stay buffered for the next flush
+
+
+def flush_gate_profiles(job_id=None):
+    """
+    GATE_PROFILE_GATE (v16): merge this process's buffered gate spans into job_gate_profile
+    (all jobs, or just job_id). Safe across processes: the hist_json read-merge-write runs under
+    BEGIN IMMEDIATE, so concurrent flushers (fleet workers) serialize instead of overwriting.
+    Returns number of (job, gate) rows written.
+    """
+    with _GATE_PROFILE_LOCK:
+        keys = [k for k in _GATE_PROFILE if k[0] == DB_PATH and (job_id is None or k[1] == job_id)]
+        pending = [(k[1], _GATE_PROFILE.pop(k)) for k in keys]
+    if not pending:
+        return 0
+    with shard_scope(None):  # catalog table, even when the flush fires from a routed save
+        conn = get_conn()
+    try:
+        c = conn.cursor()
+        c.execute('BEGIN IMMEDIATE')
+        written = 0
+        for jid, acc in pending:
+            for gate, (calls, total, mx, sql, hist) in acc["gates"].items():
+                c.execute('SELECT hist_json FROM job_gate_profile WHERE job_id=? AND gate=?', (jid, gate))
+                r = c.fetchone()
+                if r:
+                    old = json.loads(r[0])
+                    if len(old) == len(hist):
+                        hist = [a + b for a, b in zip(old, hist)]
+                c.execute('''INSERT INTO job_gate_profile (job_id,gate,calls,total_ms,max_ms,sql_statements,hist_json)
+                    VALUES (?,?,?,?,?,?,?)
+                    ON CONFLICT(job_id,gate) DO UPDATE SET calls=calls+excluded.calls,
+                      total_ms=total_ms+excluded.total_ms, max_ms=MAX(max_ms,excluded.max_ms),
+                      sql_statements=sql_statements+excluded.sql_statements,
+                      hist_json=excluded.hist_json,
+                      updated_at=strftime('%Y-%m-%dT%H:%M:%SZ','now')''',
+                          (jid, gate, calls, round(total, 4), round(mx, 4), sql, json.dumps(hist)))
+                written += 1
+        conn.commit()
+        return written
+    except sqlite3.Error:
+        with _GATE_PROFILE_LOCK:  # put spans back so a later flush can retry
+            for jid, acc in pending:
+                if (DB_PATH, jid) not in _GATE_PROFILE:
+                    _GATE_PROFILE[(DB_PATH, jid)] = acc
+        raise
+    finally:
+        conn.close()
+
+
+def _hist_quantile(hist, calls, q, max_ms):
+    """Upper bucket bound holding the q-quantile, capped at the observed max_ms."""
+    need, seen = q * calls, 0
+    for i, n in enumerate(hist):
+        seen += n
+        if n and seen >= need:
+            return min(GATE_PROFILE_BUCKETS_MS[i], max_ms) if i < len(GATE_PROFILE_BUCKETS_MS) else max_ms
+    return max_ms
+
+
+def query_gate_latency(job_id):
+    """
+    Gate latency report for a job: per gate calls, total / mean / p50 / p95 / max ms,
+    SQL statements per call and share of total save time — most expensive gate first.
+    """
+    flush_gate_profiles(job_id)
+    conn = get_report_conn()
+    try:
+        c = conn.cursor()
+        c.execute('''SELECT gate,calls,total_ms,max_ms,sql_statements,hist_json
+            FROM job_gate_profile WHERE job_id=? ORDER BY total_ms DESC''', (job_id or 0,))
+        rows = c.fetchall()
+    finally:
+        conn.close()
+    grand = sum(r[2] for r in rows) or 1.0
+    out = []
+    for gate, calls, total, mx, sql, hist_json in rows:
+        hist = json.loads(hist_json)
+        out.append({"gate": gate, "calls": calls, "total_ms": round(total, 2),
+                    "mean_ms": round(total / calls, 3) if calls else None,
+                    "p50_ms": _hist_quantile(hist, calls, 0.5, mx),
+                    "p95_ms": _hist_quantile(hist, calls, 0.95, mx),
+                    "max_ms": round(mx, 3), "sql_per_call": round(sql / calls, 2) if calls else None,
+                    "share_pct": round(total / grand * 100, 1)})
+    return out
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # 27+2 Gate pipeline: save_analysis v7
 # ═══════════════════════════════════════════════════════════════════════
-def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None, edge_data=None):
+_DRIFT_INSERT = '''INSERT INTO drift_check
+    (page_id,snap_a_id,snap_b_id,rule_set_id,issues_sha256_a,issues_sha256_b,is_deterministic,drift_details_json)
+    VALUES (?,?,?,?,?,?,?,?)'''
+
+
+def _catalog_page_gates(c, page_id, domain_id, domain_name, snap_id, job_id, rs_id, score, crit,
+                        score_delta, new_issues, cluster_id, is_new_page, prof=None):
+    """
+    save_analysis gates that only write catalog tables: ALERT_EVAL → QA_SAMPLING →
+    SEGMENT_ASSIGN → RELATIVE_ALERT → ALERT_TO_TICKET. Inline in single-file mode; replayed by
+    drain_shard_outbox() for routed saves. Returns (segment_ids, tickets_created).
+    """
+    prof = prof or _NULL_PROFILER
+
+    # ── ALERT_EVAL_GATE (v4) ──
+    prof.mark("ALERT_EVAL_GATE")
+    alert_fired = _evaluate_alerts(c, page_id, domain_id, snap_id, job_id,
+                     score_delta=score_delta, new_issues=new_issues,
+                     cluster_id=cluster_id)
+
+    # ── QA_SAMPLING_GATE (v5) ── flag snapshots for human review
+    prof.mark("QA_SAMPLING_GATE")
+    _qa_sample_check(c, snap_id, job_id, page_id, domain_id,
+                     is_new_domain=is_new_page, score_delta=score_delta,
+                     alert_fired=bool(alert_fired))
+
+    # ── SEGMENT_ASSIGN_GATE (v6) ── assign domain to segment(s)
+    prof.mark("SEGMENT_ASSIGN_GATE")
+    segment_ids, is_outlier = _assign_segment(c, domain_id, domain_name)
+    _log(c, "SEGMENT_ASSIGN", "INFO", "SEGMENT_ASSIGNED",
+         f"segments={segment_ids} outlier={is_outlier}",
+         job_id=job_id, domain_id=domain_id, page_id=page_id, snap_id=snap_id)
+
+    # ── BASELINE_BUILD_GATE (v6) ── build baselines per segment (periodic, not every save)
+    # Only build baseline if this is a representative page and segments are assigned
+    # Baseline is built lazily — query functions trigger it when needed
+
+    # ── RELATIVE_ALERT_GATE (v6) ── fire alerts based on segment baseline
+    prof.mark("RELATIVE_ALERT_GATE")
+    _evaluate_relative_alert(c, domain_id, snap_id, job_id, segment_ids, score, crit)
+
+    # ── ALERT_TO_TICKET_GATE (v7) ── auto-create tickets from alerts
+    prof.mark("ALERT_TO_TICKET_GATE")
+    tickets_created = _alert_to_ticket(c, page_id, domain_id, snap_id, job_id, rs_id)
+    return segment_ids, tickets_created
+
+
+def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None, edge_data=None,
+                  replay_source_snap_id=None):
     """
     Full v13 pipeline (54 gates). Returns (success:bool, page_id:str, status:str).
     edge_data = {"internal_links_sample": [...], "external_links_sample": [...],
                  "canonical_url_norm": str|None, "hreflang_map": dict|None}
+    v16: replay_source_snap_id marks an offline re-analysis of stored HTML —
+    the page row / HTTP cache are left untouched, DEDUP_GATE is bypassed and the
+    new snapshot records derived_from_snap_id + a SNAPSHOT_TO_REPLAY edge.
+    v16: with GATE_PROFILE_ENABLED each gate's span is profiled — see query_gate_latency.
+    v16: with SHARD_COUNT set, runs inside the shard_scope() of the page's domain and commits
+    only that shard: catalog writes (event_log, costs, lineage, alert/QA/segment/ticket gates)
+    reach the catalog through drain_shard_outbox().
     """
+    # ── SHARD_ROUTE_GATE (v16) ── page-level rows go to the domain's shard; catalog writes
+    # are queued in its outbox and drained every SHARD_OUTBOX_DRAIN_PAGES routed saves
+    if SHARD_COUNT and current_shard() is None:
+        domain_name = extract_domain(data.get("target_url", ""))
+        _ensure_catalog_domain(domain_name)
+        shard = shard_for_domain(domain_name)
+        with shard_scope(shard):
+            result = save_analysis(data, job_id=job_id, raw_html=raw_html, headers=headers, timings=timings,
+                                   edge_data=edge_data, replay_source_snap_id=replay_source_snap_id)
+        n = _SHARD_SAVES[(DB_PATH, shard)] = _SHARD_SAVES.get((DB_PATH, shard), 0) + 1
+        if n >= SHARD_OUTBOX_DRAIN_PAGES:
+            _SHARD_SAVES[(DB_PATH, shard)] = 0
+            try:
+                drain_shard_outbox(shard)
+            except sqlite3.Error:
+                pass  # rows stay queued; the next drain (or finish_job) applies them
+        return result
     conn = get_conn()
+    begin_bulk_writes(conn)  # v16: lineage/cost rows flushed with the snapshot txn
+    # v16: per-gate wall time + SQL counts (GATE_PROFILE_ENABLED); no-op profiler otherwise
+    prof = _GateProfiler(conn, job_id) if GATE_PROFILE_ENABLED else _NULL_PROFILER
     try:
         c = conn.cursor()
         tm = timings or {}
@@ -2873,13 +5149,17 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
         status_family = f"{status_code // 100}xx" if status_code else "other"
 
         # ── domain ──
+        prof.mark("DOMAIN_RESOLVE")
         domain_id = ensure_domain(c, domain_name)
         dcfg = get_domain_config(c, domain_id)
 
         # ── page upsert ──
+        prof.mark("PAGE_UPSERT")
         c.execute('SELECT page_id,sha256_html,last_seen_at FROM page WHERE url_norm=?', (url_n,))
         existing = c.fetchone()
-        if existing:
+        if existing and replay_source_snap_id:
+            page_id = existing[0]
+        elif existing:
             page_id = existing[0]
             c.execute('''UPDATE page SET last_seen_at=?,last_status_code=?,content_type=?,
                          sha256_html=?,html_size=?,canonical_url=?,final_url=?,redirect_chain_json=?,domain_id=?
@@ -2895,12 +5175,14 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
             page_id = c.lastrowid
 
         # ── HTTP cache ──
+        prof.mark("HTTP_CACHE")
         etag = ct_raw.get("etag", ct_raw.get("ETag"))
         lm = ct_raw.get("last-modified", ct_raw.get("Last-Modified"))
-        if etag or lm:
+        if (etag or lm) and not replay_source_snap_id:
             _upsert_http_cache(c, page_id, etag, lm)
 
         # ── 304 path ──
+        prof.mark("HTTP_304")
         if status_code == 304:
             _log(c, "HTTP_COND_FETCH", "INFO", "HTTP_304", f"304 for {url_n}",
                  job_id=job_id, domain_id=domain_id, page_id=page_id)
@@ -2908,6 +5190,7 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
             return True, str(page_id), "HTTP_304"
 
         # ── FETCH_GATE ──
+        prof.mark("FETCH_GATE")
         if status_code not in (200, 301, 302, 304):
             _save_minimal(c, page_id, job_id, now, data, ["FETCH_NOT_HTML"], status_family, tm)
             _log(c, "FETCH", "WARN", "FETCH_NOT_HTML", f"status={status_code}",
@@ -2923,6 +5206,7 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
             return True, str(page_id), "FETCH_FAILED"
 
         # ── PARSE_GATE ──
+        prof.mark("PARSE_GATE")
         sha256_dom = data.get("sha256_dom")
         if 0 < html_size < 500:
             _save_minimal(c, page_id, job_id, now, data, ["FETCH_TOO_SMALL","PARSE_FAILED"], status_family, tm)
@@ -2938,18 +5222,23 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
             return True, str(page_id), "PARSE_FAILED"
 
         # ── DEDUP_GATE ──
+        prof.mark("DEDUP_GATE")
         ttl_h = dcfg["ttl_hours"]
-        c.execute('SELECT snap_id,sha256_dom,fetched_at FROM page_snapshot WHERE page_id=? ORDER BY snap_id DESC LIMIT 1', (page_id,))
+        # v16: also fetch the delta fields + issue codes so DELTA_GATE needs no re-read
+        c.execute(f'''SELECT snap_id,sha256_dom,fetched_at,{','.join(_DELTA_FIELDS)},
+                (SELECT group_concat(i.code) FROM page_issue pi JOIN issue i ON pi.issue_id=i.issue_id
+                 WHERE pi.snap_id=page_snapshot.snap_id)
+            FROM page_snapshot WHERE page_id=? ORDER BY snap_id DESC LIMIT 1''', (page_id,))
         prev = c.fetchone()
         if prev and sha256_dom:
-            prev_sid, prev_hash, prev_ts = prev
+            prev_sid, prev_hash, prev_ts = prev[:3]
             ttl_exp = False
             if prev_ts:
                 try:
                     ttl_exp = (datetime.datetime.utcnow() - datetime.datetime.strptime(prev_ts,'%Y-%m-%dT%H:%M:%SZ')).total_seconds() >= ttl_h*3600
                 except ValueError:
                     ttl_exp = True
-            if prev_hash and prev_hash == sha256_dom and not ttl_exp:
+            if prev_hash and prev_hash == sha256_dom and not ttl_exp and not replay_source_snap_id:
                 c.execute("UPDATE page SET last_seen_at=? WHERE page_id=?", (now, page_id))
                 _log(c, "DEDUP", "INFO", "SNAPSHOT_SKIPPED_DUP", "unchanged dom_hash",
                      job_id=job_id, domain_id=domain_id, page_id=page_id)
@@ -2957,6 +5246,7 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
                 return True, str(page_id), "DEDUP_SKIPPED"
 
         # ── build snapshot fields ──
+        prof.mark("BUILD_FIELDS")
         title = data.get("page_title")
         meta = data.get("meta_description")
         st = data.get("structure", {})
@@ -2974,11 +5264,13 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
         ic = data.get("images_count",0); ap = data.get("a11y_alt_coverage_pct",0.0)
 
         # ── RULE_SET_GATE (v5) ── resolve active rule set
+        prof.mark("RULE_SET_GATE")
         active_rs = get_active_rule_set(c)
         rs_id = active_rs["rule_set_id"] if active_rs else None
         rs_name = active_rs["name"] if active_rs else "v5_initial"
 
         # ── AUDIT_GATE ──
+        prof.mark("AUDIT_GATE")
         issues = []
         bj = data.get("broken_jsonld", False)
         if not title:          issues.append("TITLE_MISSING")
@@ -2995,6 +5287,7 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
             issues.append("HREFLANG_INCONSISTENT")
 
         # ── ISSUE_NORMALIZATION_GATE (v5) ── deterministic sort
+        prof.mark("ISSUE_NORMALIZATION_GATE")
         issues.sort(key=lambda x: ({"CRITICAL":0,"WARNING":1,"INFO":2}.get(
             next((sev for cd,sev,*_ in ISSUE_TAXONOMY if cd==x), "INFO"), 2), x))
 
@@ -3002,11 +5295,13 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
         verdict = {"issues": issues, "score": sc}
 
         # ── ISSUE_HASH_GATE (v5) ── compute deterministic hash
+        prof.mark("ISSUE_HASH_GATE")
         i_sha256 = compute_issues_sha256(issues)
         i_crit, i_warn, i_info = count_issues_by_severity(issues)
         explain_compact = build_explain_compact(issues, sc, sb, rs_name)
 
         # ── v6: intent detection ──
+        prof.mark("INTENT_DETECT")
         intent_flags = detect_page_intent(final_url, title)
         tpl_family = detect_template_family(intent_flags, final_url)
 
@@ -3014,6 +5309,7 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
         intent_primary = intent_flags[0] if intent_flags else "UNKNOWN"
 
         # ── SAFE_INTENT_DEPTH_GATE (v11) ── restrict LOGIN/SIGNUP
+        prof.mark("SAFE_INTENT_DEPTH_GATE")
         _, _, auth_restricted = check_safe_intent_depth(intent_primary, final_url)
         if auth_restricted:
             _log(c, "SAFE_INTENT", "INFO", "AUTH_SURFACE_RESTRICTED",
@@ -3021,6 +5317,7 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
                  job_id=job_id, domain_id=domain_id, page_id=page_id)
 
         # ── INSERT snapshot (v6: +intent_flags, template_family) ──
+        prof.mark("SNAPSHOT_INSERT")
         c.execute('''INSERT INTO page_snapshot
             (page_id,job_id,fetched_at,http_status_family,fetch_ms,parse_ms,audit_ms,
              title,title_len,meta_description,meta_description_len,
@@ -3032,8 +5329,9 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
              html_artifact_sha256,headers_artifact_sha256,
              verdict_json,
              issues_sha256,issues_count_critical,issues_count_warning,issues_count_info,
-             explain_compact_json,intent_flags_json,template_family)
-            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+             explain_compact_json,intent_flags_json,template_family,intent_mask,
+             status_code,final_url,redirect_chain_json)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
             (page_id,job_id,now,status_family,tm.get("fetch_ms"),tm.get("parse_ms"),tm.get("audit_ms"),
              title,len(title) if title else 0,meta,len(meta) if meta else 0,
              h1t,h1c,h1h,h2c,rob,can,lang,wc,tl,s_text,sha256_dom,
@@ -3042,21 +5340,37 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
              json.dumps(verdict,ensure_ascii=False),
              i_sha256, i_crit, i_warn, i_info,
              json.dumps(explain_compact,ensure_ascii=False),
-             json.dumps(intent_flags), tpl_family))
+             json.dumps(intent_flags), tpl_family, intent_mask(intent_flags),
+             status_code, final_url if final_url != url else None,
+             redirect_chain if redirect_chain != '[]' else None))
         snap_id = c.lastrowid
 
+        # ── REPLAY_TAG_GATE (v16) ── link replay-derived snapshot to its source
+        prof.mark("REPLAY_TAG_GATE")
+        if replay_source_snap_id:
+            c.execute('UPDATE page_snapshot SET derived_from_snap_id=? WHERE snap_id=?',
+                      (replay_source_snap_id, snap_id))
+            write_lineage_edge(c, "SNAPSHOT", replay_source_snap_id, "SNAPSHOT", snap_id,
+                               "SNAPSHOT_TO_REPLAY", job_id=job_id)
+
         # ── snapshot_rule_binding (v5) ──
+        prof.mark("RULE_BINDING")
         if rs_id:
             c.execute('INSERT OR IGNORE INTO snapshot_rule_binding (snap_id,rule_set_id) VALUES (?,?)',
                       (snap_id, rs_id))
 
         # link issues
+        prof.mark("ISSUE_LINK")
+        linked_codes = set()
         for code in issues:
             c.execute('SELECT issue_id FROM issue WHERE code=?', (code,))
             r = c.fetchone()
-            if r: c.execute('INSERT OR IGNORE INTO page_issue (snap_id,issue_id) VALUES (?,?)', (snap_id,r[0]))
+            if r:
+                c.execute('INSERT OR IGNORE INTO page_issue (snap_id,issue_id) VALUES (?,?)', (snap_id,r[0]))
+                linked_codes.add(code)
 
         # ── INTEGRITY_EVAL_GATE (v12) ── check snapshot completeness
+        prof.mark("INTEGRITY_EVAL_GATE")
         snap_complete, integrity_reasons = evaluate_snapshot_integrity(c, snap_id, rs_id)
         if not snap_complete:
             _log(c, "INTEGRITY", "WARN", "SNAPSHOT_INCOMPLETE",
@@ -3064,6 +5378,7 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
                  job_id=job_id, domain_id=domain_id, page_id=page_id, snap_id=snap_id)
 
         # ── LINEAGE_WRITE_GATE (v13) ── record data lineage edges
+        prof.mark("LINEAGE_WRITE_GATE")
         if job_id:
             write_lineage_edge(c, "JOB", job_id, "SNAPSHOT", snap_id,
                                "CRAWL_TO_SNAPSHOT", job_id=job_id)
@@ -3075,6 +5390,7 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
                                    "SNAPSHOT_TO_ISSUE", job_id=job_id)
 
         # ── ARTIFACT_PERSIST ──
+        prof.mark("ARTIFACT_PERSIST")
         store_bytes = dcfg["tier"] == "A"
         if sha256_html and html_bytes:
             blob = html_bytes if (store_bytes and html_size <= ARTIFACT_POLICY["max_html_bytes"]) else None
@@ -3087,19 +5403,28 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
             _link_artifact(c, snap_id, aid)
 
         # ── FINGERPRINT_GATE (v15) ── extract HTTP header fingerprint
+        prof.mark("FINGERPRINT_GATE")
         if ct_raw and domain_id:
             extract_http_fingerprint(c, domain_id, ct_raw)
 
         # ── DELTA_GATE ──
+        prof.mark("DELTA_GATE")
         score_delta_val = 0
         new_issue_codes = []
         if prev:
-            delta_info = _compute_delta(c, page_id, prev[0], snap_id)
+            # v16: both sides from memory — prev row cached by DEDUP_GATE, new row as just inserted
+            delta_info = _compute_delta(
+                c, page_id, prev[0], snap_id,
+                old=prev[3:3 + len(_DELTA_FIELDS)],
+                new=_delta_stored((title, meta, h1t, can, rob, jt, lang, h1c, h2c, sc, il, el)),
+                old_issues=set(prev[-1].split(',')) if prev[-1] else set(),
+                new_issues=linked_codes)
             if delta_info:
                 score_delta_val = delta_info.get("score_delta", 0)
                 new_issue_codes = delta_info.get("added", [])
 
         # ── GRAPH_WRITE_GATE (v4) ──
+        prof.mark("GRAPH_WRITE_GATE")
         if edge_data:
             edge_list = build_edge_list(data, page_id, domain_id, domain_name)
             for url_s in sorted(edge_data.get("internal_links_sample", []))[:EDGE_SAMPLE_CAP]:
@@ -3117,19 +5442,17 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
                      job_id=job_id, domain_id=domain_id, page_id=page_id, snap_id=snap_id)
 
         # ── CLUSTERING_GATE (v4) ──
+        prof.mark("CLUSTERING_GATE")
         ck = compute_cluster_key(final_url, url)
         cluster_id = _update_cluster(c, page_id, domain_id, ck, now)
 
-        # ── ALERT_EVAL_GATE (v4) ──
-        alert_fired = _evaluate_alerts(c, page_id, domain_id, snap_id, job_id,
-                         score_delta=score_delta_val, new_issues=new_issue_codes,
-                         cluster_id=cluster_id)
-
         # ── site hint update (v4) ──
+        prof.mark("SITE_HINT")
         has_hreflang = bool(data.get("hreflang"))
         upsert_site_hint(c, domain_id, appears_multilingual=has_hreflang)
 
         # ── DETERMINISM_GATE (v5) ── check for drift if STRICT mode
+        prof.mark("DETERMINISM_GATE")
         if job_id:
             c.execute('SELECT determinism_mode FROM crawl_job WHERE job_id=?', (job_id,))
             dm_row = c.fetchone()
@@ -3141,39 +5464,26 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
                 if prev_sha and prev_sha != i_sha256:
                     # Same DOM hash but different issues = non-deterministic
                     if prev[1] and sha256_dom and prev[1] == sha256_dom:
-                        c.execute('''INSERT INTO drift_check
-                            (page_id,snap_a_id,snap_b_id,rule_set_id,issues_sha256_a,issues_sha256_b,is_deterministic,drift_details_json)
-                            VALUES (?,?,?,?,?,?,?,?)''',
-                            (page_id, prev[0], snap_id, rs_id, prev_sha, i_sha256, 0,
-                             json.dumps({"reason": "same_dom_different_issues"}, ensure_ascii=False)))
+                        drift = (page_id, prev[0], snap_id, rs_id, prev_sha, i_sha256, 0,
+                                 json.dumps({"reason": "same_dom_different_issues"}, ensure_ascii=False))
+                        if _catalog_deferred():
+                            _outbox(c, "DRIFT", drift)
+                        else:
+                            c.execute(_DRIFT_INSERT, drift)
                         _log(c, "DETERMINISM", "WARN", "DRIFT_DETECTED",
                              f"page_id={page_id} sha_a={prev_sha[:12]} sha_b={i_sha256[:12]}",
                              job_id=job_id, domain_id=domain_id, page_id=page_id, snap_id=snap_id)
 
-        # ── QA_SAMPLING_GATE (v5) ── flag snapshots for human review
-        is_new_domain = not existing  # first time seeing this page
-        _qa_sample_check(c, snap_id, job_id, page_id, domain_id,
-                         is_new_domain=is_new_domain, score_delta=score_delta_val,
-                         alert_fired=bool(alert_fired))
-
-        # ── SEGMENT_ASSIGN_GATE (v6) ── assign domain to segment(s)
-        segment_ids, is_outlier = _assign_segment(c, domain_id, domain_name)
-        _log(c, "SEGMENT_ASSIGN", "INFO", "SEGMENT_ASSIGNED",
-             f"segments={segment_ids} outlier={is_outlier}",
-             job_id=job_id, domain_id=domain_id, page_id=page_id, snap_id=snap_id)
-
-        # ── BASELINE_BUILD_GATE (v6) ── build baselines per segment (periodic, not every save)
-        # Only build baseline if this is a representative page and segments are assigned
-        # Baseline is built lazily — query functions trigger it when needed
-
-        # ── RELATIVE_ALERT_GATE (v6) ── fire alerts based on segment baseline
-        rel_alerts = _evaluate_relative_alert(c, domain_id, snap_id, job_id,
-                                               segment_ids, sc, i_crit)
-
-        # ── ALERT_TO_TICKET_GATE (v7) ── auto-create tickets from alerts
-        tickets_created = _alert_to_ticket(c, page_id, domain_id, snap_id, job_id, rs_id)
+        # ── alert / QA / segment / relative-alert / ticket gates (v16: deferred when routed) ──
+        page_gates = {"page_id": page_id, "domain_id": domain_id, "domain_name": domain_name,
+                      "snap_id": snap_id, "job_id": job_id, "rs_id": rs_id, "score": sc, "crit": i_crit,
+                      "score_delta": score_delta_val, "new_issues": new_issue_codes,
+                      "cluster_id": cluster_id, "is_new_page": not existing}
+        if not _catalog_deferred():
+            segment_ids, tickets_created = _catalog_page_gates(c, prof=prof, **page_gates)
 
         # ── COST_ACCOUNTING_GATE (v9) ── record costs for each stage
+        prof.mark("COST_ACCOUNTING_GATE")
         if job_id:
             record_cost(c, job_id, "FETCH", 1 + (html_size / 1024.0),
                         domain_id=domain_id, page_id=page_id, snap_id=snap_id,
@@ -3195,6 +5505,7 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
                             domain_id=domain_id, page_id=page_id, snap_id=snap_id)
 
         # ── BUDGET_EVAL_GATE (v9) ── check budget status
+        prof.mark("BUDGET_EVAL_GATE")
         budget_status = "OK"
         if job_id:
             budget_status, spent, limit_t = evaluate_budget(c, job_id)
@@ -3204,18 +5515,32 @@ def save_analysis(data, job_id=None, raw_html=None, headers=None, timings=None,
                      job_id=job_id, domain_id=domain_id, page_id=page_id, snap_id=snap_id)
 
         # ── DOMAIN_COST_TIER_GATE (v9) ── reclassify domain cost tier
+        prof.mark("DOMAIN_COST_TIER_GATE")
         if domain_id:
             compute_domain_cost_tier(c, domain_id)
 
-        _log(c, "AUDIT", "INFO", "SAVED",
-             f"score={sc} issues={len(issues)} cluster={cluster_id} sha={i_sha256[:12]} rule={rs_name} "
-             f"intent={intent_flags} tpl={tpl_family} seg={segment_ids} tickets={tickets_created} budget={budget_status}",
-             job_id=job_id, domain_id=domain_id, page_id=page_id, snap_id=snap_id)
+        prof.mark("EVENT_LOG")
+        saved = (f"score={sc} issues={len(issues)} cluster={cluster_id} sha={i_sha256[:12]} rule={rs_name} "
+                 f"intent={intent_flags} tpl={tpl_family}")
+        if _catalog_deferred():
+            # the drain runs the page gates, then logs SAVED with their results
+            _outbox(c, "PAGE_GATES", {**page_gates, "saved": saved, "budget": budget_status})
+        else:
+            _log(c, "AUDIT", "INFO", "SAVED",
+                 f"{saved} seg={segment_ids} tickets={tickets_created} budget={budget_status}",
+                 job_id=job_id, domain_id=domain_id, page_id=page_id, snap_id=snap_id)
 
+        # ── BULK_FLUSH_GATE (v16) ── buffered lineage/cost rows, same transaction
+        prof.mark("BULK_FLUSH_GATE")
+        flush_bulk_writes(c)
+        _bump_data_version(c)
+        prof.mark("COMMIT")
         conn.commit()
         return True, str(page_id), "SAVED"
     finally:
+        end_bulk_writes(conn)
         conn.close()
+        prof.finish()
 
 
 def _save_minimal(c, page_id, job_id, now, data, issue_codes, status_family, tm):
@@ -3231,16 +5556,48 @@ def _save_minimal(c, page_id, job_id, now, data, issue_codes, status_family, tm)
             c.execute('SELECT issue_id FROM issue WHERE code=?', (code,))
             r = c.fetchone()
             if r: c.execute('INSERT OR IGNORE INTO page_issue (snap_id,issue_id) VALUES (?,?)', (sid,r[0]))
+        _bump_data_version(c)
+
+
+_DELTA_FIELDS = ('title','meta_description','h1','canonical','robots_meta','jsonld_types_json','lang',
+                 'h1_count','h2_count','score_total','internal_links_count','external_links_count')
+_DELTA_INT_FIELDS = frozenset(('h1_count','h2_count','score_total','internal_links_count','external_links_count'))
+
+
+def _delta_stored(values):
+    """
+    _DELTA_FIELDS values as SQLite returns them after column affinity (TEXT / INTEGER),
+    or None when a value's round trip is not obvious and the row should be re-read.
+    """
+    out = []
+    for fld, v in zip(_DELTA_FIELDS, values):
+        if v is None:
+            out.append(v)
+        elif fld not in _DELTA_INT_FIELDS:
+            if not isinstance(v, str):
+                return None
+            out.append(v)
+        elif isinstance(v, int):
+            out.append(int(v))  # bool binds as 0/1
+        elif isinstance(v, float) and v == v:
+            out.append(int(v) if v.is_integer() and abs(v) < 2 ** 63 else v)
+        else:
+            return None
+    return tuple(out)
 
 
-def _compute_delta(c, page_id, from_sid, to_sid):
-    """Compute delta with v4 changed_flags. Returns delta info dict."""
-    flds = ['title','meta_description','h1','canonical','robots_meta','jsonld_types_json','lang',
-            'h1_count','h2_count','score_total','internal_links_count','external_links_count']
-    c.execute(f"SELECT {','.join(flds)} FROM page_snapshot WHERE snap_id=?", (from_sid,))
-    old = c.fetchone()
-    c.execute(f"SELECT {','.join(flds)} FROM page_snapshot WHERE snap_id=?", (to_sid,))
-    new = c.fetchone()
+def _compute_delta(c, page_id, from_sid, to_sid, old=None, new=None, old_issues=None, new_issues=None):
+    """
+    Compute delta with v4 changed_flags. Returns delta info dict.
+    v16: callers may pass either side's _DELTA_FIELDS row and issue-code set to skip the re-reads.
+    """
+    flds = list(_DELTA_FIELDS)
+    if old is None:
+        c.execute(f"SELECT {','.join(flds)} FROM page_snapshot WHERE snap_id=?", (from_sid,))
+        old = c.fetchone()
+    if new is None:
+        c.execute(f"SELECT {','.join(flds)} FROM page_snapshot WHERE snap_id=?", (to_sid,))
+        new = c.fetchone()
     if not old or not new: return None
 
     changed = {}
@@ -3270,10 +5627,13 @@ def _compute_delta(c, page_id, from_sid, to_sid):
     if link_changed:
         flags.append("LINK_GRAPH_CHANGED")
 
-    c.execute('SELECT i.code FROM page_issue pi JOIN issue i ON pi.issue_id=i.issue_id WHERE pi.snap_id=?', (from_sid,))
-    oi = {r[0] for r in c.fetchall()}
-    c.execute('SELECT i.code FROM page_issue pi JOIN issue i ON pi.issue_id=i.issue_id WHERE pi.snap_id=?', (to_sid,))
-    ni = {r[0] for r in c.fetchall()}
+    oi, ni = old_issues, new_issues
+    if oi is None:
+        c.execute('SELECT i.code FROM page_issue pi JOIN issue i ON pi.issue_id=i.issue_id WHERE pi.snap_id=?', (from_sid,))
+        oi = {r[0] for r in c.fetchall()}
+    if ni is None:
+        c.execute('SELECT i.code FROM page_issue pi JOIN issue i ON pi.issue_id=i.issue_id WHERE pi.snap_id=?', (to_sid,))
+        ni = {r[0] for r in c.fetchall()}
     added = sorted(ni-oi); removed = sorted(oi-ni)
     si = flds.index('score_total')
     sd = (new[si] or 0) - (old[si] or 0)
@@ -3286,15 +5646,199 @@ def _compute_delta(c, page_id, from_sid, to_sid):
              json.dumps({"flags": flags, "details": {k:v for k,v in changed.items() if not k.startswith("_")}}, ensure_ascii=False),
              json.dumps(added),json.dumps(removed),sd))
 
-    return {"score_delta": sd, "added": added, "removed": removed, "flags": flags}
+    return {"score_delta": sd, "added": added, "removed": removed, "flags": flags}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# v16 query result cache (data_version + TTL)
+# ═══════════════════════════════════════════════════════════════════════
+_QUERY_CACHE = {}          # (DB_PATH, cache_key) -> (data_version, expires_at, result_json)
+_QUERY_CACHE_STATS = {}    # query name -> {"hits", "db_hits", "misses", "stale"}
+_CACHED_QUERIES = {}       # query name -> (uncached fn, ttl)
+_CACHE_READERS = threading.local()  # per-thread {DB_PATH: autocommit connection} for version checks
+
+
+def _bump_data_version(c):
+    """DATA_VERSION_GATE (v16): invalidate every cached query result (call inside the write txn)."""
+    if _catalog_deferred():
+        _outbox(c, "VERSION", 1)
+        return
+    c.execute('''INSERT INTO data_version (name,version) VALUES ('GLOBAL',1)
+                 ON CONFLICT(name) DO UPDATE SET version=version+1,
+                   updated_at=strftime('%Y-%m-%dT%H:%M:%SZ','now')''')
+
+
+def bump_data_version():
+    conn = get_conn()
+    try:
+        _bump_data_version(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _cache_reader():
+    """
+    Long-lived autocommit connection (per thread, per DB) — a version check costs one indexed read.
+    In REPLICA mode it reads the replica (reopened when a refresh swaps the file), so cached
+    results are versioned exactly like the data they were computed from. Switching DB_PATH
+    closes the thread's other readers; close_cache_readers() closes them all.
+    """
+    conns = getattr(_CACHE_READERS, "conns", None)
+    if conns is None:
+        conns = _CACHE_READERS.conns = {}
+    path = _ensure_report_replica() if REPORT_MODE == "REPLICA" else None
+    ident = os.stat(path).st_ino if path else None
+    key = path or DB_PATH
+    ent = conns.get(key)
+    if ent is None or ent[1] != ident:
+        for old in list(conns.values()):
+            old[0].close()
+        conns.clear()
+        conn = _open_readonly(path) if path else sqlite3.connect(DB_PATH, timeout=30)
+        conn.isolation_level = None
+        ent = conns[key] = (conn, ident)
+    return ent[0]
+
+
+def close_cache_readers():
+    """Close this thread's version-check connections (reopened on the next cached query)."""
+    conns = getattr(_CACHE_READERS, "conns", None) or {}
+    for conn, _ in conns.values():
+        conn.close()
+    conns.clear()
+
+
+def _read_data_version(c=None):
+    # fetchall() so the statement completes and no read snapshot is left open
+    rows = (c or _cache_reader()).execute("SELECT version FROM data_version WHERE name='GLOBAL'").fetchall()
+    return rows[0][0] if rows else 0
+
+
+def _query_cache_key(name, sig, args, kwargs):
+    """Key on the bound arguments with defaults applied, so f(10), f(limit=10) and f() share entries."""
+    bound = sig.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return f"{name}:{json.dumps(list(bound.arguments.items()), default=str)}"
+
+
+def _cached_query(ttl=None):
+    """
+    QUERY_CACHE_GATE (v16): serve a reporting query from cache while data_version is unchanged
+    and the TTL has not expired. In-process entries first, then rows persisted by
+    warm_query_cache() (shared across processes), else run the query.
+    data_version moves on saves, job finish, segment assignment and (via triggers) any write to
+    DATA_VERSION_TRIGGER_TABLES; any other write a cached query reads shows up once the entry
+    expires, i.e. within `ttl` (default QUERY_CACHE_TTL_SECONDS).
+    """
+    import inspect
+
+    def wrap(fn):
+        name = fn.__name__
+        sig = inspect.signature(fn)
+        _CACHED_QUERIES[name] = (fn, ttl)
+
+        def cached(*args, **kwargs):
+            if not QUERY_CACHE_ENABLED:
+                return fn(*args, **kwargs)
+            key = _query_cache_key(name, sig, args, kwargs)
+            stats = _QUERY_CACHE_STATS.setdefault(name, {"hits": 0, "db_hits": 0, "misses": 0, "stale": 0})
+            now = time.time()
+            reader = _cache_reader()
+            version = _read_data_version(reader)
+            ent = _QUERY_CACHE.get((DB_PATH, key))
+            if ent and ent[0] == version and ent[1] > now:
+                stats["hits"] += 1
+                return json.loads(ent[2])
+            if ent:
+                stats["stale"] += 1
+            rows = reader.execute('''SELECT result_json,expires_at FROM query_result_cache
+                                     WHERE cache_key=? AND data_version=? AND expires_at>?''',
+                                  (key, version, now)).fetchall()
+            if rows:
+                stats["db_hits"] += 1
+                _query_cache_put(key, version, rows[0][1], rows[0][0])
+                return json.loads(rows[0][0])
+            stats["misses"] += 1
+            result = fn(*args, **kwargs)
+            payload = json.dumps(result, ensure_ascii=False, default=str)
+            _query_cache_put(key, version, now + (ttl or QUERY_CACHE_TTL_SECONDS), payload)
+            return json.loads(payload)
+
+        cached.__name__, cached.__doc__, cached.__wrapped__ = name, fn.__doc__, fn
+        return cached
+    return wrap
+
+
+def _query_cache_put(key, version, expires_at, payload):
+    _QUERY_CACHE.pop((DB_PATH, key), None)
+    _QUERY_CACHE[(DB_PATH, key)] = (version, expires_at, payload)
+    while len(_QUERY_CACHE) > QUERY_CACHE_MAX_ENTRIES:
+        del _QUERY_CACHE[next(iter(_QUERY_CACHE))]
+
+
+def warm_query_cache(names=None):
+    """
+    QUERY_CACHE_WARM_GATE (v16): precompute hot dashboards (default args) at the current
+    data_version and persist them so other processes get hits too. Returns names warmed.
+    """
+    import inspect
+    names = names or QUERY_CACHE_WARM_QUERIES
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        version = _read_data_version(_cache_reader())  # version of the data the queries will read
+        warmed = []
+        for name in names:
+            fn, ttl = _CACHED_QUERIES[name]
+            key = _query_cache_key(name, inspect.signature(fn), (), {})
+            expires_at = time.time() + (ttl or QUERY_CACHE_TTL_SECONDS)
+            payload = json.dumps(fn(), ensure_ascii=False, default=str)
+            c.execute('''INSERT OR REPLACE INTO query_result_cache
+                         (cache_key,query_name,data_version,result_json,expires_at) VALUES (?,?,?,?,?)''',
+                      (key, name, version, payload, expires_at))
+            _query_cache_put(key, version, expires_at, payload)
+            warmed.append(name)
+        c.execute('DELETE FROM query_result_cache WHERE data_version<? OR expires_at<=?',
+                  (version, time.time()))
+        conn.commit()
+        return warmed
+    finally:
+        conn.close()
+
+
+def clear_query_cache(persisted=True):
+    """Drop in-process cache entries (and persisted warm rows) for the current DB."""
+    for k in [k for k in _QUERY_CACHE if k[0] == DB_PATH]:
+        del _QUERY_CACHE[k]
+    close_cache_readers()
+    if persisted:
+        conn = get_conn()
+        try:
+            conn.execute('DELETE FROM query_result_cache')
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def query_cache_stats():
+    """Hit/miss counters per cached query (this process) plus the current data_version."""
+    rows = []
+    for name, s in sorted(_QUERY_CACHE_STATS.items()):
+        served = s["hits"] + s["db_hits"]
+        total = served + s["misses"]
+        rows.append({"query": name, **s, "hit_rate": round(served / total, 4) if total else 0})
+    return {"data_version": _read_data_version(), "entries": len(_QUERY_CACHE), "queries": rows}
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # QUERY LAYER v4
 # ═══════════════════════════════════════════════════════════════════════
+@_cached_query()
+@_shard_fanout(order=_score_order)
 def query_representative_leaderboard(order="DESC", limit=20):
     """Representative leaderboard (latest score_total) by domain — v4 uses is_representative."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute(f'''SELECT d.domain,d.tier,ps.score_total,p.url,ps.fetched_at,cc.cluster_key
@@ -3308,9 +5852,10 @@ def query_representative_leaderboard(order="DESC", limit=20):
     finally:
         conn.close()
 
+@_shard_fanout(key="code", sums=("count",), order=(("count", True),))
 def query_top_new_criticals(job_id=None):
     """Top new CRITICAL issues (last job) grouped by issue.code."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         if job_id is None:
@@ -3328,9 +5873,10 @@ def query_top_new_criticals(job_id=None):
     finally:
         conn.close()
 
+@_shard_fanout(order=(("size", True),))
 def query_cluster_inflation(min_size=5):
     """Canonical cluster inflation: clusters where size>=N."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT cc.cluster_id,cc.cluster_key,d.domain,cc.size,cc.representative_page_id,
@@ -3344,9 +5890,10 @@ def query_cluster_inflation(min_size=5):
     finally:
         conn.close()
 
+@_cached_query()
 def query_alert_feed(hours=24, severity=None):
     """Alert feed (last N hours) ordered by severity."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(hours=hours)).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -3371,9 +5918,10 @@ def query_alert_feed(hours=24, severity=None):
     finally:
         conn.close()
 
+@_cached_query()
 def query_sitemap_coverage():
     """Sitemap coverage: % of representative pages discovered via sitemap vs discovery."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT d.domain,
@@ -3390,8 +5938,10 @@ def query_sitemap_coverage():
         conn.close()
 
 # ── v3 queries retained ──
+@_cached_query()
+@_shard_fanout(order=_score_order)
 def query_score_leaderboard(order="DESC", limit=20):
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute(f'''SELECT d.domain,d.tier,ps.score_total,p.url,ps.fetched_at
@@ -3403,8 +5953,10 @@ def query_score_leaderboard(order="DESC", limit=20):
     finally:
         conn.close()
 
+@_cached_query()
+@_shard_fanout(merge=lambda parts: dict(sorted(kv for p in parts for kv in p.items())))
 def query_issue_heatmap():
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT d.domain,i.code,i.severity,COUNT(*) FROM page_issue pi
@@ -3420,8 +5972,10 @@ def query_issue_heatmap():
     finally:
         conn.close()
 
+@_cached_query()
+@_shard_fanout(order=(("critical_count", True),))
 def query_critical_rate_by_domain():
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT d.domain, d.tier,
@@ -3436,8 +5990,9 @@ def query_critical_rate_by_domain():
     finally:
         conn.close()
 
+@_shard_fanout(order=(("score_drops", True),))
 def query_rising_criticals(weeks=1):
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT d.domain, SUM(CASE WHEN sd.score_delta<0 THEN 1 ELSE 0 END) as drops,
@@ -3450,8 +6005,9 @@ def query_rising_criticals(weeks=1):
     finally:
         conn.close()
 
+@_shard_fanout(order=(("fail_count", True),))
 def query_repeated_parse_failures(min_retries=3):
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT p.url,d.domain,COUNT(*) as fail_count
@@ -3465,22 +6021,29 @@ def query_repeated_parse_failures(min_retries=3):
         conn.close()
 
 def query_304_ratio():
-    conn = get_conn()
+    """304 share of fetch-path events per domain. v16: includes events pruned into event_rollup."""
+    conn = get_report_conn()
     try:
         c = conn.cursor()
-        c.execute('''SELECT d.domain,
-            SUM(CASE WHEN el.code='HTTP_304' THEN 1 ELSE 0 END) as c304,
-            COUNT(*) as total
-            FROM event_log el JOIN domain d ON el.domain_id=d.domain_id
-            WHERE el.stage IN ('HTTP_COND_FETCH','FETCH','DEDUP','AUDIT')
+        c.execute('''SELECT d.domain, SUM(ev.c304) as c304, SUM(ev.total) as total
+            FROM (SELECT el.domain_id, SUM(CASE WHEN el.code='HTTP_304' THEN 1 ELSE 0 END) as c304,
+                         COUNT(*) as total
+                  FROM event_log el
+                  WHERE el.stage IN ('HTTP_COND_FETCH','FETCH','DEDUP','AUDIT') GROUP BY el.domain_id
+                  UNION ALL
+                  SELECT er.domain_id, SUM(CASE WHEN er.code='HTTP_304' THEN er.n ELSE 0 END), SUM(er.n)
+                  FROM event_rollup er
+                  WHERE er.stage IN ('HTTP_COND_FETCH','FETCH','DEDUP','AUDIT') GROUP BY er.domain_id) ev
+            JOIN domain d ON ev.domain_id=d.domain_id
             GROUP BY d.domain ORDER BY c304 DESC''')
         return [{"domain":r[0],"http_304":r[1],"total_events":r[2],
                  "ratio":round(r[1]/r[2]*100,1) if r[2] else 0} for r in c.fetchall()]
     finally:
         conn.close()
 
+@_shard_fanout(order=(("range", True),))
 def query_score_volatility(min_snapshots=2):
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT d.domain,d.tier,
@@ -3512,8 +6075,10 @@ def get_latest_reports(limit=10):
     finally:
         conn.close()
 
+@_cached_query()
+@_shard_fanout(owner="domain", order=(("avg", False),))
 def get_domain_summary():
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT d.domain,d.tier,d.default_ttl_hours,d.sitemap_url,d.quality_floor_score,
@@ -3530,6 +6095,128 @@ def get_domain_summary():
     finally:
         conn.close()
 
+_EXPORT_COL_TYPES = {
+    'h1_count': 'int', 'h2_count': 'int', 'words': 'int', 'int_links': 'int', 'ext_links': 'int',
+    'images': 'int', 'a11y_pct': 'float', 'jsonld': 'int', 'score': 'int',
+    'fetch_ms': 'int', 'parse_ms': 'int', 'audit_ms': 'int', 'fetched_at': 'ts',
+    'is_representative': 'bool', 'cluster_id': 'int',
+    'issues_count_critical': 'int', 'issues_count_warning': 'int', 'issues_count_info': 'int',
+}  # everything else is utf8
+_EXPORT_ALL_COLS = ['domain','tier','url','title','meta_desc','h1','h1_count','h2_count',
+                    'words','int_links','ext_links','images','a11y_pct','jsonld',
+                    'score','fetch_ms','parse_ms','audit_ms','fetched_at',
+                    'is_representative','cluster_id',
+                    'issues_sha256','issues_count_critical','issues_count_warning','issues_count_info',
+                    'intent_flags_json','template_family','issues']
+
+
+def _resolve_export_view(c, view_name):
+    """EXPORT_VIEW_GATE: returns (view_id, export_cols, col_indices)."""
+    view = get_export_view(c, view_name)
+    if not view:
+        view = get_export_view(c, "INTERNAL")  # fallback
+    view_id = view["view_id"] if view else None
+    allowed_fields = set(view["allowed_fields"]) if view else set()
+    if allowed_fields:
+        col_indices = [i for i, col in enumerate(_EXPORT_ALL_COLS) if col in allowed_fields]
+    else:
+        col_indices = list(range(len(_EXPORT_ALL_COLS)))
+    return view_id, [_EXPORT_ALL_COLS[i] for i in col_indices], col_indices
+
+
+def _iter_export_rows(c, view_name, col_indices, stats, chunk=None):
+    """
+    Stream latest-snapshot export rows through the v8 gates, one fetchmany()
+    chunk at a time: PUBLIC_EXPORT_FLOOR_GATE, column filter, REDACTION_GATE.
+    stats["redaction_applied"] / stats["row_count"] / stats["redaction_hits"]
+    are updated in place; redaction rules are compiled once per export, eagerly, so an
+    invalid rule fails the export before any artifact is written.
+    """
+    redactor = load_redaction_engine(c, "EXPORT")
+    stats["redaction_hits"] = redactor.hits
+    return _stream_export_rows(c, redactor, view_name, col_indices, stats, chunk)
+
+
+def _stream_export_rows(c, redactor, view_name, col_indices, stats, chunk):
+    c.execute('''SELECT d.domain,d.tier,p.url,ps.title,ps.meta_description,ps.h1,ps.h1_count,
+        ps.h2_count,ps.word_count,ps.internal_links_count,ps.external_links_count,
+        ps.images_count,ps.a11y_alt_coverage_pct,ps.jsonld_count,ps.score_total,
+        ps.fetch_ms,ps.parse_ms,ps.audit_ms,ps.fetched_at,
+        p.is_representative,p.cluster_id,
+        ps.issues_sha256,ps.issues_count_critical,ps.issues_count_warning,ps.issues_count_info,
+        ps.intent_flags_json,ps.template_family,
+        GROUP_CONCAT(i.code,'; ')
+        FROM page_snapshot ps JOIN page p ON ps.page_id=p.page_id
+        LEFT JOIN domain d ON p.domain_id=d.domain_id
+        LEFT JOIN page_issue pi ON ps.snap_id=pi.snap_id
+        LEFT JOIN issue i ON pi.issue_id=i.issue_id
+        WHERE ps.snap_id=(SELECT MAX(s2.snap_id) FROM page_snapshot s2 WHERE s2.page_id=ps.page_id)
+        GROUP BY ps.snap_id ORDER BY ps.score_total ASC''')
+    domain_count = {}
+    while True:
+        rows = c.fetchmany(chunk or EXPORT_FETCH_CHUNK)
+        if not rows:
+            break
+        for row in rows:
+            # ── PUBLIC_EXPORT_FLOOR_GATE (v8) ── cap URL samples per domain for PUBLIC view
+            if view_name == "PUBLIC":
+                dom = row[0] or "unknown"
+                domain_count[dom] = domain_count.get(dom, 0) + 1
+                if domain_count[dom] > PUBLIC_URL_SAMPLE_CAP:
+                    continue
+            # ── REDACTION_GATE (v8) ── apply redaction rules to text fields
+            new_row = []
+            for idx in col_indices:
+                val = row[idx]
+                if isinstance(val, str) and val:
+                    redacted = redactor.apply(val)
+                    if redacted != val:
+                        stats["redaction_applied"] = 1
+                    val = redacted
+                new_row.append(val)
+            stats["row_count"] += 1
+            yield new_row
+
+
+class _HashingTextSink:
+    """Text sink for csv.writer: encodes to a binary file and hashes bytes as written."""
+
+    def __init__(self, fh, encoding="utf-8"):
+        self._fh = fh
+        self._encoding = encoding
+        self.sha = hashlib.sha256()
+
+    def write(self, text):
+        data = text.encode(self._encoding)
+        self._fh.write(data)
+        self.sha.update(data)
+        return len(text)
+
+
+def _record_export(c, job_id, export_type, output_path, stats, artifact_sha, view_id, view_name):
+    """AUDIT_TRAIL_GATE + COST_ACCOUNTING_GATE for a finished export. Returns export_id."""
+    public_sha = artifact_sha if view_name == "PUBLIC" else None
+    c.execute('''INSERT INTO export_job (job_id,export_type,output_path,row_count,artifact_sha256,
+                 view_id,redaction_applied,public_artifact_sha256)
+                 VALUES (?,?,?,?,?,?,?,?)''',
+              (job_id, export_type, output_path, stats["row_count"], artifact_sha,
+               view_id, stats["redaction_applied"], public_sha))
+    export_id = c.lastrowid
+    # ── REDACTION_HIT_GATE (v16) ── per-rule hit counts for this export
+    hits = [(export_id, rid, "EXPORT", h[0], h[1])
+            for rid, h in (stats.get("redaction_hits") or {}).items() if h[0]]
+    if hits:
+        c.executemany('''INSERT INTO redaction_hit (export_id,rid,scope,cells_matched,matches)
+                         VALUES (?,?,?,?,?)''', hits)
+    # Bind policy to export
+    bind_policy(c, 'EXPORT', export_id)
+    # ── COST_ACCOUNTING_GATE (v9) ── record export cost
+    if job_id:
+        record_cost(c, job_id, "EXPORT", stats["row_count"],
+                    meta={"view": view_name, "redacted": bool(stats["redaction_applied"])})
+    return export_id
+
+
 def export_csv(output_path=None, job_id=None, view_name="INTERNAL"):
     """
     Export CSV with v8 gate enforcement:
@@ -3537,112 +6224,239 @@ def export_csv(output_path=None, job_id=None, view_name="INTERNAL"):
       REDACTION_GATE    → apply redaction rules to text fields
       PUBLIC_EXPORT_FLOOR_GATE → cap URL samples for PUBLIC view
       AUDIT_TRAIL_GATE  → record export with policy binding + artifact hash
+    v16: rows stream from the cursor in EXPORT_FETCH_CHUNK batches and the
+    artifact hash is computed over the bytes as they are written (flat memory).
     """
     import csv
     if not output_path:
         suffix = f"_{view_name.lower()}" if view_name != "INTERNAL" else ""
         output_path = os.path.join(os.path.dirname(DB_PATH), f"report_export_v8{suffix}.csv")
     conn = get_conn()
+    rconn = get_report_conn()  # v16: row scan may run on the reporting replica
     try:
-        c = conn.cursor()
+        c = rconn.cursor()
 
         # ── EXPORT_VIEW_GATE (v8) ── resolve view definition
-        view = get_export_view(c, view_name)
-        if not view:
-            view = get_export_view(c, "INTERNAL")  # fallback
-        view_id = view["view_id"] if view else None
-        allowed_fields = set(view["allowed_fields"]) if view else set()
-
-        # Full query — all columns available
-        all_cols = ['domain','tier','url','title','meta_desc','h1','h1_count','h2_count',
-                    'words','int_links','ext_links','images','a11y_pct','jsonld',
-                    'score','fetch_ms','parse_ms','audit_ms','fetched_at',
-                    'is_representative','cluster_id',
-                    'issues_sha256','issues_count_critical','issues_count_warning','issues_count_info',
-                    'intent_flags_json','template_family','issues']
-        c.execute('''SELECT d.domain,d.tier,p.url,ps.title,ps.meta_description,ps.h1,ps.h1_count,
-            ps.h2_count,ps.word_count,ps.internal_links_count,ps.external_links_count,
-            ps.images_count,ps.a11y_alt_coverage_pct,ps.jsonld_count,ps.score_total,
-            ps.fetch_ms,ps.parse_ms,ps.audit_ms,ps.fetched_at,
-            p.is_representative,p.cluster_id,
-            ps.issues_sha256,ps.issues_count_critical,ps.issues_count_warning,ps.issues_count_info,
-            ps.intent_flags_json,ps.template_family,
-            GROUP_CONCAT(i.code,'; ')
-            FROM page_snapshot ps JOIN page p ON ps.page_id=p.page_id
-            LEFT JOIN domain d ON p.domain_id=d.domain_id
-            LEFT JOIN page_issue pi ON ps.snap_id=pi.snap_id
-            LEFT JOIN issue i ON pi.issue_id=i.issue_id
-            WHERE ps.snap_id=(SELECT MAX(s2.snap_id) FROM page_snapshot s2 WHERE s2.page_id=ps.page_id)
-            GROUP BY ps.snap_id ORDER BY ps.score_total ASC''')
-        raw_rows = c.fetchall()
-
-        # ── PUBLIC_EXPORT_FLOOR_GATE (v8) ── cap URL samples per domain for PUBLIC view
-        if view_name == "PUBLIC":
-            domain_count = {}
-            filtered_rows = []
-            for row in raw_rows:
-                dom = row[0] or "unknown"
-                domain_count[dom] = domain_count.get(dom, 0) + 1
-                if domain_count[dom] <= PUBLIC_URL_SAMPLE_CAP:
-                    filtered_rows.append(row)
-            raw_rows = filtered_rows
-
-        # Filter columns by view
-        if allowed_fields:
-            col_indices = [i for i, col in enumerate(all_cols) if col in allowed_fields]
-            export_cols = [all_cols[i] for i in col_indices]
+        view_id, export_cols, col_indices = _resolve_export_view(c, view_name)
+
+        stats = {"row_count": 0, "redaction_applied": 0}
+        rows = _iter_export_rows(c, view_name, col_indices, stats)
+        with open(output_path, 'wb') as fh:
+            sink = _HashingTextSink(fh)
+            sink.write('\ufeff')  # utf-8-sig BOM, part of the hashed artifact
+            w = csv.writer(sink)
+            w.writerow(export_cols)
+            w.writerows(rows)
+
+        # ── AUDIT_TRAIL_GATE (v8) ── record export with policy binding + hashes
+        _record_export(conn.cursor(), job_id, 'CSV', output_path, stats,
+                       sink.sha.hexdigest(), view_id, view_name)
+        conn.commit()
+        return output_path, stats["row_count"]
+    finally:
+        rconn.close()
+        conn.close()
+
+
+def _columnar_value(kind, val):
+    """Coerce one SQLite cell to the python type of its Arrow column (None on mismatch)."""
+    if val is None:
+        return None
+    try:
+        if kind == 'int':
+            return int(val)
+        if kind == 'float':
+            return float(val)
+        if kind == 'bool':
+            return bool(int(val))
+        if kind == 'ts':
+            return datetime.datetime.strptime(val, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=datetime.timezone.utc)
+    except (TypeError, ValueError):
+        return None
+    return val
+
+
+def _partition_dir(export_cols, row, partition_by):
+    """Hive-style partition path (domain=<d>/date=<YYYY-MM-DD>) for one export row."""
+    parts = []
+    for key in partition_by:
+        if key == "date":
+            ts = row[export_cols.index("fetched_at")]
+            val = ts[:10] if isinstance(ts, str) and ts else "unknown"
         else:
-            col_indices = list(range(len(all_cols)))
-            export_cols = all_cols
+            val = row[export_cols.index(key)] or "unknown"
+        parts.append(f"{key}={quote(str(val), safe='')}")
+    return os.path.join(*parts)
 
-        # ── REDACTION_GATE (v8) ── apply redaction rules to text fields
-        redaction_applied = 0
-        export_rows = []
-        for row in raw_rows:
-            new_row = []
-            for idx in col_indices:
-                val = row[idx]
-                if isinstance(val, str) and val:
-                    redacted = apply_redaction(val, scope="EXPORT")
-                    if redacted != val:
-                        redaction_applied = 1
-                    val = redacted
-                new_row.append(val)
-            export_rows.append(new_row)
 
-        with open(output_path, 'w', newline='', encoding='utf-8-sig') as f:
-            w = csv.writer(f)
-            w.writerow(export_cols)
-            w.writerows(export_rows)
+def export_columnar(output_path=None, job_id=None, view_name="INTERNAL", fmt="PARQUET",
+                    partition_by=None, row_group_size=EXPORT_ROW_GROUP_SIZE):
+    """
+    Typed columnar export (Parquet with row-group statistics, or Arrow IPC file).
+    Same v8 gates as export_csv — EXPORT_VIEW_GATE, PUBLIC_EXPORT_FLOOR_GATE,
+    REDACTION_GATE — streamed in row groups; AUDIT_TRAIL_GATE records export_type=fmt.
+    partition_by: None | "domain" | "date" | ("domain","date") → output_path is a
+    directory of hive-style partitions plus _manifest.json, whose sha256 is the artifact hash.
+    At most EXPORT_MAX_OPEN_PARTITIONS partitions hold a writer and row buffer; the least recently
+    used is flushed and closed, and continues in its next part-N file if its rows come back.
+    Requires pyarrow.
+    """
+    fmt = fmt.upper()
+    if fmt not in EXPORT_COLUMNAR_FORMATS:
+        raise ValueError(f"fmt must be one of {EXPORT_COLUMNAR_FORMATS}")
+    if isinstance(partition_by, str):
+        partition_by = (partition_by,)
+    partition_by = tuple(partition_by or ())
+    if any(k not in EXPORT_PARTITION_KEYS for k in partition_by):
+        raise ValueError(f"partition_by keys must be in {EXPORT_PARTITION_KEYS}")
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow is required for PARQUET/ARROW export (pip install pyarrow)")
 
-        # ── AUDIT_TRAIL_GATE (v8) ── record export with policy binding + hashes
-        file_bytes = open(output_path, 'rb').read()
-        artifact_sha = hashlib.sha256(file_bytes).hexdigest()
-        public_sha = artifact_sha if view_name == "PUBLIC" else None
-        c.execute('''INSERT INTO export_job (job_id,export_type,output_path,row_count,artifact_sha256,
-                     view_id,redaction_applied,public_artifact_sha256)
-                     VALUES (?,?,?,?,?,?,?,?)''',
-                  (job_id, 'CSV', output_path, len(export_rows), artifact_sha,
-                   view_id, redaction_applied, public_sha))
-        export_id = c.lastrowid
-        # Bind policy to export
-        bind_policy(c, 'EXPORT', export_id)
-        # ── COST_ACCOUNTING_GATE (v9) ── record export cost
-        if job_id:
-            record_cost(c, job_id, "EXPORT", len(export_rows),
-                        meta={"view": view_name, "redacted": bool(redaction_applied)})
+    ext = ".parquet" if fmt == "PARQUET" else ".arrow"
+    if not output_path:
+        suffix = f"_{view_name.lower()}" if view_name != "INTERNAL" else ""
+        output_path = os.path.join(os.path.dirname(DB_PATH),
+                                   f"report_export_v16{suffix}" + ("" if partition_by else ext))
+    conn = get_conn()
+    rconn = get_report_conn()  # v16: row scan may run on the reporting replica
+    try:
+        c = rconn.cursor()
+
+        # ── EXPORT_VIEW_GATE (v8) ── resolve view definition
+        view_id, export_cols, col_indices = _resolve_export_view(c, view_name)
+        needed = {"fetched_at" if k == "date" else k for k in partition_by}
+        if not needed <= set(export_cols):
+            raise ValueError(f"partition columns {sorted(needed)} not in view {view_name}")
+
+        # hive convention: partition columns live in the path, not in the files
+        file_idx = [i for i, col in enumerate(export_cols) if col not in partition_by]
+        arrow_types = {'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_(),
+                       'ts': pa.timestamp('s', tz='UTC')}
+        kinds = [_EXPORT_COL_TYPES.get(export_cols[i], 'str') for i in file_idx]
+        schema = pa.schema([pa.field(export_cols[i], arrow_types.get(k, pa.string()))
+                            for i, k in zip(file_idx, kinds)],
+                           metadata={"seobaike.view": view_name, "seobaike.export": "v16"})
+
+        def _open(path):
+            if fmt == "PARQUET":
+                return pq.ParquetWriter(path, schema, write_statistics=True)
+            return pa.ipc.new_file(path, schema)
+
+        def _write(writer, rows):
+            cols = [[r[i] for r in rows] for i in file_idx]
+            arrays = [pa.array([_columnar_value(k, v) for v in col] if k != 'str' else col, type=f.type)
+                      for col, k, f in zip(cols, kinds, schema)]
+            batch = pa.record_batch(arrays, schema=schema)
+            if fmt == "PARQUET":
+                writer.write_batch(batch, row_group_size=row_group_size)
+            else:
+                writer.write_batch(batch)
+
+        from collections import OrderedDict
+        stats = {"row_count": 0, "redaction_applied": 0}
+        live = OrderedDict()  # partition key -> [writer | None, row buffer], least recently used first
+        files, parts = [], {}
+
+        # partitions are written to a sibling staging dir and swapped in whole, so files of an
+        # earlier export into the same directory never sit next to this export's partitions
+        stage_path = f"{os.path.abspath(output_path)}.tmp-{os.getpid()}" if partition_by else None
+
+        def _flush(key, entry):
+            if entry[0] is None:
+                n = parts[key] = parts.get(key, -1) + 1
+                path = os.path.join(stage_path, key, f"part-{n}" + ext) if partition_by else output_path
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                entry[0] = _open(path)
+                files.append(path)
+            if entry[1]:
+                _write(entry[0], entry[1])
+                entry[1] = []
+
+        import shutil
+        rows = _iter_export_rows(c, view_name, col_indices, stats)
+        if partition_by:
+            shutil.rmtree(stage_path, ignore_errors=True)
+            os.makedirs(stage_path)
+        try:
+            for row in rows:
+                key = _partition_dir(export_cols, row, partition_by) if partition_by else ""
+                entry = live.get(key)
+                if entry is None:
+                    if len(live) >= EXPORT_MAX_OPEN_PARTITIONS:
+                        old_key, old = live.popitem(last=False)
+                        _flush(old_key, old)
+                        old[0].close()
+                    entry = live[key] = [None, []]
+                else:
+                    live.move_to_end(key)
+                entry[1].append(row)
+                if len(entry[1]) >= row_group_size:
+                    _flush(key, entry)
+            for key, entry in live.items():
+                _flush(key, entry)
+            if not partition_by and not files:
+                live[""] = [None, []]
+                _flush("", live[""])  # empty export still yields a valid file
+        except BaseException:
+            for entry in live.values():
+                if entry[0] is not None:
+                    entry[0].close()
+            if partition_by:
+                shutil.rmtree(stage_path, ignore_errors=True)
+            raise
+        for entry in live.values():
+            if entry[0] is not None:
+                entry[0].close()
+        if partition_by:
+            # a non-empty directory cannot be replaced directly: move the old one aside first
+            old_path = None
+            if os.path.lexists(output_path):
+                old_path = f"{os.path.abspath(output_path)}.old-{os.getpid()}"
+                os.replace(output_path, old_path)
+            os.replace(stage_path, output_path)
+            files = [os.path.join(output_path, os.path.relpath(f, stage_path)) for f in files]
+            if old_path:
+                if os.path.isdir(old_path):
+                    shutil.rmtree(old_path, ignore_errors=True)
+                else:
+                    os.remove(old_path)
+
+        # ── AUDIT_TRAIL_GATE (v8) ── artifact hash: file bytes, or manifest of partition files
+        def _file_sha(path):
+            h = hashlib.sha256()
+            with open(path, 'rb') as fh:
+                for block in iter(lambda: fh.read(1 << 20), b""):
+                    h.update(block)
+            return h.hexdigest()
+
+        if partition_by:
+            manifest = {"format": fmt, "view": view_name, "partition_by": list(partition_by),
+                        "files": [{"path": os.path.relpath(f, output_path).replace(os.sep, "/"),
+                                   "sha256": _file_sha(f)} for f in sorted(files)]}
+            m_bytes = json.dumps(manifest, sort_keys=True, indent=1).encode()
+            with open(os.path.join(output_path, "_manifest.json"), 'wb') as fh:
+                fh.write(m_bytes)
+            artifact_sha = hashlib.sha256(m_bytes).hexdigest()
+        else:
+            artifact_sha = _file_sha(output_path)
+        _record_export(conn.cursor(), job_id, fmt, output_path, stats, artifact_sha, view_id, view_name)
         conn.commit()
-        return output_path, len(export_rows)
+        return output_path, stats["row_count"]
     finally:
+        rconn.close()
         conn.close()
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # v5 starter queries
 # ═══════════════════════════════════════════════════════════════════════
+@_shard_fanout(order=(("checked_at", True),))
 def query_drift_report(limit=50):
     """Drift report: pages where determinism failed (same DOM, different issues)."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT dc.check_id,p.url,d.domain,dc.issues_sha256_a,dc.issues_sha256_b,
@@ -3662,9 +6476,11 @@ def query_drift_report(limit=50):
         conn.close()
 
 
+@_shard_fanout(order=((lambda r: {"ALERT_FIRED": 0, "VOLATILE": 1, "NEW_DOMAIN": 2}.get(r["reason"], 3), False),
+                      ("created_at", True)))
 def query_qa_queue(status="PENDING", limit=50):
     """QA queue: snapshots awaiting human review."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT qs.sample_id,qs.reason,qs.status,qs.created_at,
@@ -3688,7 +6504,7 @@ def query_qa_queue(status="PENDING", limit=50):
 
 def query_export_audit_trail(limit=20):
     """Export audit trail: all report exports with artifact hashes."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT ej.export_id,ej.export_type,ej.output_path,ej.row_count,
@@ -3701,9 +6517,10 @@ def query_export_audit_trail(limit=20):
         conn.close()
 
 
+@_shard_fanout(key="rule_set_id", sums=("snapshot_count",), order=(("rule_set_id", True),))
 def query_rule_set_history():
     """Rule set history: all golden_rule versions with active/frozen status."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT gr.rule_set_id,gr.name,gr.version,gr.is_active,gr.frozen_at,
@@ -3721,9 +6538,12 @@ def query_rule_set_history():
 # ═══════════════════════════════════════════════════════════════════════
 # v6 starter queries
 # ═══════════════════════════════════════════════════════════════════════
+@_cached_query()
+@_shard_fanout(order=lambda a: (("segment", False),) + _score_order(a),
+               limit=lambda a: a["limit"] if a["segment_name"] else a["limit"] * 3)
 def query_segment_leaderboard(segment_name=None, order="DESC", limit=10):
     """Segment leaderboard: top/bottom domains by score_total within a segment."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         if segment_name:
@@ -3754,7 +6574,7 @@ def query_segment_leaderboard(segment_name=None, order="DESC", limit=10):
 
 def query_baseline_view(segment_name=None, window_days=30):
     """Baseline view: p50/p75/p90 of score_total by segment."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         if segment_name:
@@ -3773,7 +6593,7 @@ def query_baseline_view(segment_name=None, window_days=30):
 
 def query_outliers():
     """Outliers list: domains flagged is_outlier=1."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT d.domain,d.tier,d.is_outlier,d.outlier_reason,
@@ -3791,7 +6611,7 @@ def query_outliers():
 
 def query_pair_report_history(limit=20):
     """Pair report history: export_job where type=PAIR_REPORT."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT ej.export_id,ej.output_path,ej.row_count,ej.artifact_sha256,
@@ -3809,7 +6629,7 @@ def query_pair_report_history(limit=20):
 # ═══════════════════════════════════════════════════════════════════════
 def query_kpi_timeseries(kpi_key, scope="DOMAIN", scope_id=None, limit=30):
     """KPI time series: history of a KPI value over time."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         if scope_id:
@@ -3828,9 +6648,11 @@ def query_kpi_timeseries(kpi_key, scope="DOMAIN", scope_id=None, limit=30):
         conn.close()
 
 
+@_shard_fanout(key="tid", order=((lambda r: {"CRITICAL": 0, "WARNING": 1}.get(r["severity"], 2), False),
+                                ("opened_at", True)))
 def query_ticket_board(status=None, severity=None, limit=50):
     """Ticket board: fix_tickets with evidence counts."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         where = ["1=1"]
@@ -3860,7 +6682,7 @@ def query_ticket_board(status=None, severity=None, limit=50):
 
 def query_ticket_evidence(tid):
     """Ticket evidence chain: all linked artifacts."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT tl.kind,tl.ref_id,tl.created_at FROM ticket_link tl
@@ -3883,6 +6705,9 @@ def query_ticket_evidence(tid):
             elif kind == 'EVENT':
                 c.execute('SELECT el.stage,el.code,el.message,el.ts FROM event_log el WHERE el.eid=?', (ref_id,))
                 r = c.fetchone()
+                if r is None:  # v16: linked after retention archived it
+                    ev = _archived_event(c, ref_id)
+                    r = ev and (ev["stage"], ev["code"], ev["message"], ev["ts"])
                 if r: detail = {"stage": r[0], "code": r[1], "message": r[2], "ts": r[3]}
             links.append({"kind": kind, "ref_id": ref_id, "created_at": created_at, "detail": detail})
         return links
@@ -3890,9 +6715,10 @@ def query_ticket_evidence(tid):
         conn.close()
 
 
+@_cached_query()
 def query_kpi_dashboard(scope="SEGMENT"):
     """KPI dashboard: latest value for all enabled KPIs, grouped by scope."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT kd.key,kd.name,kd.direction,kd.unit,kv.value,kv.as_of_date,
@@ -4096,6 +6922,9 @@ def compute_data_quality_daily(scope="GLOBAL", scope_id=None):
              audit_incomplete_rate,parse_fail_rate,fetch_not_html_rate)
             VALUES (?,?,?,?,?,?,?,?)''',
             (today, rs_id, scope, scope_id, pass_rate, incomplete_rate, parse_rate, html_rate))
+        # ── KPI_STREAM_GATE (v16) ──
+        _kpi_stream_update(c, "parse_fail_rate", scope, scope_id, parse_rate, today)
+        _kpi_stream_update(c, "audit_incomplete_rate", scope, scope_id, incomplete_rate, today)
         conn.commit()
         return {"date": today, "total": total, "pass_rate": pass_rate,
                 "incomplete_rate": incomplete_rate, "parse_fail_rate": parse_rate,
@@ -4111,14 +6940,22 @@ def write_lineage_edge(c, from_kind, from_id, to_kind, to_id, edge_type, job_id=
     """
     LINEAGE_WRITE_GATE: record a directed edge in the data lineage graph.
     Idempotent — duplicate edges are silently ignored.
+    v16: buffered (returns None) while begin_bulk_writes() is active on the connection.
     """
     if edge_type not in LINEAGE_EDGE_TYPES:
         return None
-    c.execute('''INSERT OR IGNORE INTO lineage_edge
-        (from_kind,from_id,to_kind,to_id,edge_type,job_id,meta_json)
-        VALUES (?,?,?,?,?,?,?)''',
-        (from_kind, from_id, to_kind, to_id, edge_type, job_id,
-         json.dumps(meta, ensure_ascii=False) if meta else None))
+    row = (from_kind, from_id, to_kind, to_id, edge_type, job_id,
+           json.dumps(meta, ensure_ascii=False) if meta else None)
+    buf = _bulk_buffer(c)
+    if buf is not None:
+        buf["lineage"].append(row)
+        if len(buf["cost"]) + len(buf["lineage"]) >= BULK_WRITE_FLUSH_ROWS:
+            flush_bulk_writes(c)
+        return None
+    if _catalog_deferred():
+        _outbox(c, "LINEAGE", [row])
+        return None
+    c.execute(_LINEAGE_INSERT, row)
     return c.lastrowid
 
 
@@ -4127,6 +6964,7 @@ def build_sample_set(name=None, strategy=None, sample_size=None,
     """
     SAMPLE_SET_BUILD_GATE: create or refresh a monitoring sample set.
     Returns ssid.
+    v16: RANDOM/STRATIFIED refreshes update the persistent reservoir in place.
     """
     conn = get_conn()
     try:
@@ -4138,7 +6976,8 @@ def build_sample_set(name=None, strategy=None, sample_size=None,
         rd = refresh_days or tpl["refresh_interval_days"]
 
         # Get or create
-        c.execute('SELECT ssid FROM snapshot_sample_set WHERE name=? AND (rule_set_id IS NULL OR rule_set_id=?)',
+        c.execute('''SELECT ssid,strategy,segment_id FROM snapshot_sample_set
+                     WHERE name=? AND (rule_set_id IS NULL OR rule_set_id=?)''',
                   (sname, rule_set_id))
         row = c.fetchone()
         now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -4148,8 +6987,9 @@ def build_sample_set(name=None, strategy=None, sample_size=None,
             c.execute('''UPDATE snapshot_sample_set SET strategy=?,sample_size=?,
                 segment_id=?,refresh_interval_days=?,last_refreshed_at=?,is_active=1
                 WHERE ssid=?''', (strat, sz, segment_id, rd, now, ssid))
-            # Clear old members on refresh
-            c.execute('DELETE FROM sample_member WHERE ssid=?', (ssid,))
+            # Population definition changed → start the reservoir over
+            if (row[1], row[2]) != (strat, segment_id):
+                _reset_sample_reservoir(c, ssid)
         else:
             c.execute('''INSERT INTO snapshot_sample_set
                 (name,description,strategy,sample_size,rule_set_id,segment_id,
@@ -4167,37 +7007,189 @@ def build_sample_set(name=None, strategy=None, sample_size=None,
         conn.close()
 
 
-def populate_sample_members(c, ssid, strategy, sample_size, segment_id=None):
-    """Populate sample set members from eligible pages."""
-    now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+def _reset_sample_reservoir(c, ssid):
+    c.execute('DELETE FROM sample_member WHERE ssid=?', (ssid,))
+    c.execute('DELETE FROM sample_stratum WHERE ssid=?', (ssid,))
+    c.execute('UPDATE snapshot_sample_set SET reservoir_hwm=0,reservoir_marks_json=NULL WHERE ssid=?', (ssid,))
+
 
+def _sample_population_sql(strategy, segment_id=None):
+    """(sql, params) yielding (page_id, stratum) for every page eligible for a sample set."""
     if strategy == "STRATIFIED" and segment_id:
-        # Stratified by segment: pick representative pages from segment
-        c.execute('''SELECT p.page_id FROM page p
-            JOIN domain_segment ds ON p.domain_id=ds.domain_id
-            WHERE ds.segment_id=? AND p.is_representative=1
-            ORDER BY p.last_seen_at DESC LIMIT ?''', (segment_id, sample_size))
-    elif strategy == "TOP_N":
-        # Top N by recency among representative pages
-        c.execute('''SELECT page_id FROM page
-            WHERE is_representative=1
-            ORDER BY last_seen_at DESC LIMIT ?''', (sample_size,))
-    else:
-        # Random or default: random representative pages
-        c.execute('''SELECT page_id FROM page
-            WHERE is_representative=1
-            ORDER BY RANDOM() LIMIT ?''', (sample_size,))
+        # Within one segment: stratify by domain
+        return ('''SELECT p.page_id AS page_id, p.domain_id AS stratum FROM page p
+                   JOIN domain_segment ds ON p.domain_id=ds.domain_id
+                   WHERE ds.segment_id=? AND p.is_representative=1''', [segment_id])
+    if strategy == "STRATIFIED":
+        # Across the fleet: stratify by segment (0 = unsegmented domains)
+        return ('''SELECT p.page_id AS page_id,
+                          COALESCE((SELECT MIN(ds.segment_id) FROM domain_segment ds
+                                    WHERE ds.domain_id=p.domain_id), 0) AS stratum
+                   FROM page p WHERE p.is_representative=1''', [])
+    return ('SELECT page_id, 0 AS stratum FROM page WHERE is_representative=1', [])
+
+
+def _sample_key(ssid, page_id):
+    """Deterministic uniform key in [0,1) — the reservoir keeps the smallest keys per stratum."""
+    h = hashlib.blake2b(f"{ssid}:{page_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(h, 'big') / 2 ** 64
+
+
+_POP_SIG_P1, _POP_SIG_P2, _POP_SIG_M = 2147483629, 2147483587, 4294967291
+
+
+def _pop_sig_term(page_id):
+    """Non-linear per-page term of a stratum fingerprint (mirrors the SQL in _refresh_sample_reservoir)."""
+    return (page_id % _POP_SIG_P1) * (page_id % _POP_SIG_P2) % _POP_SIG_M
+
+
+def _stratum_quotas(pops, sample_size):
+    """Proportional allocation of sample_size over strata (largest remainder, sums exactly)."""
+    total = sum(pops.values())
+    if total <= sample_size:
+        return dict(pops)
+    raw = {s: sample_size * n / total for s, n in pops.items()}
+    quotas = {s: int(v) for s, v in raw.items()}
+    short = sample_size - sum(quotas.values())
+    for s in sorted(raw, key=lambda s: (quotas[s] - raw[s], s))[:short]:
+        quotas[s] += 1
+    return quotas
+
+
+def _refresh_sample_reservoir(c, ssid, strategy, sample_size, segment_id=None):
+    """
+    SAMPLE_RESERVOIR_GATE (v16): maintain a stratified bottom-k reservoir incrementally.
+    Each stratum keeps the `quota` eligible pages with the smallest _sample_key, so the result
+    equals a full rebuild; only pages above the per-shard reservoir marks are offered. A stratum
+    is rescanned when its quota grows past what it holds, or when its population fingerprint
+    (count, Σpage_id mod p, Σ_pop_sig_term) is not last refresh's plus the offered pages — i.e. pages
+    became (non-)representative, changed stratum or were deleted.
+    """
+    pop_sql, pop_params = _sample_population_sql(strategy, segment_id)
+
+    c.execute('SELECT reservoir_hwm,reservoir_marks_json FROM snapshot_sample_set WHERE ssid=?', (ssid,))
+    r = c.fetchone()
+    marks = _load_id_marks(r[1], r[0]) if r else {}
+    c.execute('SELECT EXISTS(SELECT 1 FROM sample_member WHERE ssid=? AND sample_key IS NULL)', (ssid,))
+    if c.fetchone()[0]:
+        # Members from a pre-reservoir full rebuild — adopt by rebuilding once
+        _reset_sample_reservoir(c, ssid)
+        marks = {}
+
+    # Drop members that left the eligible population (or moved stratum)
+    c.execute(f'''DELETE FROM sample_member WHERE ssid=? AND NOT EXISTS (
+                      SELECT 1 FROM ({pop_sql}) e
+                      WHERE e.page_id=sample_member.page_id AND e.stratum=sample_member.stratum)''',
+              [ssid] + pop_params)
+    evicted = c.rowcount
+
+    c.execute(f'''SELECT stratum, COUNT(*), SUM(page_id % {_POP_SIG_P1}),
+                         SUM((page_id % {_POP_SIG_P1}) * (page_id % {_POP_SIG_P2}) % {_POP_SIG_M})
+                  FROM ({pop_sql}) GROUP BY stratum''', pop_params)
+    pops, sigs = {}, {}
+    for stratum, n, id_sum, term_sum in c.fetchall():
+        pops[stratum] = n
+        sigs[stratum] = [n, id_sum, term_sum]
+    quotas = _stratum_quotas(pops, sample_size)
+    c.execute('SELECT stratum, pop_sig FROM sample_stratum WHERE ssid=?', (ssid,))
+    prev_sigs = {s: json.loads(sig) if sig else None for s, sig in c.fetchall()}
+
+    c.execute('SELECT page_id,stratum,sample_key FROM sample_member WHERE ssid=?', (ssid,))
+    current = {}
+    for pid, stratum, key in c.fetchall():
+        current.setdefault(stratum, {})[pid] = key
+
+    # Offer pages that arrived since the last refresh
+    pool = {s: dict(m) for s, m in current.items()}
+    new_marks = dict(marks)
+    offered = 0
+    after, after_params = _ids_after_marks('page_id', marks)
+    c.execute(f'SELECT page_id, stratum FROM ({pop_sql}) WHERE {after}', pop_params + after_params)
+    expect = {s: list(sig) for s, sig in prev_sigs.items() if sig}
+    for pid, stratum in c.fetchall():
+        pool.setdefault(stratum, {})[pid] = _sample_key(ssid, pid)
+        if prev_sigs.get(stratum, 0) is not None:  # NULL (pre-fingerprint) stratum → rescanned
+            e = expect.setdefault(stratum, [0, 0, 0])
+            e[0] += 1
+            e[1] += pid % _POP_SIG_P1
+            e[2] += _pop_sig_term(pid)
+        shard = pid // SHARD_ID_STRIDE if SHARD_COUNT else 0
+        new_marks[shard] = max(new_marks.get(shard, 0), pid)
+        offered += 1
+
+    rescanned = 0
+    to_delete, to_insert = [], []
+    for stratum in set(pool) | set(quotas):
+        q = quotas.get(stratum, 0)
+        kept = current.get(stratum, {})
+        cand = pool.get(stratum, {})
+        moved = expect.get(stratum, [0, 0, 0]) != sigs.get(stratum, [0, 0, 0])
+        if moved or (q > len(kept) and pops.get(stratum, 0) > len(cand)):
+            # Outsiders may now beat an offered page — rescan this stratum
+            c.execute(f'SELECT page_id FROM ({pop_sql}) WHERE stratum=?', pop_params + [stratum])
+            cand = {pid: _sample_key(ssid, pid) for (pid,) in c.fetchall()}
+            rescanned += 1
+        chosen = dict(sorted(cand.items(), key=lambda kv: (kv[1], kv[0]))[:q])
+        to_delete += [(ssid, pid) for pid in kept if pid not in chosen]
+        to_insert += [(ssid, pid, strategy, stratum, key)
+                      for pid, key in chosen.items() if pid not in kept]
+
+    c.executemany('DELETE FROM sample_member WHERE ssid=? AND page_id=?', to_delete)
+    c.executemany('''INSERT OR REPLACE INTO sample_member (ssid,page_id,reason,stratum,sample_key)
+                     VALUES (?,?,?,?,?)''', to_insert)
+    c.execute('DELETE FROM sample_stratum WHERE ssid=?', (ssid,))
+    c.executemany('INSERT INTO sample_stratum (ssid,stratum,population,quota,pop_sig) VALUES (?,?,?,?,?)',
+                  [(ssid, s, pops[s], quotas[s], json.dumps(sigs[s])) for s in pops])
+    c.execute('UPDATE snapshot_sample_set SET reservoir_marks_json=? WHERE ssid=?',
+              (json.dumps(new_marks), ssid))
+    return {"offered": offered, "added": len(to_insert),
+            "removed": len(to_delete) + evicted, "rescanned_strata": rescanned,
+            "members": sum(min(quotas.get(s, 0), pops.get(s, 0)) for s in pops)}
+
 
+def populate_sample_members(c, ssid, strategy, sample_size, segment_id=None):
+    """
+    Populate sample set members from eligible pages.
+    v16: RANDOM/STRATIFIED use the persistent reservoir; TOP_N is still rebuilt.
+    """
+    if strategy != "TOP_N":
+        return _refresh_sample_reservoir(c, ssid, strategy, sample_size, segment_id)
+
+    # Top N by recency among representative pages
+    c.execute('DELETE FROM sample_member WHERE ssid=?', (ssid,))
+    c.execute('''SELECT page_id FROM page
+        WHERE is_representative=1
+        ORDER BY last_seen_at DESC LIMIT ?''', (sample_size,))
     pages = [r[0] for r in c.fetchall()]
     for pid in pages:
         c.execute('INSERT OR IGNORE INTO sample_member (ssid,page_id,reason) VALUES (?,?,?)',
                   (ssid, pid, strategy))
+    return {"offered": len(pages), "added": len(pages), "removed": 0,
+            "rescanned_strata": 0, "members": len(pages)}
+
+
+def refresh_sample_reservoirs(ssid=None):
+    """Offer newly seen pages to every active reservoir sample set. Returns {ssid: stats}."""
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        sql = '''SELECT ssid,strategy,sample_size,segment_id FROM snapshot_sample_set
+                 WHERE is_active=1 AND strategy!='TOP_N' '''
+        c.execute(sql + ('AND ssid=?' if ssid else ''), (ssid,) if ssid else ())
+        out = {}
+        for ss_id, strat, sz, seg_id in c.fetchall():
+            out[ss_id] = _refresh_sample_reservoir(c, ss_id, strat, sz, seg_id)
+        conn.commit()
+        return out
+    finally:
+        conn.close()
 
 
 def compute_stability_stat(ssid=None):
     """
     STABILITY_DAILY_GATE: compute stability metrics for a sample set.
     Measures score_stddev, critical_flip_rate, issues_hash_flip_rate.
+    v16: one LEAD() window query per set instead of a snapshot query per member.
     """
     conn = get_conn()
     try:
@@ -4214,44 +7206,34 @@ def compute_stability_stat(ssid=None):
 
         results = []
         for ss_id, ss_name, rs_id in sets:
-            # Get members
-            c.execute('SELECT page_id FROM sample_member WHERE ssid=?', (ss_id,))
-            members = [r[0] for r in c.fetchall()]
-            if len(members) < STABILITY_MIN_SAMPLE:
+            c.execute('SELECT COUNT(*) FROM sample_member WHERE ssid=?', (ss_id,))
+            if c.fetchone()[0] < STABILITY_MIN_SAMPLE:
                 continue
 
-            scores = []
-            crit_flips = 0
-            hash_flips = 0
-            member_count = 0
-
-            for pid in members:
-                # Get last 2 snapshots within window for this page
-                c.execute('''SELECT snap_id,score_total,issues_sha256,issues_count_critical
-                    FROM page_snapshot WHERE page_id=? AND fetched_at >= ?
-                    ORDER BY fetched_at DESC LIMIT 2''', (pid, cutoff))
-                snaps = c.fetchall()
-                if not snaps:
-                    continue
-
-                member_count += 1
-                scores.append(snaps[0][1] or 0)
-
-                if len(snaps) == 2:
-                    # Compare current vs previous
-                    curr_sha = snaps[0][2]
-                    prev_sha = snaps[1][2]
-                    curr_crit = snaps[0][3] or 0
-                    prev_crit = snaps[1][3] or 0
-
-                    if curr_sha != prev_sha:
-                        hash_flips += 1
-                    if (curr_crit > 0) != (prev_crit > 0):
-                        crit_flips += 1
-
+            # Latest snapshot per member in the window, compared with the one before it
+            c.execute('''SELECT score_total,
+                    prev_snap IS NOT NULL AND issues_sha256 IS NOT prev_sha,
+                    prev_snap IS NOT NULL AND (COALESCE(crit,0)>0) <> (COALESCE(prev_crit,0)>0)
+                FROM (SELECT ps.score_total, ps.issues_sha256,
+                             ps.issues_count_critical AS crit,
+                             ROW_NUMBER() OVER w AS rn,
+                             LEAD(ps.snap_id) OVER w AS prev_snap,
+                             LEAD(ps.issues_sha256) OVER w AS prev_sha,
+                             LEAD(ps.issues_count_critical) OVER w AS prev_crit
+                      FROM sample_member sm
+                      JOIN page_snapshot ps ON ps.page_id=sm.page_id
+                      WHERE sm.ssid=? AND ps.fetched_at >= ?
+                      WINDOW w AS (PARTITION BY ps.page_id ORDER BY ps.fetched_at DESC))
+                WHERE rn=1''', (ss_id, cutoff))
+            rows = c.fetchall()
+            member_count = len(rows)
             if member_count == 0:
                 continue
 
+            scores = [r[0] or 0 for r in rows]
+            hash_flips = sum(r[1] for r in rows)
+            crit_flips = sum(r[2] for r in rows)
+
             import statistics
             score_mean = statistics.mean(scores) if scores else 0
             score_stddev = statistics.stdev(scores) if len(scores) > 1 else 0
@@ -4332,6 +7314,209 @@ def check_stability_alert():
         conn.close()
 
 
+# ═══════════════════════════════════════════════════════════════════════
+# v16 streaming KPI estimators (Welford + EWMA + P² quantiles)
+# ═══════════════════════════════════════════════════════════════════════
+def _p2_init(p, seed):
+    """P² marker state for quantile p from its first five (sorted) observations."""
+    return {"q": sorted(seed), "n": [1, 2, 3, 4, 5],
+            "np": [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]}
+
+
+def _p2_update(m, p, x):
+    """Fold x into P² markers m (Jain & Chlamtac) — O(1), five floats per quantile."""
+    q, n, np_ = m["q"], m["n"], m["np"]
+    if x < q[0]:
+        q[0] = x
+        k = 0
+    elif x >= q[4]:
+        q[4] = x
+        k = 3
+    else:
+        k = 0
+        while x >= q[k + 1]:
+            k += 1
+    for i in range(k + 1, 5):
+        n[i] += 1
+    for i, dn in enumerate((0, p / 2, p, (1 + p) / 2, 1)):
+        np_[i] += dn
+    for i in (1, 2, 3):
+        d = np_[i] - n[i]
+        if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+            d = 1 if d > 0 else -1
+            qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+            if not q[i - 1] < qp < q[i + 1]:
+                qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+            q[i] = qp
+            n[i] += d
+
+
+def _kpi_stream_key(scope, scope_id):
+    """kpi_value scope=JOB feeds the GLOBAL stream; scope_id 0 stands for NULL."""
+    if scope in ("JOB", "GLOBAL"):
+        return "GLOBAL", 0
+    return scope, int(scope_id or 0)
+
+
+def _kpi_stream_load(c, metric_key, scope, scope_id=None):
+    """Estimator state for one metric x scope (empty state if never fed)."""
+    scope, sid = _kpi_stream_key(scope, scope_id)
+    c.execute('''SELECT n,mean,var,ewma,quantiles_json,last_value,last_as_of,prior_json FROM kpi_stream_stat
+                 WHERE metric_key=? AND scope=? AND scope_id=?''', (metric_key, scope, sid))
+    r = c.fetchone()
+    if not r:
+        return {"metric_key": metric_key, "scope": scope, "scope_id": sid, "n": 0, "mean": 0.0,
+                "var": 0.0, "ewma": None, "quantiles": {}, "last_value": None, "last_as_of": None,
+                "prior": None}
+    return {"metric_key": metric_key, "scope": scope, "scope_id": sid, "n": r[0], "mean": r[1],
+            "var": r[2], "ewma": r[3], "quantiles": json.loads(r[4] or '{}'),
+            "last_value": r[5], "last_as_of": r[6], "prior": json.loads(r[7]) if r[7] else None}
+
+
+def _kpi_stream_fold(st, x):
+    """
+    Fold one observation into estimator state (pure, O(1)).
+    Welford is exact for the first KPI_STREAM_WINDOW_SAMPLES values, then keeps a 1/N
+    weight so mean/var track a rolling window instead of all history.
+    P² markers cannot forget, so the quantiles always cover all history: PCTL detectors compare
+    against long-run percentiles, ZSCORE/DELTA_RATE against the recent window.
+    st["prior"] keeps the state before this fold, so the newest value is judged without itself.
+    """
+    x = float(x)
+    st["prior"] = json.loads(json.dumps({k: st[k] for k in ("n", "mean", "var", "ewma", "quantiles")}))
+    st["n"] += 1
+    k = min(st["n"], KPI_STREAM_WINDOW_SAMPLES)
+    delta = x - st["mean"]
+    st["mean"] += delta / k
+    st["var"] += (delta * (x - st["mean"]) - st["var"]) / k
+    st["ewma"] = x if st["ewma"] is None else st["ewma"] + KPI_STREAM_EWMA_ALPHA * (x - st["ewma"])
+    qs = st["quantiles"]
+    if "init" in qs or not qs:
+        seed = qs.get("init", []) + [x]
+        qs.clear()
+        if len(seed) < 5:
+            qs["init"] = seed
+        else:
+            for p in KPI_STREAM_QUANTILES:
+                qs[str(p)] = _p2_init(p, seed)
+    else:
+        for p in KPI_STREAM_QUANTILES:
+            _p2_update(qs[str(p)], p, x)
+    st["last_value"] = x
+    return st
+
+
+def _kpi_stream_save(c, st):
+    c.execute('''INSERT OR REPLACE INTO kpi_stream_stat
+                 (metric_key,scope,scope_id,n,mean,var,ewma,quantiles_json,last_value,last_as_of,
+                  prior_json)
+                 VALUES (?,?,?,?,?,?,?,?,?,?,?)''',
+              (st["metric_key"], st["scope"], st["scope_id"], st["n"], st["mean"], st["var"],
+               st["ewma"], json.dumps(st["quantiles"], separators=(',', ':')),
+               st["last_value"], st["last_as_of"],
+               json.dumps(st["prior"], separators=(',', ':')) if st.get("prior") else None))
+
+
+def _kpi_stream_update(c, metric_key, scope, scope_id, value, as_of=None):
+    """KPI_STREAM_GATE (v16): fold a freshly written KPI value into its running estimators."""
+    if value is None:
+        return None
+    st = _kpi_stream_fold(_kpi_stream_load(c, metric_key, scope, scope_id), value)
+    st["last_as_of"] = as_of or datetime.datetime.utcnow().strftime('%Y-%m-%d')
+    _kpi_stream_save(c, st)
+    return st
+
+
+def _kpi_stream_baseline(st):
+    """mean/stddev/p50/p75/p90/ewma from estimator state (stddev is the sample stddev)."""
+    k = min(st["n"], KPI_STREAM_WINDOW_SAMPLES)
+    stddev = (max(st["var"], 0.0) * k / (k - 1)) ** 0.5 if k > 1 else 0.0
+    qs = st["quantiles"]
+    pct = {}
+    for p in KPI_STREAM_QUANTILES:
+        if "init" in qs:
+            vals = sorted(qs["init"])
+            pct[p] = vals[int(len(vals) * p)]
+        else:
+            pct[p] = qs[str(p)]["q"][2]
+    return {"n": st["n"], "mean": st["mean"], "stddev": stddev,
+            "p50": pct[0.5], "p75": pct[0.75], "p90": pct[0.9], "ewma": st["ewma"]}
+
+
+def _rebuild_kpi_streams(c):
+    """Replay kpi_value + data_quality_daily history (in insert order) into fresh estimators."""
+    c.execute('DELETE FROM kpi_stream_stat')
+    streams = {}
+
+    def feed(mkey, scope, scope_id, value, as_of):
+        key = (mkey,) + _kpi_stream_key(scope, scope_id)
+        st = streams.get(key)
+        if st is None:
+            st = streams[key] = {"metric_key": key[0], "scope": key[1], "scope_id": key[2], "n": 0,
+                                 "mean": 0.0, "var": 0.0, "ewma": None, "quantiles": {},
+                                 "last_value": None, "last_as_of": None, "prior": None}
+        _kpi_stream_fold(st, value)
+        st["last_as_of"] = as_of
+
+    c.execute('''SELECT kd.key,kv.scope,kv.scope_id,kv.value,kv.as_of_date
+                 FROM kpi_value kv JOIN kpi_definition kd ON kv.kpi_id=kd.kpi_id ORDER BY kv.id''')
+    for mkey, scope, scope_id, value, as_of in c.fetchall():
+        feed(mkey, scope, scope_id, value, as_of)
+    c.execute(f'''SELECT scope,scope_id,as_of_date,{",".join(KPI_STREAM_DQ_METRICS)}
+                  FROM data_quality_daily ORDER BY id''')
+    for row in c.fetchall():
+        for mkey, value in zip(KPI_STREAM_DQ_METRICS, row[3:]):
+            if value is not None:
+                feed(mkey, row[0], row[1], value, row[2])
+    for st in streams.values():
+        _kpi_stream_save(c, st)
+    return len(streams)
+
+
+def rebuild_kpi_stream_stats():
+    """Recompute every streaming KPI estimator from stored history. Returns stream count."""
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        n = _rebuild_kpi_streams(c)
+        _log(c, "BASELINE", "INFO", "KPI_STREAM_REBUILT", f"streams={n}")
+        conn.commit()
+        return n
+    finally:
+        conn.close()
+
+
+def query_kpi_stream_stats(metric_key=None, scope=None, scope_id=None):
+    """Current streaming baselines, optionally filtered by metric / scope."""
+    conn = get_report_conn()
+    try:
+        c = conn.cursor()
+        sql = 'SELECT metric_key,scope,scope_id FROM kpi_stream_stat WHERE 1=1'
+        params = []
+        if metric_key:
+            sql += ' AND metric_key=?'
+            params.append(metric_key)
+        if scope:
+            sql += ' AND scope=?'
+            params.append(scope)
+        if scope_id is not None:
+            sql += ' AND scope_id=?'
+            params.append(int(scope_id))
+        c.execute(sql + ' ORDER BY metric_key,scope,scope_id', params)
+        out = []
+        for mkey, sc, sid in c.fetchall():
+            st = _kpi_stream_load(c, mkey, sc, sid)
+            bl = _kpi_stream_baseline(st)
+            out.append({"metric_key": mkey, "scope": sc, "scope_id": sid or None,
+                        "last_value": st["last_value"], "last_as_of": st["last_as_of"],
+                        **{k: round(v, 6) if isinstance(v, float) else v for k, v in bl.items()}})
+        return out
+    finally:
+        conn.close()
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # v14 anomaly detection + baseline + cooldown
 # ═══════════════════════════════════════════════════════════════════════
@@ -4339,6 +7524,8 @@ def compute_kpi_baseline_daily(scope="GLOBAL", scope_id=None):
     """
     KPI_BASELINE_DAILY_GATE: compute daily KPI baselines (mean/stddev/percentiles)
     for all metric_keys over a rolling window. Used by anomaly detectors.
+    v16: read from the streaming estimators (O(1) per metric) instead of re-scanning the window;
+    window_samples records their KPI_STREAM_WINDOW_SAMPLES sample window (rows before v16: days).
     """
     conn = get_conn()
     try:
@@ -4348,73 +7535,28 @@ def compute_kpi_baseline_daily(scope="GLOBAL", scope_id=None):
         rs_id = rs["rule_set_id"] if rs else None
 
         results = []
+        window = KPI_STREAM_WINDOW_SAMPLES
         for mkey in KPI_BASELINE_METRIC_KEYS:
-            window = KPI_BASELINE_WINDOW_DAYS
-            cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=window)).strftime('%Y-%m-%d')
-
-            # Collect values from kpi_value or data_quality_daily
-            values = []
-            if mkey in ("parse_fail_rate", "audit_incomplete_rate"):
-                # From data_quality_daily
-                if scope == "GLOBAL":
-                    c.execute('''SELECT snapshot_pass_rate FROM data_quality_daily
-                        WHERE scope='GLOBAL' AND as_of_date >= ?
-                        ORDER BY as_of_date''', (cutoff,))
-                    if mkey == "parse_fail_rate":
-                        c.execute('''SELECT parse_fail_rate FROM data_quality_daily
-                            WHERE scope=? AND (scope_id IS ? OR ? IS NULL) AND as_of_date >= ?
-                            ORDER BY as_of_date''', (scope, scope_id, scope_id, cutoff))
-                    else:
-                        c.execute('''SELECT audit_incomplete_rate FROM data_quality_daily
-                            WHERE scope=? AND (scope_id IS ? OR ? IS NULL) AND as_of_date >= ?
-                            ORDER BY as_of_date''', (scope, scope_id, scope_id, cutoff))
-                    values = [r[0] for r in c.fetchall() if r[0] is not None]
-            else:
-                # From kpi_value
-                scope_filter = ""
-                scope_params = []
-                if scope == "DOMAIN" and scope_id:
-                    scope_filter = "AND scope='DOMAIN' AND scope_id=?"
-                    scope_params = [str(scope_id)]
-                elif scope == "SEGMENT" and scope_id:
-                    scope_filter = "AND scope='SEGMENT' AND scope_id=?"
-                    scope_params = [str(scope_id)]
-                else:
-                    scope_filter = "AND scope='GLOBAL'"
-
-                c.execute(f'''SELECT value FROM kpi_value
-                    WHERE key=? AND as_of_date >= ? {scope_filter}
-                    ORDER BY as_of_date''',
-                    [mkey, cutoff] + scope_params)
-                values = [r[0] for r in c.fetchall() if r[0] is not None]
-
-            if not values:
+            st = _kpi_stream_load(c, mkey, scope, scope_id)
+            if not st["n"]:
                 _log(c, "BASELINE", "INFO", "KPI_BASELINE_SKIPPED",
-                     f"metric={mkey} scope={scope} no data in window={window}d")
+                     f"metric={mkey} scope={scope} no stream samples")
                 continue
-
-            import statistics
-            mean_val = statistics.mean(values)
-            stddev_val = statistics.stdev(values) if len(values) > 1 else 0
-            sorted_vals = sorted(values)
-            n = len(sorted_vals)
-            p50 = sorted_vals[int(n * 0.5)] if n > 0 else 0
-            p75 = sorted_vals[int(n * 0.75)] if n > 0 else 0
-            p90 = sorted_vals[int(n * 0.90)] if n > 0 else 0
+            bl = {k: round(v, 6) if isinstance(v, float) else v
+                  for k, v in _kpi_stream_baseline(st).items()}
 
             c.execute('''INSERT OR REPLACE INTO kpi_baseline_daily
-                (as_of_date,scope,scope_id,rule_set_id,metric_key,window_days,
+                (as_of_date,scope,scope_id,rule_set_id,metric_key,window_samples,
                  mean,stddev,p50,p75,p90)
                 VALUES (?,?,?,?,?,?,?,?,?,?,?)''',
                 (today, scope, scope_id, rs_id, mkey, window,
-                 round(mean_val, 6), round(stddev_val, 6),
-                 round(p50, 6), round(p75, 6), round(p90, 6)))
+                 bl["mean"], bl["stddev"], bl["p50"], bl["p75"], bl["p90"]))
 
             results.append({
                 "metric": mkey, "scope": scope, "scope_id": scope_id,
-                "date": today, "window": window, "n": n,
-                "mean": round(mean_val, 6), "stddev": round(stddev_val, 6),
-                "p50": round(p50, 6), "p75": round(p75, 6), "p90": round(p90, 6),
+                "date": today, "window": window, "n": bl["n"],
+                "mean": bl["mean"], "stddev": bl["stddev"],
+                "p50": bl["p50"], "p75": bl["p75"], "p90": bl["p90"], "ewma": bl["ewma"],
             })
 
         conn.commit()
@@ -4467,20 +7609,27 @@ def evaluate_anomaly(scope="GLOBAL", scope_id=None):
             if _check_anomaly_cooldown(c, adid, dscope, effective_scope_id, cooldown):
                 continue
 
-            # Get baseline
-            if effective_scope_id is not None:
+            # Get baseline — v16: live streaming estimators (O(1)); stored daily row as fallback.
+            # Today's value is the stream's last fold → judge it against the state before that fold
+            st = _kpi_stream_load(c, mkey, dscope, effective_scope_id)
+            base = (st["prior"] if st["last_as_of"] == today else st) if st["n"] else None
+            if st["n"]:
+                bl = _kpi_stream_baseline(base) if base and base["n"] else None
+                baseline_row = (bl["mean"], bl["stddev"], bl["p50"], bl["p75"], bl["p90"]) if bl else None
+            elif effective_scope_id is not None:
                 c.execute('''SELECT mean,stddev,p50,p75,p90 FROM kpi_baseline_daily
                     WHERE metric_key=? AND scope=? AND scope_id=? AND as_of_date=?
                     AND (rule_set_id IS NULL OR rule_set_id=?)
-                    ORDER BY window_days DESC LIMIT 1''',
+                    ORDER BY window_samples DESC LIMIT 1''',
                     (mkey, dscope, effective_scope_id, today, rs_id))
+                baseline_row = c.fetchone()
             else:
                 c.execute('''SELECT mean,stddev,p50,p75,p90 FROM kpi_baseline_daily
                     WHERE metric_key=? AND scope=? AND scope_id IS NULL AND as_of_date=?
                     AND (rule_set_id IS NULL OR rule_set_id=?)
-                    ORDER BY window_days DESC LIMIT 1''',
+                    ORDER BY window_samples DESC LIMIT 1''',
                     (mkey, dscope, today, rs_id))
-            baseline_row = c.fetchone()
+                baseline_row = c.fetchone()
             if not baseline_row:
                 _log(c, "ANOMALY", "INFO", "ANOMALY_NO_BASELINE",
                      f"detector={dname} metric={mkey} scope={dscope}")
@@ -4490,9 +7639,13 @@ def evaluate_anomaly(scope="GLOBAL", scope_id=None):
             baseline_data = {"mean": bl_mean, "stddev": bl_stddev,
                              "p50": bl_p50, "p75": bl_p75, "p90": bl_p90}
 
-            # Get current value (latest kpi_value or data_quality metric)
+            # Get current value — v16: the stream's latest observation when it landed today
             current_val = None
-            if mkey in ("parse_fail_rate", "audit_incomplete_rate"):
+            if st["n"]:
+                if st["last_as_of"] == today:
+                    current_val = st["last_value"]
+                baseline_data["ewma"] = base["ewma"]
+            elif mkey in ("parse_fail_rate", "audit_incomplete_rate"):
                 c.execute('''SELECT parse_fail_rate FROM data_quality_daily
                     WHERE scope=? AND (scope_id IS ? OR ? IS NULL) AND as_of_date=?
                     ORDER BY created_at DESC LIMIT 1''',
@@ -4552,7 +7705,8 @@ def evaluate_anomaly(scope="GLOBAL", scope_id=None):
                      severity, msg))
                 aeid = c.lastrowid
 
-                _log(c, "ANOMALY", severity, "ANOMALY_DETECTED", msg)
+                _log(c, "ANOMALY", "ERROR" if severity == "CRITICAL" else "WARN",
+                     "ANOMALY_DETECTED", msg)
 
                 events.append({
                     "aeid": aeid, "detector": dname, "metric": mkey,
@@ -4634,32 +7788,215 @@ def check_resolver_cache(c, domain_id):
     if not row:
         return True, None
 
-    cooldown_until = row[5]
-    if cooldown_until and now < cooldown_until:
-        return False, {"id": row[0], "dns_ok": bool(row[1]), "tls_ok": bool(row[2]),
-                       "last_error": row[3], "checked_at": row[4], "cooldown_until": cooldown_until}
+    cooldown_until = row[5]
+    if cooldown_until and now < cooldown_until:
+        return False, {"id": row[0], "dns_ok": bool(row[1]), "tls_ok": bool(row[2]),
+                       "last_error": row[3], "checked_at": row[4], "cooldown_until": cooldown_until}
+
+    return True, {"id": row[0], "dns_ok": bool(row[1]), "tls_ok": bool(row[2]),
+                  "last_error": row[3], "checked_at": row[4], "cooldown_until": cooldown_until}
+
+
+def update_resolver_cache(c, domain_id, dns_ok=True, tls_ok=True, last_ip=None, last_error=None):
+    """Persist DNS/TLS check result. Sets cooldown if failed."""
+    now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    cooldown = None
+    if not dns_ok or not tls_ok:
+        cooldown = (datetime.datetime.utcnow() + datetime.timedelta(minutes=RESOLVER_COOLDOWN_MINUTES)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        # Mark domain as DEGRADED
+        c.execute("UPDATE domain SET health_tier='DEGRADED',health_note=? WHERE domain_id=?",
+                  (last_error or "DNS/TLS failure", domain_id))
+
+    ip_json = json.dumps(last_ip, ensure_ascii=False) if last_ip else None
+    c.execute('''INSERT INTO resolver_cache (domain_id,dns_ok,tls_ok,last_ip_json,last_error,checked_at,cooldown_until)
+        VALUES (?,?,?,?,?,?,?)
+        ON CONFLICT(domain_id) DO UPDATE SET
+        dns_ok=excluded.dns_ok,tls_ok=excluded.tls_ok,last_ip_json=excluded.last_ip_json,
+        last_error=excluded.last_error,checked_at=excluded.checked_at,cooldown_until=excluded.cooldown_until''',
+        (domain_id, int(dns_ok), int(tls_ok), ip_json, last_error, now, cooldown))
+
+
+# ── v16 DNS prefetch ──
+# In-process cache: host -> {"ok", "ips", "error", "expires"} (time.monotonic based).
+_DNS_CACHE = {}
+
+
+def _default_resolver(host):
+    """Resolve host via getaddrinfo. Returns (ips, ttl_seconds|None); raises OSError on failure."""
+    import socket
+    infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    ips = sorted({info[4][0] for info in infos})
+    if not ips:
+        raise OSError(f"no addresses for {host}")
+    return ips, None
+
+
+def dns_cache_lookup(host):
+    """Return the in-process DNS cache entry for host if not expired, else None."""
+    entry = _DNS_CACHE.get(host)
+    if entry and entry["expires"] > time.monotonic():
+        return entry
+    if entry:
+        del _DNS_CACHE[host]
+    return None
+
+
+def clear_dns_cache():
+    """Drop all in-process DNS cache entries."""
+    _DNS_CACHE.clear()
+
+
+def _dns_cache_put(host, ok, ips=None, error=None, ttl=None):
+    if ttl is None:
+        ttl = DNS_POSITIVE_TTL_SECONDS if ok else DNS_NEGATIVE_TTL_SECONDS
+    entry = {"ok": ok, "ips": ips or [], "error": error,
+             "expires": time.monotonic() + max(0, ttl)}
+    _DNS_CACHE[host] = entry
+    return entry
+
+
+def _resolve_one(resolver, host):
+    """Worker body: never raises, returns (host, ok, ips, ttl, error)."""
+    try:
+        res = resolver(host)
+        ips, ttl = res if isinstance(res, tuple) else (res, None)
+        return host, True, list(ips or []), ttl, None
+    except Exception as e:
+        return host, False, [], None, f"{type(e).__name__}: {e}"
+
+
+def _record_dns_result(c, domain_id, ok, ips, error):
+    """
+    Persist a prefetch result to resolver_cache. Failures go through
+    update_resolver_cache (cooldown + DEGRADED); successes only refresh the
+    DNS columns so a known TLS failure/cooldown is left intact.
+    """
+    if not ok:
+        c.execute('SELECT tls_ok FROM resolver_cache WHERE domain_id=?', (domain_id,))
+        r = c.fetchone()
+        update_resolver_cache(c, domain_id, dns_ok=False,
+                              tls_ok=bool(r[0]) if r else True,
+                              last_ip=None, last_error=error)
+        return
+    now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    ip_json = json.dumps(ips, ensure_ascii=False) if ips else None
+    c.execute('''INSERT INTO resolver_cache (domain_id,dns_ok,tls_ok,last_ip_json,checked_at)
+        VALUES (?,1,1,?,?)
+        ON CONFLICT(domain_id) DO UPDATE SET
+        dns_ok=1,last_ip_json=excluded.last_ip_json,checked_at=excluded.checked_at''',
+        (domain_id, ip_json, now))
+
+
+def prefetch_frontier_dns(lookahead=None, resolver=None, max_workers=None):
+    """
+    DNS_PREFETCH_GATE: look ahead at the next N PENDING frontier items and
+    resolve their hosts concurrently (thread pool; resolver is injectable so
+    tests can pass a stub). Hosts with a fresh in-process entry or a fresh
+    resolver_cache row (checked_at within DNS_POSITIVE_TTL_SECONDS, or in
+    cooldown) are not re-resolved. Results land in both caches.
+    v16: no connection is held while resolving — candidates are read first, results
+    (and any missing domain rows) are written in one short transaction afterwards.
+    When every look-ahead host is already cached nothing is written or logged.
+    resolver(host) -> ips | (ips, ttl_seconds); raise on failure.
+    Returns {"hosts", "resolved", "failed", "cached"}.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    lookahead = lookahead or DNS_PREFETCH_LOOKAHEAD
+    resolver = resolver or _default_resolver
+    stats = {"hosts": 0, "resolved": 0, "failed": 0, "cached": 0}
+
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        now_dt = datetime.datetime.utcnow()
+        now = now_dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+        fresh_after = (now_dt - datetime.timedelta(seconds=DNS_POSITIVE_TTL_SECONDS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+        # Same ordering as frontier_next so we warm exactly what will be claimed next
+        c.execute('''SELECT url,domain_id FROM crawl_frontier
+                     WHERE status='PENDING' AND (next_retry_at IS NULL OR next_retry_at<=?)
+                       AND (cooldown_until IS NULL OR cooldown_until<=?)
+                     ORDER BY priority DESC, fid ASC LIMIT ?''', (now, now, lookahead))
+        hosts = {}
+        for url, did in c.fetchall():
+            host = extract_domain(url)
+            if host and host not in hosts:
+                hosts[host] = did
+        stats["hosts"] = len(hosts)
+
+        pending = {}
+        for host, did in hosts.items():
+            if dns_cache_lookup(host):
+                stats["cached"] += 1
+                continue
+            if did is None:
+                c.execute('SELECT domain_id FROM domain WHERE domain=?', (host,))
+                r = c.fetchone()
+                did = r[0] if r else None
+            rc = None
+            if did is not None:
+                c.execute('SELECT dns_ok,last_ip_json,last_error,checked_at,cooldown_until FROM resolver_cache WHERE domain_id=?',
+                          (did,))
+                rc = c.fetchone()
+            if rc and not rc[0] and rc[4] and now < rc[4]:
+                # Known-bad and still cooling down: seed the negative entry, don't re-resolve
+                remaining = (datetime.datetime.strptime(rc[4], '%Y-%m-%dT%H:%M:%SZ') - now_dt).total_seconds()
+                _dns_cache_put(host, False, error=rc[2], ttl=remaining)
+                stats["cached"] += 1
+                continue
+            if rc and rc[0] and rc[3] and rc[3] >= fresh_after:
+                checked = datetime.datetime.strptime(rc[3], '%Y-%m-%dT%H:%M:%SZ')
+                remaining = DNS_POSITIVE_TTL_SECONDS - (now_dt - checked).total_seconds()
+                _dns_cache_put(host, True, ips=json.loads(rc[1]) if rc[1] else [], ttl=remaining)
+                stats["cached"] += 1
+                continue
+            pending[host] = did
+    finally:
+        conn.close()
+    if not pending:
+        return stats
+
+    workers = min(max_workers or DNS_PREFETCH_WORKERS, len(pending))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda h: _resolve_one(resolver, h), pending))
+
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        for host, ok, ips, ttl, error in results:
+            _dns_cache_put(host, ok, ips=ips, error=error, ttl=ttl)
+            did = pending[host] if pending[host] is not None else ensure_domain(c, host)
+            _record_dns_result(c, did, ok, ips, error)
+            if ok:
+                stats["resolved"] += 1
+            else:
+                stats["failed"] += 1
+                _log(c, "NETWORK", "WARN", "DNS_RESOLVE_FAILED",
+                     f"host={host} {error}", domain_id=did, network_stage="DNS")
 
-    return True, {"id": row[0], "dns_ok": bool(row[1]), "tls_ok": bool(row[2]),
-                  "last_error": row[3], "checked_at": row[4], "cooldown_until": cooldown_until}
+        _log(c, "NETWORK", "INFO", "DNS_PREFETCH",
+             f"lookahead={lookahead} hosts={stats['hosts']} resolved={stats['resolved']} "
+             f"failed={stats['failed']} cached={stats['cached']}", payload=stats)
+        conn.commit()
+        return stats
+    finally:
+        conn.close()
 
 
-def update_resolver_cache(c, domain_id, dns_ok=True, tls_ok=True, last_ip=None, last_error=None):
-    """Persist DNS/TLS check result. Sets cooldown if failed."""
-    now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
-    cooldown = None
-    if not dns_ok or not tls_ok:
-        cooldown = (datetime.datetime.utcnow() + datetime.timedelta(minutes=RESOLVER_COOLDOWN_MINUTES)).strftime('%Y-%m-%dT%H:%M:%SZ')
-        # Mark domain as DEGRADED
-        c.execute("UPDATE domain SET health_tier='DEGRADED',health_note=? WHERE domain_id=?",
-                  (last_error or "DNS/TLS failure", domain_id))
+def _dns_blocked_domains(c, domain_ids, now):
+    """Domain ids with dns_ok=0 in resolver_cache and still in cooldown -> cooldown_until."""
+    ids = [d for d in set(domain_ids) if d is not None]
+    if not ids:
+        return {}
+    c.execute(f'''SELECT domain_id,cooldown_until FROM resolver_cache
+                  WHERE dns_ok=0 AND cooldown_until>? AND domain_id IN ({','.join('?'*len(ids))})''',
+              [now] + ids)
+    return {r[0]: r[1] for r in c.fetchall()}
 
-    ip_json = json.dumps(last_ip, ensure_ascii=False) if last_ip else None
-    c.execute('''INSERT INTO resolver_cache (domain_id,dns_ok,tls_ok,last_ip_json,last_error,checked_at,cooldown_until)
-        VALUES (?,?,?,?,?,?,?)
-        ON CONFLICT(domain_id) DO UPDATE SET
-        dns_ok=excluded.dns_ok,tls_ok=excluded.tls_ok,last_ip_json=excluded.last_ip_json,
-        last_error=excluded.last_error,checked_at=excluded.checked_at,cooldown_until=excluded.cooldown_until''',
-        (domain_id, int(dns_ok), int(tls_ok), ip_json, last_error, now, cooldown))
+
+_FINGERPRINT_INSERT = '''INSERT OR IGNORE INTO http_fingerprint
+    (domain_id,sha256,server,powered_by,cdn_hint,cache_control,vary,etag_present,hsts_present)
+    VALUES (?,?,?,?,?,?,?,?,?)'''
 
 
 def extract_http_fingerprint(c, domain_id, headers):
@@ -4683,11 +8020,12 @@ def extract_http_fingerprint(c, domain_id, headers):
     fp_str = f"{server}|{powered}|{cdn}|{cache_ctrl}|{vary}|{etag}|{hsts}"
     fp_sha = hashlib.sha256(fp_str.encode()).hexdigest()
 
-    c.execute('''INSERT OR IGNORE INTO http_fingerprint
-        (domain_id,sha256,server,powered_by,cdn_hint,cache_control,vary,etag_present,hsts_present)
-        VALUES (?,?,?,?,?,?,?,?,?)''',
-        (domain_id, fp_sha, server or None, powered or None, cdn or None,
-         cache_ctrl or None, vary or None, etag, hsts))
+    row = (domain_id, fp_sha, server or None, powered or None, cdn or None,
+           cache_ctrl or None, vary or None, etag, hsts)
+    if _catalog_deferred():
+        _outbox(c, "FINGERPRINT", row)
+    else:
+        c.execute(_FINGERPRINT_INSERT, row)
 
     return fp_sha
 
@@ -4852,6 +8190,660 @@ def check_health_alerts():
         conn.close()
 
 
+# ═══════════════════════════════════════════════════════════════════════
+# v16 robots.txt cache + compiled matcher
+# ═══════════════════════════════════════════════════════════════════════
+# In-process compiled matchers: domain_id -> (rules_json, matcher). A changed
+# rules_json in robots_cache invalidates the entry on next lookup.
+_ROBOTS_MATCHERS = {}
+
+
+def parse_robots_txt(text, agent_token=ROBOTS_USER_AGENT_TOKEN):
+    """
+    Parse robots.txt (RFC 9309 grouping). Uses the groups naming agent_token,
+    else the '*' groups. Returns {"rules": [["A"|"D", pattern], ...],
+    "crawl_delay_ms": int|None, "sitemaps": [url, ...]}.
+    """
+    token = agent_token.lower()
+    groups = []          # [(agents:set, rules:list, delay)]
+    sitemaps = []
+    agents, rules, delay = set(), [], None
+    in_rules = False
+    for raw in (text or "").splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, val = line.split(":", 1)
+        key, val = key.strip().lower(), val.strip()
+        if key == "user-agent":
+            if in_rules:
+                groups.append((agents, rules, delay))
+                agents, rules, delay = set(), [], None
+                in_rules = False
+            agents.add(val.lower())
+        elif key in ("allow", "disallow"):
+            in_rules = True
+            if val:
+                rules.append(["A" if key == "allow" else "D", val])
+        elif key == "crawl-delay":
+            in_rules = True
+            try:
+                delay = int(float(val) * 1000)
+            except ValueError:
+                pass
+        elif key == "sitemap" and val:
+            sitemaps.append(val)
+    if agents:
+        groups.append((agents, rules, delay))
+
+    picked = [g for g in groups if token in g[0]] or [g for g in groups if "*" in g[0]]
+    out_rules, out_delay = [], None
+    for _, g_rules, g_delay in picked:
+        out_rules.extend(g_rules)
+        if g_delay is not None:
+            out_delay = max(out_delay or 0, g_delay)
+    if out_delay is not None:
+        out_delay = min(out_delay, ROBOTS_MAX_CRAWL_DELAY_MS)
+    return {"rules": out_rules, "crawl_delay_ms": out_delay, "sitemaps": sitemaps}
+
+
+def _robots_pattern_regex(pattern):
+    anchored = pattern.endswith("$")
+    body = pattern[:-1] if anchored else pattern
+    return ".*".join(re.escape(part) for part in body.split("*")) + ("$" if anchored else "")
+
+
+def compile_robots_rules(rules):
+    """
+    Compile [["A"|"D", pattern], ...] into a matcher. One combined regex over
+    all Disallow patterns gives a fast allow path; only on a hit are rules
+    walked longest-first (Allow wins ties), literal patterns via startswith.
+    """
+    disallows = [p for kind, p in rules if kind == "D"]
+    if not disallows:
+        return {"deny_re": None, "rules": []}
+    ordered = []
+    for kind, p in rules:
+        is_literal = "*" not in p and not p.endswith("$")
+        ordered.append((len(p), kind == "A", p if is_literal else None,
+                        None if is_literal else re.compile(_robots_pattern_regex(p))))
+    ordered.sort(key=lambda r: (-r[0], not r[1]))
+    deny_re = re.compile("|".join(f"(?:{_robots_pattern_regex(p)})" for p in disallows))
+    return {"deny_re": deny_re, "rules": ordered}
+
+
+def robots_path_allowed(matcher, url):
+    """Evaluate a URL (or path) against a compiled matcher."""
+    if matcher is None or matcher["deny_re"] is None:
+        return True
+    if "://" in url:
+        p = urlparse(url)
+        path = (p.path or "/") + (f"?{p.query}" if p.query else "")
+    else:
+        path = url or "/"
+    if not matcher["deny_re"].match(path):
+        return True
+    for _, allow, literal, rx in matcher["rules"]:
+        if (path.startswith(literal) if rx is None else rx.match(path)):
+            return allow
+    return True
+
+
+def _robots_matchers_for(c, domain_ids):
+    """Bulk-load compiled matchers for domain_ids (one query). Unknown domains are omitted."""
+    ids = [d for d in set(domain_ids) if d is not None]
+    if not ids:
+        return {}
+    c.execute(f"SELECT domain_id,rules_json FROM robots_cache WHERE domain_id IN ({','.join('?'*len(ids))})", ids)
+    out = {}
+    for did, rules_json in c.fetchall():
+        cached = _ROBOTS_MATCHERS.get(did)
+        if not cached or cached[0] != rules_json:
+            cached = (rules_json, compile_robots_rules(json.loads(rules_json or "[]")))
+            _ROBOTS_MATCHERS[did] = cached
+        out[did] = cached[1]
+    return out
+
+
+def _robots_filter_items(c, items, job_id=None):
+    """
+    ROBOTS_GATE: drop frontier items disallowed by cached robots.txt rules.
+    Items without domain_id are resolved by hostname. Domains with no cached
+    robots.txt pass through (rules are only known after refresh_robots).
+    Returns (allowed_items, disallowed_count).
+    """
+    if not items:
+        return [], 0
+    hosts = list({extract_domain(item["url"]) for item in items if not item.get("domain_id")})
+    by_host = {}
+    if hosts:
+        c.execute(f"SELECT domain,domain_id FROM domain WHERE domain IN ({','.join('?'*len(hosts))})", hosts)
+        by_host = dict(c.fetchall())
+    resolved = [item.get("domain_id") or by_host.get(extract_domain(item["url"])) for item in items]
+    matchers = _robots_matchers_for(c, resolved)
+    allowed, denied = [], {}
+    for item, did in zip(items, resolved):
+        if did in matchers and not robots_path_allowed(matchers[did], item["url"]):
+            denied.setdefault(did, []).append(item["url"])
+        else:
+            allowed.append(item)
+    for did, urls in denied.items():
+        _log(c, "ROBOTS", "INFO", "ROBOTS_DISALLOW",
+             f"filtered {len(urls)} url(s) at enqueue", job_id=job_id, domain_id=did,
+             payload={"sample": urls[:5]})
+    return allowed, sum(len(u) for u in denied.values())
+
+
+def get_robots_state(c, domain_id):
+    """Cached robots.txt state for a domain, or None. is_fresh compares expires_at to now."""
+    c.execute('''SELECT robots_url,http_status,etag,last_modified,sha256,rules_json,
+        crawl_delay_ms,fetched_at,expires_at FROM robots_cache WHERE domain_id=?''', (domain_id,))
+    r = c.fetchone()
+    if not r:
+        return None
+    now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    return {"robots_url": r[0], "http_status": r[1], "etag": r[2], "last_modified": r[3],
+            "sha256": r[4], "rules": json.loads(r[5] or "[]"), "crawl_delay_ms": r[6],
+            "fetched_at": r[7], "expires_at": r[8], "is_fresh": bool(r[8] and now < r[8])}
+
+
+def save_robots_fetch(c, domain_id, robots_url, http_status, body=None, etag=None,
+                      last_modified=None, job_id=None):
+    """
+    Persist a robots.txt fetch result.
+    2xx: parse + store rules/validators, ROBOTS artifact, domain.robots_* columns;
+         crawl-delay is kept in robots_cache only (check_robots_url applies it), so a
+         relaxed robots.txt relaxes the rate limit again.
+    304: keep rules, extend expiry.
+    4xx: allow-all (RFC 9309 "unavailable").
+    5xx/network (http_status None): keep previous rules if any, else allow-all,
+         with a short ROBOTS_ERROR_TTL_HOURS so it is retried soon.
+    Returns the stored state dict.
+    """
+    now_dt = datetime.datetime.utcnow()
+    now = now_dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    prev = get_robots_state(c, domain_id)
+    ok_ttl = (now_dt + datetime.timedelta(hours=ROBOTS_TTL_HOURS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    err_ttl = (now_dt + datetime.timedelta(hours=ROBOTS_ERROR_TTL_HOURS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    sha = None
+    sitemaps = []
+    if http_status == 304 and prev:
+        c.execute('UPDATE robots_cache SET fetched_at=?,expires_at=?,etag=COALESCE(?,etag),last_modified=COALESCE(?,last_modified) WHERE domain_id=?',
+                  (now, ok_ttl, etag, last_modified, domain_id))
+        c.execute('UPDATE domain SET robots_fetched_at=? WHERE domain_id=?', (now, domain_id))
+        if job_id:
+            record_cost(c, job_id, "ROBOTS", 1, domain_id=domain_id, meta={"http_status": 304})
+        return get_robots_state(c, domain_id)
+
+    if http_status and 200 <= http_status < 300:
+        raw = body if isinstance(body, bytes) else (body or "").encode("utf-8")
+        raw = raw[:ROBOTS_MAX_BYTES]
+        sha = hashlib.sha256(raw).hexdigest()
+        parsed = parse_robots_txt(raw.decode("utf-8", errors="replace"))
+        rules, delay, sitemaps, expires = parsed["rules"], parsed["crawl_delay_ms"], parsed["sitemaps"], ok_ttl
+        _store_artifact(c, sha, "ROBOTS", raw, True)
+        c.execute('UPDATE domain SET robots_fetched_at=?,robots_sha256=? WHERE domain_id=?',
+                  (now, sha, domain_id))
+    elif http_status and 400 <= http_status < 500:
+        rules, delay, expires = [], None, ok_ttl
+        etag = last_modified = None
+        c.execute('UPDATE domain SET robots_fetched_at=?,robots_sha256=NULL WHERE domain_id=?',
+                  (now, domain_id))
+    else:
+        rules = prev["rules"] if prev else []
+        delay = prev["crawl_delay_ms"] if prev else None
+        sha = prev["sha256"] if prev else None
+        etag = prev["etag"] if prev else None
+        last_modified = prev["last_modified"] if prev else None
+        expires = err_ttl
+        _log(c, "ROBOTS", "WARN", "ROBOTS_FETCH_FAILED",
+             f"{robots_url} status={http_status} kept_previous={bool(prev)}",
+             job_id=job_id, domain_id=domain_id)
+
+    c.execute('''INSERT INTO robots_cache (domain_id,robots_url,http_status,etag,last_modified,sha256,
+        rules_json,crawl_delay_ms,fetched_at,expires_at) VALUES (?,?,?,?,?,?,?,?,?,?)
+        ON CONFLICT(domain_id) DO UPDATE SET robots_url=excluded.robots_url,http_status=excluded.http_status,
+        etag=excluded.etag,last_modified=excluded.last_modified,sha256=excluded.sha256,
+        rules_json=excluded.rules_json,crawl_delay_ms=excluded.crawl_delay_ms,
+        fetched_at=excluded.fetched_at,expires_at=excluded.expires_at''',
+        (domain_id, robots_url, http_status, etag, last_modified, sha,
+         json.dumps(rules, ensure_ascii=False), delay, now, expires))
+    if job_id:
+        record_cost(c, job_id, "ROBOTS", 1, domain_id=domain_id, meta={"http_status": http_status})
+    state = get_robots_state(c, domain_id)
+    state["sitemaps"] = sitemaps
+    return state
+
+
+def refresh_robots(domain_name, fetcher, job_id=None, force=False):
+    """
+    ROBOTS_REFRESH_GATE: refresh robots.txt for a domain when its TTL expired.
+    fetcher(url, headers) -> (http_status|None, body_bytes, response_headers);
+    If-None-Match / If-Modified-Since are sent from the cached validators.
+    Returns the cached state dict (unchanged if still fresh).
+    """
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        did = ensure_domain(c, domain_name)
+        state = get_robots_state(c, did)
+        if state and state["is_fresh"] and not force:
+            conn.commit()
+            return state
+        robots_url = f"https://{domain_name}/robots.txt"
+        req_headers = {}
+        if state and state["etag"]:
+            req_headers["If-None-Match"] = state["etag"]
+        if state and state["last_modified"]:
+            req_headers["If-Modified-Since"] = state["last_modified"]
+        try:
+            status, body, resp_headers = fetcher(robots_url, req_headers)
+        except Exception as e:
+            status, body, resp_headers = None, None, {}
+            _log(c, "ROBOTS", "WARN", "ROBOTS_FETCH_ERROR", f"{robots_url} {e}",
+                 job_id=job_id, domain_id=did)
+        h = {k.lower(): v for k, v in (resp_headers or {}).items()}
+        state = save_robots_fetch(c, did, robots_url, status, body,
+                                  etag=h.get("etag"), last_modified=h.get("last-modified"),
+                                  job_id=job_id)
+        conn.commit()
+        return state
+    finally:
+        conn.close()
+
+
+def check_robots_url(url):
+    """
+    ROBOTS_GATE at fetch time: {"allowed": bool, "rate_limit_ms": int} for a URL
+    using the cached rules and the domain's rate limit, raised to the current robots
+    crawl-delay (never stored back into domain.rate_limit_ms).
+    """
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        c.execute('''SELECT d.domain_id, MAX(d.rate_limit_ms, COALESCE(rc.crawl_delay_ms, 0))
+                     FROM domain d LEFT JOIN robots_cache rc ON rc.domain_id=d.domain_id
+                     WHERE d.domain=?''', (extract_domain(url),))
+        r = c.fetchone()
+        if not r:
+            return {"allowed": True, "rate_limit_ms": None}
+        matcher = _robots_matchers_for(c, [r[0]]).get(r[0])
+        return {"allowed": robots_path_allowed(matcher, url), "rate_limit_ms": r[1]}
+    finally:
+        conn.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# v16 sitemap streaming ingest
+# ═══════════════════════════════════════════════════════════════════════
+class _SitemapReader:
+    """
+    File-like reader for iterparse over a (possibly gzipped) sitemap stream.
+    Hashes the delivered bytes, gunzips incrementally and caps the
+    uncompressed size, so memory stays constant regardless of file size.
+    """
+
+    def __init__(self, raw, max_bytes=SITEMAP_MAX_BYTES):
+        import io, zlib
+        self._raw = io.BytesIO(raw) if isinstance(raw, (bytes, bytearray)) else raw
+        self.sha = hashlib.sha256()
+        self.bytes = 0
+        self.out_bytes = 0
+        self.max_bytes = max_bytes
+        self._head = self._raw.read(2) or b""
+        self.is_gzip = self._head == b"\x1f\x8b"
+        self._gz = zlib.decompressobj(16 + zlib.MAX_WBITS) if self.is_gzip else None
+
+    def _next_raw(self, n):
+        if self._head:
+            data, self._head = self._head, b""
+        else:
+            data = self._raw.read(n) or b""
+        self.sha.update(data)
+        self.bytes += len(data)
+        return data
+
+    def read(self, n=65536):
+        n = n if n and n > 0 else 65536
+        while True:
+            if self._gz is None:
+                out = self._next_raw(n)
+            elif self._gz.unconsumed_tail:
+                out = self._gz.decompress(self._gz.unconsumed_tail, n)
+            else:
+                data = self._next_raw(n)
+                out = self._gz.decompress(data, n) if data else self._gz.flush()
+                if not out and data:
+                    continue  # gzip header / need more input
+            self.out_bytes += len(out)
+            if self.out_bytes > self.max_bytes:
+                raise ValueError(f"SITEMAP_TOO_LARGE: >{self.max_bytes} bytes uncompressed")
+            return out
+
+
+def _spool_sitemap_body(body, max_bytes=SITEMAP_MAX_BYTES):
+    """
+    Read a fetched sitemap body to completion before any DB write: bytes pass
+    through, streams are copied into a spooled temp file (in memory up to
+    SITEMAP_SPOOL_MEMORY_BYTES) and rewound. Raw size is capped at max_bytes.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        return body
+    import tempfile
+    spool = tempfile.SpooledTemporaryFile(max_size=SITEMAP_SPOOL_MEMORY_BYTES)
+    size = 0
+    for block in iter(lambda: body.read(1 << 16), b""):
+        size += len(block)
+        if size > max_bytes:
+            spool.close()
+            raise ValueError(f"SITEMAP_TOO_LARGE: >{max_bytes} bytes transferred")
+        spool.write(block)
+    spool.seek(0)
+    return spool
+
+
+def _iter_sitemap_entries(reader):
+    """
+    Yield (kind, loc, lastmod) per <url>/<sitemap> entry, kind in URLSET/INDEX.
+    Namespace-agnostic; processed elements are cleared from the root.
+    """
+    import xml.etree.ElementTree as ET
+    root = None
+    for event, elem in ET.iterparse(reader, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag not in ("url", "sitemap"):
+            continue
+        loc = lastmod = None
+        for child in elem:
+            ctag = child.tag.rsplit("}", 1)[-1]
+            if ctag == "loc":
+                loc = (child.text or "").strip()
+            elif ctag == "lastmod":
+                lastmod = (child.text or "").strip()
+        if loc:
+            yield ("INDEX" if tag == "sitemap" else "URLSET"), loc, _normalize_lastmod(lastmod)
+        elem.clear()
+        root.clear()
+
+
+def _normalize_lastmod(value):
+    """W3C datetime → '%Y-%m-%dT%H:%M:%SZ' (UTC), None if missing/unparseable."""
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            dt = datetime.datetime.strptime(value, '%Y-%m-%d')
+        else:
+            dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+            if dt.tzinfo:
+                dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+    except ValueError:
+        return None
+
+
+def _sitemap_diff_chunk(c, chunk, domain_id, sitemap_url, now, since, source_sid, job_id, stats):
+    """
+    SITEMAP_DIFF_GATE: diff a chunk of (url, lastmod) against sitemap_url_state.
+    New URLs and URLs whose lastmod advanced go to frontier_add_batch (SITEMAP
+    priority); already-crawled changed URLs are re-queued only if they pass the
+    since and robots filters. State is upserted.
+    """
+    norms = [normalize_url(u) for u, _ in chunk]
+    c.execute(f"SELECT url_norm,lastmod FROM sitemap_url_state WHERE url_norm IN ({','.join('?'*len(norms))})",
+              norms)
+    prev = dict(c.fetchall())
+    prio = compute_priority(source="SITEMAP")
+    enqueue, changed = [], set()
+    for (url, lastmod), un in zip(chunk, norms):
+        if un in prev:
+            if lastmod and (prev[un] is None or lastmod > prev[un]):
+                stats["urls_changed"] += 1
+                changed.add(un)
+            else:
+                stats["urls_unchanged"] += 1
+                continue
+        else:
+            stats["urls_new"] += 1
+        if since and lastmod and lastmod < since:
+            continue
+        enqueue.append({"domain_id": domain_id, "url": url, "url_norm": un, "priority": prio,
+                        "discovered_from": sitemap_url, "source": "SITEMAP"})
+
+    c.executemany('''INSERT INTO sitemap_url_state (url_norm,domain_id,sitemap_url,lastmod,first_seen_at,last_seen_at)
+        VALUES (?,?,?,?,?,?)
+        ON CONFLICT(url_norm) DO UPDATE SET sitemap_url=excluded.sitemap_url,
+        lastmod=COALESCE(excluded.lastmod,sitemap_url_state.lastmod),last_seen_at=excluded.last_seen_at''',
+        [(un, domain_id, sitemap_url, lm, now, now) for (_, lm), un in zip(chunk, norms)])
+
+    # ── ROBOTS_GATE (v16) ── applied once here so the re-queue below sees the same filter
+    enqueue, _ = _robots_filter_items(c, enqueue, job_id=job_id)
+    if not enqueue:
+        return
+    added = frontier_add_batch(c, enqueue, job_id=job_id, robots_filtered=True)
+    requeued = 0
+    requeue = [i["url_norm"] for i in enqueue if i["url_norm"] in changed]
+    if requeue:
+        c.execute(f'''UPDATE crawl_frontier SET status='PENDING',priority=MAX(priority,?),
+            retry_count=0,next_retry_at=NULL,last_error=NULL
+            WHERE status IN ('DONE','SKIPPED') AND url_norm IN ({','.join('?'*len(requeue))})''',
+            [prio] + requeue)
+        requeued = c.rowcount
+    stats["urls_enqueued"] += added + requeued
+    if source_sid:
+        enq_norms = [i["url_norm"] for i in enqueue]
+        c.execute(f"SELECT fid FROM crawl_frontier WHERE url_norm IN ({','.join('?'*len(enq_norms))})", enq_norms)
+        c.executemany('INSERT OR IGNORE INTO frontier_source_link (fid,sid) VALUES (?,?)',
+                      [(r[0], source_sid) for r in c.fetchall()])
+
+
+def ingest_sitemap(sitemap_url, fetcher, job_id=None, since=None, max_depth=SITEMAP_MAX_INDEX_DEPTH):
+    """
+    SITEMAP_INGEST_GATE: stream a sitemap or sitemap index (gzip ok) and
+    enqueue only new/changed URLs. Memory is constant per file: entries are
+    diffed in SITEMAP_DIFF_CHUNK batches while parsing.
+    fetcher(url, headers) -> (http_status|None, bytes|file-like, response_headers);
+    conditional headers come from the previous ingest of the same file.
+    Index children whose <lastmod> is unchanged since their last ingest are
+    skipped without fetching. since (ISO) drops entries with older lastmod.
+    v16: index children on another host are never fetched (counted in `children` only).
+    Each file is downloaded (spooled) with no write transaction open; the diff then
+    commits per SITEMAP_DIFF_CHUNK, so writers are only blocked for one chunk at a time.
+    Returns totals plus per-file stats.
+    """
+    from collections import deque
+    host = extract_domain(sitemap_url)
+    since = _normalize_lastmod(since) if since else None
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        domain_id = ensure_domain(c, host)
+        conn.commit()
+        c.execute("SELECT sid FROM ingest_source WHERE kind='SITEMAP' AND is_enabled=1 ORDER BY sid LIMIT 1")
+        src = c.fetchone()
+        source_sid = src[0] if src else None
+
+        files = []
+        queue = deque([(sitemap_url, None, None, 0)])   # (url, parent, lastmod_from_index, depth)
+        while queue:
+            url, parent, idx_lastmod, depth = queue.popleft()
+            now = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+            stats = {"sitemap_url": url, "parent_url": parent, "kind": "URLSET", "status": "DONE",
+                     "http_status": None, "urls_seen": 0, "urls_new": 0, "urls_changed": 0,
+                     "urls_unchanged": 0, "urls_enqueued": 0, "children": 0,
+                     "bytes": 0, "is_gzip": 0, "sha256": None, "error": None}
+
+            c.execute('''SELECT etag,last_modified,lastmod,kind FROM sitemap_ingest
+                WHERE sitemap_url=? AND status IN ('DONE','NOT_MODIFIED','SKIPPED')
+                ORDER BY id DESC LIMIT 1''', (url,))
+            last = c.fetchone()
+            etag = last_mod_hdr = None
+            if last and idx_lastmod and last[2] and idx_lastmod <= last[2]:
+                stats["status"], stats["kind"] = "SKIPPED", last[3]
+            else:
+                req_headers = {}
+                if last and last[0]:
+                    req_headers["If-None-Match"] = last[0]
+                if last and last[1]:
+                    req_headers["If-Modified-Since"] = last[1]
+                try:
+                    status, body, resp_headers = fetcher(url, req_headers)
+                    stats["http_status"] = status
+                    h = {k.lower(): v for k, v in (resp_headers or {}).items()}
+                    etag, last_mod_hdr = h.get("etag"), h.get("last-modified")
+                    if status == 304:
+                        stats["status"] = "NOT_MODIFIED"
+                        stats["kind"] = last[3] if last else "URLSET"
+                        etag = etag or (last[0] if last else None)
+                        last_mod_hdr = last_mod_hdr or (last[1] if last else None)
+                    elif not status or status >= 400:
+                        raise IOError(f"HTTP {status}")
+                    else:
+                        body = _spool_sitemap_body(body)
+                        reader = _SitemapReader(body)
+                        chunk = []
+                        for kind, loc, lastmod in _iter_sitemap_entries(reader):
+                            stats["kind"] = kind
+                            if kind == "INDEX":
+                                stats["children"] += 1
+                                if depth < max_depth and extract_domain(loc) == host:
+                                    queue.append((loc, url, lastmod, depth + 1))
+                                continue
+                            if extract_domain(loc) != host:
+                                continue
+                            stats["urls_seen"] += 1
+                            chunk.append((loc, lastmod))
+                            if len(chunk) >= SITEMAP_DIFF_CHUNK:
+                                _sitemap_diff_chunk(c, chunk, domain_id, url, now, since,
+                                                    source_sid, job_id, stats)
+                                conn.commit()
+                                chunk = []
+                            if stats["urls_seen"] >= SITEMAP_MAX_URLS_PER_FILE:
+                                break
+                        if chunk:
+                            _sitemap_diff_chunk(c, chunk, domain_id, url, now, since,
+                                                source_sid, job_id, stats)
+                            conn.commit()
+                        stats.update(bytes=reader.bytes, is_gzip=int(reader.is_gzip),
+                                     sha256=reader.sha.hexdigest())
+                    if job_id:
+                        record_cost(c, job_id, "FETCH", 1, domain_id=domain_id,
+                                    meta={"sitemap": url, "http_status": status})
+                except Exception as e:
+                    stats["status"], stats["error"] = "FAILED", f"{type(e).__name__}: {e}"
+                    _log(c, "SITEMAP", "WARN", "SITEMAP_INGEST_FAILED", f"{url} {stats['error']}",
+                         job_id=job_id, domain_id=domain_id)
+
+            c.execute('''INSERT INTO sitemap_ingest (domain_id,job_id,sitemap_url,parent_url,kind,http_status,
+                etag,last_modified,lastmod,sha256,bytes,is_gzip,urls_seen,urls_new,urls_changed,
+                urls_unchanged,urls_enqueued,children,status,error,ingested_at)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+                (domain_id, job_id, url, parent, stats["kind"], stats["http_status"],
+                 etag, last_mod_hdr, idx_lastmod or (last[2] if last else None),
+                 stats["sha256"], stats["bytes"], stats["is_gzip"], stats["urls_seen"],
+                 stats["urls_new"], stats["urls_changed"], stats["urls_unchanged"],
+                 stats["urls_enqueued"], stats["children"], stats["status"], stats["error"], now))
+            if parent is None and stats["status"] == "DONE":
+                update_domain_sitemap(c, domain_id, url, stats["sha256"])
+                upsert_site_hint(c, domain_id, has_sitemap=True, sitemap_url=url)
+            conn.commit()
+            files.append(stats)
+
+        totals = {k: sum(f[k] for f in files)
+                  for k in ("urls_seen", "urls_new", "urls_changed", "urls_unchanged", "urls_enqueued")}
+        totals["files"] = len(files)
+        totals["failed"] = sum(1 for f in files if f["status"] == "FAILED")
+        _log(c, "SITEMAP", "INFO", "SITEMAP_INGESTED",
+             f"{sitemap_url} files={totals['files']} seen={totals['urls_seen']} "
+             f"new={totals['urls_new']} changed={totals['urls_changed']} enqueued={totals['urls_enqueued']}",
+             job_id=job_id, domain_id=domain_id, payload=totals)
+        conn.commit()
+        totals["per_sitemap"] = files
+        return totals
+    finally:
+        conn.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# v16 offline re-analysis from stored artifacts
+# ═══════════════════════════════════════════════════════════════════════
+def list_reanalysis_candidates(domain=None, since=None, limit=None):
+    """
+    Latest snapshot per page whose HTML bytes are held in artifact_store
+    (tier A). Replay-derived snapshots are never used as a source.
+    Returns [snap_id, ...] ordered by snap_id.
+    """
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        sql = '''SELECT MAX(ps.snap_id) FROM page_snapshot ps
+                 JOIN page p ON p.page_id=ps.page_id
+                 JOIN artifact_store a ON a.sha256=ps.html_artifact_sha256
+                 WHERE a.kind='HTML' AND a.bytes IS NOT NULL
+                   AND ps.derived_from_snap_id IS NULL'''
+        params = []
+        if domain:
+            sql += ' AND p.domain=?'; params.append(domain)
+        if since:
+            sql += ' AND ps.fetched_at>=?'; params.append(since)
+        sql += ' GROUP BY ps.page_id ORDER BY 1'
+        if limit:
+            sql += ' LIMIT ?'; params.append(int(limit))
+        c.execute(sql, params)
+        return [r[0] for r in c.fetchall()]
+    finally:
+        conn.close()
+
+
+def iter_snapshot_html(snap_ids, chunk=200):
+    """
+    Yield {snap_id, url, final_url, status_code, redirect_chain, html, headers}
+    for each snapshot with stored HTML bytes; fetched in chunks so memory
+    stays bounded by `chunk` documents.
+    v16: status/final_url/redirect chain come from the snapshot itself; only snapshots older
+    than those columns (status_code NULL) fall back to the page's latest fetch.
+    """
+    conn = get_conn()
+    try:
+        c = conn.cursor()
+        snap_ids = list(snap_ids)
+        for i in range(0, len(snap_ids), chunk):
+            part = snap_ids[i:i + chunk]
+            ph = ",".join("?" * len(part))
+            c.execute(f'''SELECT ps.snap_id, p.url,
+                                 CASE WHEN ps.status_code IS NULL THEN p.final_url ELSE ps.final_url END,
+                                 COALESCE(ps.status_code, p.last_status_code),
+                                 CASE WHEN ps.status_code IS NULL THEN p.redirect_chain_json
+                                      ELSE ps.redirect_chain_json END,
+                                 ah.bytes, hh.bytes
+                          FROM page_snapshot ps
+                          JOIN page p ON p.page_id=ps.page_id
+                          JOIN artifact_store ah ON ah.sha256=ps.html_artifact_sha256
+                          LEFT JOIN artifact_store hh ON hh.sha256=ps.headers_artifact_sha256
+                          WHERE ps.snap_id IN ({ph}) AND ah.bytes IS NOT NULL
+                          ORDER BY ps.snap_id''', part)
+            for sid, url, final_url, status, chain, html, hdr in c.fetchall():
+                try:
+                    headers = json.loads(hdr) if hdr else {}
+                except (ValueError, TypeError):
+                    headers = {}
+                headers.setdefault("content-type", "text/html")
+                try:
+                    redirect_chain = json.loads(chain) if chain else []
+                except (ValueError, TypeError):
+                    redirect_chain = []
+                yield {"snap_id": sid, "url": url, "final_url": final_url or url,
+                       "status_code": status or 200, "redirect_chain": redirect_chain,
+                       "html": bytes(html), "headers": headers}
+    finally:
+        conn.close()
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # v11 pair_fixed + coverage + safe_intent
 # ═══════════════════════════════════════════════════════════════════════
@@ -4925,10 +8917,36 @@ def enqueue_pair_fixed_pages(pair_id, job_id=None):
         conn.close()
 
 
+def _intent_coverage_counts(c, domain_ids=None):
+    """
+    v16: all intents in one grouped pass over each page's latest snapshot (intent_mask bits).
+    Returns {domain_id: {intent: (pages_seen, rep_pages_seen)}}; domain_ids=None → every domain.
+    """
+    where, params = "", ()
+    if domain_ids is not None:
+        where, params = "WHERE p.domain_id IN (SELECT value FROM json_each(?))", (json.dumps(list(domain_ids)),)
+    sums = ",".join(f"SUM((ps.intent_mask & {b})!=0),SUM(p.is_representative=1 AND (ps.intent_mask & {b})!=0)"
+                    for b in INTENT_FLAG_BITS.values())
+    c.execute(f'''WITH latest AS (
+            SELECT ps.page_id, MAX(ps.snap_id) AS snap_id
+            FROM page p JOIN page_snapshot ps ON ps.page_id=p.page_id {where}
+            GROUP BY ps.page_id)
+        SELECT p.domain_id,{sums}
+        FROM latest l JOIN page_snapshot ps ON ps.snap_id=l.snap_id
+        JOIN page p ON p.page_id=l.page_id
+        GROUP BY p.domain_id''', params)
+    out = {}
+    for r in c.fetchall():
+        out[r[0]] = {f: (r[1 + 2 * i] or 0, r[2 + 2 * i] or 0) for i, f in enumerate(INTENT_FLAG_BITS)}
+    return out
+
+
 def compute_coverage_matrix(scope="DOMAIN", scope_id=None, rule_set_id=None):
     """
     INTENT_COVERAGE_GATE: compute coverage for a domain/segment/pair.
     Persists to coverage_matrix table.
+    v16: counts come from page_snapshot.intent_mask in one grouped query (no per-intent LIKE scans);
+    scope_id=None computes every domain / every pair.
     """
     conn = get_conn()
     try:
@@ -4939,40 +8957,41 @@ def compute_coverage_matrix(scope="DOMAIN", scope_id=None, rule_set_id=None):
             rs = get_active_rule_set(c)
             rule_set_id = rs["rule_set_id"] if rs else None
 
-        if scope == "DOMAIN" and scope_id:
-            for intent in PAGE_INTENT_FLAGS:
-                c.execute('''SELECT COUNT(*), SUM(CASE WHEN p.is_representative=1 THEN 1 ELSE 0 END)
-                    FROM page_snapshot ps JOIN page p ON ps.page_id=p.page_id
-                    WHERE p.domain_id=? AND ps.intent_flags_json LIKE ?
-                    AND ps.snap_id=(SELECT MAX(s2.snap_id) FROM page_snapshot s2 WHERE s2.page_id=ps.page_id)''',
-                    (scope_id, f'%"{intent}"%'))
-                row = c.fetchone()
-                seen, rep_seen = row[0] or 0, row[1] or 0
-                cov = 1.0 if seen > 0 else 0.0
-                c.execute('''INSERT OR REPLACE INTO coverage_matrix
-                    (scope,scope_id,intent_flag,rule_set_id,as_of_date,pages_seen,rep_pages_seen,coverage_pct)
-                    VALUES (?,?,?,?,?,?,?,?)''',
-                    ("DOMAIN", scope_id, intent, rule_set_id, today, seen, rep_seen, cov))
-
-        elif scope == "PAIR" and scope_id:
-            c.execute('SELECT left_domain_id,right_domain_id FROM comparison_pair WHERE pid=?', (scope_id,))
-            pair = c.fetchone()
-            if pair:
+        if scope == "DOMAIN":
+            if scope_id:
+                domain_ids = [scope_id]
+            else:
+                c.execute('SELECT domain_id FROM domain')
+                domain_ids = [r[0] for r in c.fetchall()]
+            counts = _intent_coverage_counts(c, None if not scope_id else domain_ids)
+            rows = []
+            for did in domain_ids:
+                per = counts.get(did, {})
+                for intent in PAGE_INTENT_FLAGS:
+                    seen, rep_seen = per.get(intent, (0, 0))
+                    rows.append(("DOMAIN", did, intent, rule_set_id, today, seen, rep_seen,
+                                 1.0 if seen > 0 else 0.0))
+            c.executemany('''INSERT OR REPLACE INTO coverage_matrix
+                (scope,scope_id,intent_flag,rule_set_id,as_of_date,pages_seen,rep_pages_seen,coverage_pct)
+                VALUES (?,?,?,?,?,?,?,?)''', rows)
+
+        elif scope == "PAIR":
+            if scope_id:
+                c.execute('SELECT pid,left_domain_id,right_domain_id FROM comparison_pair WHERE pid=?', (scope_id,))
+            else:
+                c.execute('SELECT pid,left_domain_id,right_domain_id FROM comparison_pair')
+            pairs = c.fetchall()
+            counts = _intent_coverage_counts(c, {d for _, l, r in pairs for d in (l, r) if d}) if pairs else {}
+            rows = []
+            for pid, left, right in pairs:
                 for intent in PAIR_FIXED_INTENTS:
-                    both_have = True
-                    for did in [pair[0], pair[1]]:
-                        if did:
-                            c.execute('''SELECT COUNT(*) FROM page_snapshot ps JOIN page p ON ps.page_id=p.page_id
-                                WHERE p.domain_id=? AND ps.intent_flags_json LIKE ?
-                                AND ps.snap_id=(SELECT MAX(s2.snap_id) FROM page_snapshot s2 WHERE s2.page_id=ps.page_id)''',
-                                (did, f'%"{intent}"%'))
-                            if c.fetchone()[0] == 0:
-                                both_have = False
-                    cov = 1.0 if both_have else 0.0
-                    c.execute('''INSERT OR REPLACE INTO coverage_matrix
-                        (scope,scope_id,intent_flag,rule_set_id,as_of_date,pages_seen,rep_pages_seen,coverage_pct)
-                        VALUES (?,?,?,?,?,?,?,?)''',
-                        ("PAIR", scope_id, intent, rule_set_id, today, 1 if both_have else 0, 0, cov))
+                    both_have = all(counts.get(did, {}).get(intent, (0, 0))[0] > 0
+                                    for did in (left, right) if did)
+                    rows.append(("PAIR", pid, intent, rule_set_id, today, 1 if both_have else 0, 0,
+                                 1.0 if both_have else 0.0))
+            c.executemany('''INSERT OR REPLACE INTO coverage_matrix
+                (scope,scope_id,intent_flag,rule_set_id,as_of_date,pages_seen,rep_pages_seen,coverage_pct)
+                VALUES (?,?,?,?,?,?,?,?)''', rows)
 
         conn.commit()
     finally:
@@ -5126,13 +9145,13 @@ def populate_replay_items(rid):
         from_rs, seg_id, sample_size = plan
 
         # Build query: snapshots that have HTML artifacts stored
-        query = '''SELECT DISTINCT ps.snap_id, sa.artifact_sha256
+        query = '''SELECT DISTINCT ps.snap_id, ast.sha256
             FROM page_snapshot ps
             JOIN snapshot_artifact sa ON ps.snap_id=sa.snap_id
             JOIN artifact_store ast ON sa.artifact_id=ast.artifact_id
             JOIN page p ON ps.page_id=p.page_id
             JOIN snapshot_rule_binding srb ON ps.snap_id=srb.snap_id
-            WHERE srb.rule_set_id=? AND ast.artifact_type='HTML' AND ast.stored_bytes=1'''
+            WHERE srb.rule_set_id=? AND ast.kind='HTML' AND ast.bytes IS NOT NULL'''
         params = [from_rs]
 
         if seg_id:
@@ -5174,6 +9193,7 @@ def execute_replay(rid):
     with the to_rule_set scoring/taxonomy.
     """
     conn = get_conn()
+    begin_bulk_writes(conn)  # v16: per-item AUDIT costs flushed in batches
     try:
         c = conn.cursor()
         c.execute('SELECT to_rule_set_id,status FROM replay_plan WHERE rid=?', (rid,))
@@ -5274,9 +9294,11 @@ def execute_replay(rid):
         final_status = 'DONE' if failed == 0 else ('FAILED' if done == 0 else 'DONE')
         c.execute("UPDATE replay_plan SET status=?,finished_at=? WHERE rid=?",
                   (final_status, now, rid))
+        flush_bulk_writes(c)
         conn.commit()
         return {"status": final_status, "done": done, "failed": failed}
     finally:
+        end_bulk_writes(conn)
         conn.close()
 
 
@@ -5455,7 +9477,7 @@ def activate_rule_set_via_gate(to_rule_set_id, release_gate_id):
 # ═══════════════════════════════════════════════════════════════════════
 def query_policy_audit(limit=20):
     """Policy audit: all policy bindings with their policy versions."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT pb.id,pb.kind,pb.ref_id,pb.bound_at,
@@ -5472,7 +9494,7 @@ def query_policy_audit(limit=20):
 
 def query_public_exports(limit=20):
     """Public exports: all exports using PUBLIC view with artifact hashes."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT ej.export_id,ej.export_type,ej.output_path,ej.row_count,
@@ -5491,7 +9513,7 @@ def query_public_exports(limit=20):
 
 def query_export_violations(limit=20):
     """Export violations: exports missing policy binding or with no view assignment."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT ej.export_id,ej.export_type,ej.output_path,ej.row_count,
@@ -5509,17 +9531,22 @@ def query_export_violations(limit=20):
 
 
 def query_redaction_coverage():
-    """Redaction coverage: all active redaction rules with match statistics."""
-    conn = get_conn()
+    """Redaction coverage: all active redaction rules with match statistics (v16: per-rule hits)."""
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT rr.rid,rr.name,rr.pattern,rr.action,rr.scope,rr.is_enabled,rr.created_at,
-            (SELECT COUNT(*) FROM export_job ej WHERE ej.redaction_applied=1) as exports_redacted
+            (SELECT COUNT(*) FROM export_job ej WHERE ej.redaction_applied=1) as exports_redacted,
+            COUNT(DISTINCT rh.export_id), COALESCE(SUM(rh.cells_matched),0), COALESCE(SUM(rh.matches),0),
+            MAX(rh.created_at)
             FROM redaction_rule rr
+            LEFT JOIN redaction_hit rh ON rh.rid=rr.rid
+            GROUP BY rr.rid
             ORDER BY rr.is_enabled DESC, rr.rid''')
         return [{"rid":r[0],"name":r[1],"pattern":r[2],"action":r[3],
                  "scope":r[4],"enabled":bool(r[5]),"created_at":r[6],
-                 "exports_redacted":r[7]} for r in c.fetchall()]
+                 "exports_redacted":r[7],"exports_hit":r[8],"cells_matched":r[9],
+                 "matches":r[10],"last_hit_at":r[11]} for r in c.fetchall()]
     finally:
         conn.close()
 
@@ -5529,7 +9556,7 @@ def query_redaction_coverage():
 # ═══════════════════════════════════════════════════════════════════════
 def query_job_cost_breakdown(job_id=None, limit=20):
     """Job cost breakdown by stage (sum cost_total group by stage)."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         if job_id:
@@ -5550,7 +9577,7 @@ def query_job_cost_breakdown(job_id=None, limit=20):
 
 def query_expensive_domains(days=30, limit=20):
     """Top expensive domains (avg cost per snapshot last 30d)."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -5570,7 +9597,7 @@ def query_expensive_domains(days=30, limit=20):
 
 def query_budget_stops(limit=20):
     """Budget stops: jobs where budget_status != OK."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT cj.job_id, cj.seed, cj.budget_status, cj.budget_spent, cj.budget_currency,
@@ -5590,7 +9617,7 @@ def query_budget_stops(limit=20):
 
 def query_cost_vs_quality(limit=50):
     """Cost vs quality: scatter (avg cost per snapshot vs SCORE_P50) by domain."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT d.domain, d.cost_tier, d.tier,
@@ -5614,7 +9641,7 @@ def query_cost_vs_quality(limit=50):
 # ═══════════════════════════════════════════════════════════════════════
 def query_replay_summary(limit=20):
     """Replay summary: avg score_delta + top added CRITICAL codes by replay_plan."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT rp.rid,rp.name,rp.from_rule_set_id,rp.to_rule_set_id,rp.status,
@@ -5636,7 +9663,7 @@ def query_replay_summary(limit=20):
 
 def query_release_history(limit=20):
     """Release history: release_gate ordered by decided_at desc."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT gid,kind,from_version,to_version,status,
@@ -5651,7 +9678,7 @@ def query_release_history(limit=20):
 
 def query_rule_set_lineage(limit=20):
     """Rule-set lineage: golden_rule with release_gate_id."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT gr.rule_set_id,gr.name,gr.version,gr.is_active,gr.frozen_at,
@@ -5667,18 +9694,17 @@ def query_rule_set_lineage(limit=20):
         conn.close()
 
 
-def query_split_brain_incidents(limit=50):
-    """Split-brain incidents: event_log where code='RULE_SET_SPLIT_BRAIN'."""
-    conn = get_conn()
-    try:
-        c = conn.cursor()
-        c.execute('''SELECT eid,stage,severity,code,message,ts
-            FROM event_log WHERE code='RULE_SET_SPLIT_BRAIN'
-            ORDER BY ts DESC LIMIT ?''', (limit,))
-        return [{"eid":r[0],"stage":r[1],"severity":r[2],"code":r[3],
-                 "message":r[4],"ts":r[5]} for r in c.fetchall()]
-    finally:
-        conn.close()
+def query_split_brain_incidents(limit=50, days=30):
+    """
+    Split-brain incidents: event_log where code='RULE_SET_SPLIT_BRAIN' over the last `days`
+    (v16: incl. archived segments overlapping that window; days=None reads all history).
+    """
+    since = None
+    if days is not None:
+        since = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return [{"eid":e["eid"],"stage":e["stage"],"severity":e["level"],"code":e["code"],
+             "message":e["message"],"ts":e["ts"]}
+            for e in query_event_log(since=since, code='RULE_SET_SPLIT_BRAIN', limit=limit)]
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -5686,7 +9712,7 @@ def query_split_brain_incidents(limit=50):
 # ═══════════════════════════════════════════════════════════════════════
 def query_pair_coverage_gaps(limit=50):
     """Pair coverage gaps: coverage_matrix where scope=PAIR and coverage_pct<0.9."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT cm.id,cm.scope_id as pair_id,cm.intent_flag,cm.coverage_pct,
@@ -5705,7 +9731,7 @@ def query_pair_coverage_gaps(limit=50):
 
 def query_domain_intent_coverage(limit=50):
     """Domain intent coverage: ordered by coverage_pct asc."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT cm.scope_id as domain_id,d.domain,cm.intent_flag,
@@ -5722,7 +9748,7 @@ def query_domain_intent_coverage(limit=50):
 
 def query_pairs_missing_pricing(limit=50):
     """Fixed pages audit: pairs missing PRICING fixed page."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT cp.pid,cp.left_domain_id,cp.right_domain_id,cp.created_at
@@ -5736,26 +9762,20 @@ def query_pairs_missing_pricing(limit=50):
 
 
 def query_auth_surface_hits(days=7, limit=50):
-    """Auth surface hits: AUTH_SURFACE_RESTRICTED events last N days."""
-    conn = get_conn()
-    try:
-        c = conn.cursor()
-        cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
-        c.execute('''SELECT eid,stage,message,ts,domain_id,page_id
-            FROM event_log WHERE code='AUTH_SURFACE_RESTRICTED' AND ts >= ?
-            ORDER BY ts DESC LIMIT ?''', (cutoff, limit))
-        return [{"eid":r[0],"stage":r[1],"message":r[2],"ts":r[3],
-                 "domain_id":r[4],"page_id":r[5]} for r in c.fetchall()]
-    finally:
-        conn.close()
+    """Auth surface hits: AUTH_SURFACE_RESTRICTED events last N days (v16: incl. archived)."""
+    cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return [{"eid":e["eid"],"stage":e["stage"],"message":e["message"],"ts":e["ts"],
+             "domain_id":e["domain_id"],"page_id":e["page_id"]}
+            for e in query_event_log(since=cutoff, code='AUTH_SURFACE_RESTRICTED', limit=limit)]
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # v12 starter queries
 # ═══════════════════════════════════════════════════════════════════════
+@_shard_fanout(order=(("checked_at", True),))
 def query_integrity_failures(limit=50):
     """Integrity failures: snapshots that failed completeness checks."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT si.id,si.snap_id,ig.name,si.status,si.missing_json,si.created_at,
@@ -5777,7 +9797,7 @@ def query_integrity_failures(limit=50):
 
 def query_data_quality_trend(days=30, scope="GLOBAL", scope_id=None):
     """Data quality trend: daily pass rate over time."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
@@ -5801,7 +9821,7 @@ def query_data_quality_trend(days=30, scope="GLOBAL", scope_id=None):
 
 def query_kpi_filter_coverage():
     """KPI filter coverage: which KPIs have filters assigned."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT kd.kpi_id,kd.key,kd.name,kd.kpi_filter_id,
@@ -5816,9 +9836,10 @@ def query_kpi_filter_coverage():
         conn.close()
 
 
+@_shard_fanout(merge=_merge_snapshot_rates)
 def query_incomplete_snapshot_rate(days=7):
     """Incomplete snapshot rate: % of recent snapshots with is_complete=0."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -5835,42 +9856,44 @@ def query_incomplete_snapshot_rate(days=7):
 # ═══════════════════════════════════════════════════════════════════════
 # v13 starter queries
 # ═══════════════════════════════════════════════════════════════════════
-def query_lineage_graph(from_kind=None, from_id=None, depth=3, limit=100):
-    """Lineage graph: trace data flow from a given node (BFS up to depth)."""
-    conn = get_conn()
+def query_lineage_graph(from_kind=None, from_id=None, depth=3, limit=100, direction="DOWN"):
+    """
+    Lineage graph: trace data flow from a given node (BFS up to depth).
+    v16: traversal runs in one WITH RECURSIVE query — nodes within `depth` hops
+    are expanded once at their shortest distance (cycle-safe), edges come back
+    in BFS order. direction="UP" walks upstream (to → from) instead.
+    """
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         if from_kind and from_id:
-            visited = set()
-            queue = [(from_kind, from_id, 0)]
-            edges = []
-            while queue and len(edges) < limit:
-                fk, fi, d = queue.pop(0)
-                key = (fk, fi)
-                if key in visited or d > depth:
-                    continue
-                visited.add(key)
-                c.execute('''SELECT lid,from_kind,from_id,to_kind,to_id,edge_type,job_id,created_at
-                    FROM lineage_edge WHERE from_kind=? AND from_id=?''', (fk, fi))
-                for r in c.fetchall():
-                    edges.append({"lid":r[0],"from_kind":r[1],"from_id":r[2],
-                                  "to_kind":r[3],"to_id":r[4],"edge_type":r[5],
-                                  "job_id":r[6],"created_at":r[7]})
-                    queue.append((r[3], r[4], d + 1))
-            return edges
+            if direction == "UP":
+                near, far = ("to_kind", "to_id"), ("from_kind", "from_id")
+            else:
+                near, far = ("from_kind", "from_id"), ("to_kind", "to_id")
+            c.execute(f'''WITH RECURSIVE reach(kind, id, d) AS (
+                    SELECT ?, ?, 0
+                    UNION
+                    SELECT e.{far[0]}, e.{far[1]}, r.d + 1
+                    FROM reach r JOIN lineage_edge e ON e.{near[0]}=r.kind AND e.{near[1]}=r.id
+                    WHERE r.d < ?),
+                nodes AS (SELECT kind, id, MIN(d) AS d FROM reach GROUP BY kind, id)
+                SELECT e.lid,e.from_kind,e.from_id,e.to_kind,e.to_id,e.edge_type,e.job_id,e.created_at
+                FROM nodes n JOIN lineage_edge e ON e.{near[0]}=n.kind AND e.{near[1]}=n.id
+                ORDER BY n.d, e.lid LIMIT ?''', (from_kind, from_id, depth, limit))
         else:
             c.execute('''SELECT lid,from_kind,from_id,to_kind,to_id,edge_type,job_id,created_at
                 FROM lineage_edge ORDER BY created_at DESC LIMIT ?''', (limit,))
-            return [{"lid":r[0],"from_kind":r[1],"from_id":r[2],
-                     "to_kind":r[3],"to_id":r[4],"edge_type":r[5],
-                     "job_id":r[6],"created_at":r[7]} for r in c.fetchall()]
+        return [{"lid":r[0],"from_kind":r[1],"from_id":r[2],
+                 "to_kind":r[3],"to_id":r[4],"edge_type":r[5],
+                 "job_id":r[6],"created_at":r[7]} for r in c.fetchall()]
     finally:
         conn.close()
 
 
 def query_sample_set_status(limit=20):
     """Sample set status: all active sample sets with member counts."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT ss.ssid,ss.name,ss.strategy,ss.sample_size,ss.rule_set_id,
@@ -5891,7 +9914,7 @@ def query_sample_set_status(limit=20):
 
 def query_stability_trend(ssid=None, days=30):
     """Stability trend: daily stability metrics for a sample set."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
@@ -5918,9 +9941,10 @@ def query_stability_trend(ssid=None, days=30):
         conn.close()
 
 
+@_shard_fanout(order=(("distinct_hashes", True),))
 def query_unstable_pages(ssid, threshold_flips=2, days=30, limit=50):
     """Unstable pages: sample members with most issues_sha256 changes."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -5950,7 +9974,7 @@ def query_unstable_pages(ssid, threshold_flips=2, days=30, limit=50):
 # ═══════════════════════════════════════════════════════════════════════
 def query_anomaly_feed(days=14, limit=50):
     """Anomaly feed: recent anomaly events ordered by severity then ts."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -5972,7 +9996,7 @@ def query_anomaly_feed(days=14, limit=50):
 
 def query_top_anomaly_detectors(days=30, limit=20):
     """Top anomaly detectors by fired count in last N days."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -5992,11 +10016,11 @@ def query_top_anomaly_detectors(days=30, limit=20):
 
 def query_kpi_baseline_view(metric_key="CRITICAL_RATE", scope="GLOBAL", days=30):
     """Baseline view: kpi_baseline_daily trend for a given metric."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
-        c.execute('''SELECT id,as_of_date,scope,scope_id,metric_key,window_days,
+        c.execute('''SELECT id,as_of_date,scope,scope_id,metric_key,window_samples,
             mean,stddev,p50,p75,p90
             FROM kpi_baseline_daily
             WHERE metric_key=? AND scope=? AND as_of_date >= ?
@@ -6011,16 +10035,16 @@ def query_kpi_baseline_view(metric_key="CRITICAL_RATE", scope="GLOBAL", days=30)
 
 def query_anomaly_bridged_alerts(limit=50):
     """Alerts bridged from anomaly: alert_event where anomaly_event_id is not null."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
-        c.execute('''SELECT ale.eid,ale.severity,ale.message,ale.ts,ale.anomaly_event_id,
+        c.execute('''SELECT ale.aid,ale.severity,ale.message,ale.fired_at,ale.anomaly_event_id,
             ae.adid,ad.name as detector_name,ae.metric_key,ae.value,ae.scope
             FROM alert_event ale
             JOIN anomaly_event ae ON ale.anomaly_event_id=ae.aeid
             JOIN anomaly_detector ad ON ae.adid=ad.adid
             WHERE ale.anomaly_event_id IS NOT NULL
-            ORDER BY ale.ts DESC LIMIT ?''', (limit,))
+            ORDER BY ale.fired_at DESC LIMIT ?''', (limit,))
         return [{"alert_id":r[0],"severity":r[1],"message":r[2],"ts":r[3],
                  "anomaly_id":r[4],"adid":r[5],"detector":r[6],
                  "metric":r[7],"value":r[8],"scope":r[9]} for r in c.fetchall()]
@@ -6033,7 +10057,7 @@ def query_anomaly_bridged_alerts(limit=50):
 # ═══════════════════════════════════════════════════════════════════════
 def query_worst_domains_by_health(days=7, limit=20):
     """Worst domains by fetch_success_rate in last N days."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
@@ -6058,7 +10082,7 @@ def query_worst_domains_by_health(days=7, limit=20):
 
 def query_health_tier_transitions(limit=50):
     """Health tier transitions: domains recently changed to BAD."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         c.execute('''SELECT d.domain_id,d.domain,d.health_tier,d.health_note,
@@ -6077,7 +10101,7 @@ def query_health_tier_transitions(limit=50):
 
 def query_fingerprint_changes(days=30, limit=30):
     """Fingerprint changes: domains with most distinct fingerprints (potential infra changes)."""
-    conn = get_conn()
+    conn = get_report_conn()
     try:
         c = conn.cursor()
         cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -6098,19 +10122,316 @@ def query_fingerprint_changes(days=30, limit=30):
 
 
 def query_cooldown_hits(days=14, limit=50):
-    """Cooldown hits: DOMAIN_IN_COOLDOWN events from event_log."""
-    conn = get_conn()
+    """Cooldown hits: DOMAIN_IN_COOLDOWN events from event_log (v16: incl. archived)."""
+    cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return [{"eid":e["eid"],"domain_id":e["domain_id"],"stage":e["stage"],
+             "message":e["message"],"ts":e["ts"],"network_stage":e["network_stage"]}
+            for e in query_event_log(since=cutoff, code='DOMAIN_IN_COOLDOWN', limit=limit)]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# v16 starter queries
+# ═══════════════════════════════════════════════════════════════════════
+def query_sitemap_ingest_history(domain=None, limit=20):
+    """Sitemap ingest history: per-file stats (new/changed/enqueued) newest first."""
+    conn = get_report_conn()
     try:
         c = conn.cursor()
-        cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
-        c.execute('''SELECT eid,domain_id,stage,message,ts,network_stage
-            FROM event_log
-            WHERE code='DOMAIN_IN_COOLDOWN' AND ts >= ?
-            ORDER BY ts DESC LIMIT ?''', (cutoff, limit))
-        return [{"eid":r[0],"domain_id":r[1],"stage":r[2],
-                 "message":r[3],"ts":r[4],"network_stage":r[5]} for r in c.fetchall()]
+        sql = '''SELECT si.id,d.domain,si.sitemap_url,si.parent_url,si.kind,si.status,si.http_status,
+            si.urls_seen,si.urls_new,si.urls_changed,si.urls_unchanged,si.urls_enqueued,
+            si.children,si.bytes,si.is_gzip,si.ingested_at
+            FROM sitemap_ingest si
+            LEFT JOIN domain d ON si.domain_id=d.domain_id'''
+        params = []
+        if domain:
+            sql += ' WHERE d.domain=?'
+            params.append(domain)
+        sql += ' ORDER BY si.id DESC LIMIT ?'
+        params.append(limit)
+        c.execute(sql, params)
+        return [{"id":r[0],"domain":r[1],"sitemap_url":r[2],"parent":r[3],"kind":r[4],
+                 "status":r[5],"http_status":r[6],"seen":r[7],"new":r[8],"changed":r[9],
+                 "unchanged":r[10],"enqueued":r[11],"children":r[12],"bytes":r[13],
+                 "gzip":bool(r[14]),"ingested_at":r[15]} for r in c.fetchall()]
+    finally:
+        conn.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# v16 query-plan advisor: EXPLAIN QUERY PLAN over captured module SQL
+# ═══════════════════════════════════════════════════════════════════════
+_SQL_KEYWORDS = {"where", "on", "join", "left", "right", "inner", "outer", "cross", "natural", "using",
+                 "group", "order", "limit", "union", "set", "values", "as", "and", "or", "select", "not"}
+_TABLE_REF_RE = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?', re.I)
+_EQP_SCAN_RE = re.compile(r'^SCAN (\w+)(?: USING (COVERING )?INDEX (\w+))?')
+_DATE_LIKE_RE = re.compile(r"\b(\w+)\s+LIKE\s+'\d{4}-\d{2}(?:-\d{2})?%'", re.I)
+
+
+def _sql_fingerprint(sql):
+    """Literal-free, whitespace-collapsed statement text (+ short hash) for plan baselines."""
+    norm = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    norm = re.sub(r'(?<![\w.])-?\d+(?:\.\d+)?\b', '?', norm)
+    norm = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?)', norm)
+    norm = re.sub(r'\s+', ' ', norm).strip()
+    return hashlib.sha1(norm.encode()).hexdigest()[:12], norm
+
+
+def _advisor_targets(c, include_writes):
+    """(name, callable, kwargs) for every query_* + get_domain_summary, optionally the daily/KPI gates."""
+    import inspect
+
+    def _first(sql, default=None):
+        c.execute(sql)
+        r = c.fetchone()
+        return r[0] if r and r[0] is not None else default
+
+    fixture = {"job_id": _first('SELECT MAX(job_id) FROM crawl_job', 1),
+               "kpi_key": _first('SELECT key FROM kpi_definition ORDER BY kpi_id LIMIT 1', "score_avg"),
+               "tid": _first('SELECT MIN(tid) FROM fix_ticket', 1),
+               "ssid": _first('SELECT MIN(ssid) FROM snapshot_sample_set', 1)}
+    targets = []
+    for name, fn in sorted(globals().items()):
+        if not callable(fn) or not (name.startswith("query_") or name == "get_domain_summary"):
+            continue
+        params = inspect.signature(fn).parameters.values()
+        kwargs = {p.name: fixture[p.name] for p in params
+                  if p.default is inspect.Parameter.empty and p.name in fixture}
+        targets.append((name, fn, kwargs))
+    if include_writes:
+        targets += [("compute_kpis_for_job", compute_kpis_for_job, {"job_id": fixture["job_id"]}),
+                    ("compute_coverage_matrix", compute_coverage_matrix, {}),
+                    ("compute_data_quality_daily", compute_data_quality_daily, {}),
+                    ("compute_kpi_baseline_daily", compute_kpi_baseline_daily, {}),
+                    ("evaluate_anomaly", evaluate_anomaly, {}),
+                    ("compute_domain_health_daily", compute_domain_health_daily, {}),
+                    ("compute_stability_stat", compute_stability_stat, {})]
+    return targets
+
+
+def _capture_target_sql(fn, kwargs):
+    """Run fn with a trace callback on every connection it opens; returns (statements, error)."""
+    global _SQL_CAPTURE, QUERY_CACHE_ENABLED
+    captured, cache_was = [], QUERY_CACHE_ENABLED
+    _SQL_CAPTURE, QUERY_CACHE_ENABLED = captured, False  # cache hits would hide the SQL
+    try:
+        fn(**kwargs)
+        err = None
+    except Exception as e:  # a failing target is reported, not fatal
+        err = f"{type(e).__name__}: {e}"
+    finally:
+        _SQL_CAPTURE, QUERY_CACHE_ENABLED = None, cache_was
+    return [s for s in captured if re.match(r'\s*(?:SELECT|WITH|UPDATE|DELETE)\b', s, re.I)], err
+
+
+def _table_refs(conn, sql, cols_cache):
+    """alias/table name -> real table for tables referenced in sql (CTEs/subqueries excluded)."""
+    refs = {}
+    for table, alias in _TABLE_REF_RE.findall(sql):
+        if table.lower() not in cols_cache:
+            cols = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+            cols_cache[table.lower()] = cols
+        if not cols_cache[table.lower()]:
+            continue
+        refs[table] = table
+        if alias and alias.lower() not in _SQL_KEYWORDS:
+            refs[alias] = table
+    return refs
+
+
+def _plan_flags(conn, sql, plan, refs, row_counts):
+    flags = []
+    for detail in plan:
+        m = _EQP_SCAN_RE.match(detail)
+        if m and m.group(1) in refs:
+            table = refs[m.group(1)]
+            if table not in row_counts:
+                row_counts[table] = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            if row_counts[table] >= ADVISOR_MIN_SCAN_ROWS and not m.group(2):
+                flags.append({"kind": "FULL_INDEX_SCAN" if m.group(3) else "FULL_SCAN", "table": table,
+                              "rows": row_counts[table], "detail": detail})
+        elif "USE TEMP B-TREE" in detail:
+            # a sort over a few hundred rows is free — only flag it when a large table feeds it
+            for table in set(refs.values()):
+                if table not in row_counts:
+                    row_counts[table] = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            big = max(set(refs.values()), key=lambda t: row_counts[t], default=None)
+            if big and row_counts[big] >= ADVISOR_MIN_SCAN_ROWS:
+                flags.append({"kind": "TEMP_BTREE", "table": big, "rows": row_counts[big], "detail": detail})
+        elif "AUTOMATIC" in detail and "INDEX" in detail:
+            flags.append({"kind": "AUTO_INDEX", "table": detail.split()[1], "detail": detail})
+    if re.search(r"\bLIKE\s+'%", sql, re.I):
+        flags.append({"kind": "LEADING_WILDCARD_LIKE", "table": None,
+                      "detail": "LIKE '%…' cannot use an index — normalize the JSON list into a table"})
+    for col in _DATE_LIKE_RE.findall(sql):
+        flags.append({"kind": "DATE_LIKE_PREFIX", "table": None,
+                      "detail": f"{col} LIKE 'YYYY-MM-DD%' is not sargable — use {col}>=? AND {col}<?"})
+    return flags
+
+
+def _suggest_index(conn, sql, table, refs, cols_cache):
+    """Equality columns, then one range or the ORDER BY columns, for `table` — None if nothing useful."""
+    cols = cols_cache[table.lower()]
+    aliases = [a for a, t in refs.items() if t == table]
+    others = {col for t in set(refs.values()) if t != table for col in cols_cache[t.lower()]}
+
+    def _col_pat(col):
+        alts = [f"(?:{'|'.join(map(re.escape, aliases))})\\.{col}\\b"]
+        if col not in others:  # unqualified only when no other referenced table has the column
+            alts.append(f"(?<![\\w.]){col}\\b")
+        return "(?:" + "|".join(alts) + ")"
+
+    eq, rng, order = [], [], []
+    for col in cols:
+        p = _col_pat(col)
+        if re.search(p + r"\s*(?:=|IN\b|IS\b)", sql, re.I) or re.search(r"=\s*" + p, sql, re.I):
+            eq.append((sql.find(col), col))
+        elif re.search(p + r"\s*(?:<|>|BETWEEN\b|LIKE\s+'[^%])", sql, re.I):
+            rng.append(col)
+    tail = re.search(r'\bORDER BY (.+?)(?:\bLIMIT\b|$)', sql, re.I | re.S)
+    if tail:
+        for term in tail.group(1).split(','):
+            m = re.match(r'\s*(?:(\w+)\.)?(\w+)', term)
+            if m and m.group(2) in cols and (m.group(1) in aliases or (not m.group(1) and m.group(2) not in others)):
+                order.append(m.group(2))
+    index_cols = [col for _, col in sorted(eq)]
+    index_cols += [col for col in (rng[:1] or order) if col not in index_cols]
+    if not index_cols:
+        return None
+    for (idx,) in conn.execute(f'SELECT name FROM pragma_index_list("{table}")').fetchall():
+        have = [r[2] for r in conn.execute(f'PRAGMA index_info("{idx}")')]
+        if have[:len(index_cols)] == index_cols:
+            return None  # an existing index already leads with these columns
+    name = f"idx_adv_{table}_{'_'.join(index_cols)}"[:60]
+    return f'CREATE INDEX IF NOT EXISTS {name} ON {table}({",".join(index_cols)})'
+
+
+def advise_query_plans(include_writes=False, extra_targets=None, validate=True):
+    """
+    INDEX_ADVISOR_GATE (v16): run every query_* function (plus the daily/KPI gates when
+    include_writes — they write, so use a fixture DB) with SQL capture on, EXPLAIN QUERY PLAN
+    each distinct statement, and flag FULL_SCAN / FULL_INDEX_SCAN of tables with at least
+    ADVISOR_MIN_SCAN_ROWS rows, TEMP_BTREE, AUTO_INDEX, LEADING_WILDCARD_LIKE and
+    DATE_LIKE_PREFIX. Scans get a suggested index; validate=True creates it inside a rolled
+    back savepoint and keeps it only if the scan disappears from the plan.
+    extra_targets: [(name, callable, kwargs)]. Returns one dict per statement fingerprint.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.isolation_level = None
+    try:
+        c = conn.cursor()
+        targets = _advisor_targets(c, include_writes) + list(extra_targets or ())
+        statements, errors = {}, {}
+        for name, fn, kwargs in targets:
+            sqls, err = _capture_target_sql(fn, kwargs)
+            if err:
+                errors[name] = err
+            for sql in sqls:
+                fp, norm = _sql_fingerprint(sql)
+                entry = statements.setdefault(fp, {"fingerprint": fp, "sql": norm, "example": sql, "sources": []})
+                if name not in entry["sources"]:
+                    entry["sources"].append(name)
+
+        cols_cache, row_counts, report = {}, {}, []
+        for entry in statements.values():
+            sql = entry.pop("example")
+            try:
+                plan = [r[3] for r in c.execute("EXPLAIN QUERY PLAN " + sql)]
+            except sqlite3.Error as e:
+                entry.update(plan=[], flags=[], suggestions=[], error=str(e))
+                report.append(entry)
+                continue
+            refs = _table_refs(conn, sql, cols_cache)
+            flags = _plan_flags(conn, sql, plan, refs, row_counts)
+            suggestions = []
+            for table in sorted({f["table"] for f in flags if f["kind"] in ("FULL_SCAN", "FULL_INDEX_SCAN")}):
+                ddl = _suggest_index(conn, sql, table, refs, cols_cache)
+                if not ddl:
+                    continue
+                sug = {"table": table, "index_sql": ddl, "validated": None}
+                if validate:
+                    c.execute("SAVEPOINT advisor")
+                    try:
+                        c.execute(ddl)
+                        new_plan = [r[3] for r in c.execute("EXPLAIN QUERY PLAN " + sql)]
+                        still = [f for f in _plan_flags(conn, sql, new_plan, refs, row_counts)
+                                 if f["table"] == table and f["kind"] in ("FULL_SCAN", "FULL_INDEX_SCAN")]
+                        sug["validated"] = not still
+                        sug["plan_after"] = new_plan
+                    finally:
+                        c.execute("ROLLBACK TO advisor")
+                        c.execute("RELEASE advisor")
+                suggestions.append(sug)
+            entry.update(plan=plan, flags=flags, suggestions=suggestions)
+            report.append(entry)
     finally:
         conn.close()
+    report.sort(key=lambda e: (-len(e["flags"]), e["sources"][0]))
+    if errors:
+        report.append({"fingerprint": None, "errors": errors})
+    return report
+
+
+def _plan_shape(entry):
+    """
+    Row-count-free regression keys for one report entry: scans, temp b-trees and automatic
+    indexes read off the plan text alone, plus the SQL-level LIKE flags. Unlike the advisor's
+    flags these never depend on how many rows the fixture happens to hold.
+    """
+    keys = set()
+    for detail in entry.get("plan", []):
+        m = _EQP_SCAN_RE.match(detail)
+        if m and not m.group(2):
+            keys.add(f"{'FULL_INDEX_SCAN' if m.group(3) else 'FULL_SCAN'}:{m.group(1)}")
+        elif "USE TEMP B-TREE" in detail:
+            keys.add("TEMP_BTREE:" + detail.split("USE TEMP B-TREE", 1)[1].strip())
+        elif "AUTOMATIC" in detail and "INDEX" in detail:
+            keys.add(f"AUTO_INDEX:{detail.split()[1]}")
+    keys.update(f["kind"] for f in entry.get("flags", [])
+                if f["kind"] in ("LEADING_WILDCARD_LIKE", "DATE_LIKE_PREFIX"))
+    return sorted(keys)
+
+
+def check_query_plans(baseline_path=None, update=False, report=None, **advise_kwargs):
+    """
+    Plan regression check against a JSON baseline (default QUERY_PLAN_BASELINE_PATH):
+    fails when a known statement's plan gains a shape key (_plan_shape), or a new statement
+    arrives with any. A missing baseline fails too; update=True writes the current plans
+    as the new baseline.
+    Returns {"ok", "checked", "regressions", "new_flagged", "baseline_path"}.
+    """
+    path = baseline_path or QUERY_PLAN_BASELINE_PATH or \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plan_baseline.json")
+    report = report if report is not None else advise_query_plans(**advise_kwargs)
+    current = {e["fingerprint"]: e for e in report if e.get("fingerprint")}
+
+    if update:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"sqlite": sqlite3.sqlite_version,
+                       "generated_at": datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+                       "plans": {fp: {"sql": e["sql"], "sources": e["sources"], "shape": _plan_shape(e),
+                                      "plan": e.get("plan", [])} for fp, e in sorted(current.items())}},
+                      fh, indent=1, sort_keys=True)
+            fh.write("\n")
+        return {"ok": True, "checked": len(current), "regressions": [], "new_flagged": [],
+                "baseline_path": path, "baseline_written": True}
+    if not os.path.exists(path):
+        return {"ok": False, "checked": len(current), "regressions": [], "new_flagged": [],
+                "baseline_path": path, "baseline_missing": True}
+
+    with open(path, encoding="utf-8") as fh:
+        base = json.load(fh)["plans"]
+    regressions, new_flagged = [], []
+    for fp, e in current.items():
+        keys = _plan_shape(e)
+        if fp in base:
+            gained = sorted(set(keys) - set(base[fp]["shape"]))
+            if gained:
+                regressions.append({"fingerprint": fp, "sources": e["sources"], "gained": gained,
+                                    "plan_before": base[fp]["plan"], "plan_after": e.get("plan", [])})
+        elif keys:
+            new_flagged.append({"fingerprint": fp, "sources": e["sources"], "flags": keys, "sql": e["sql"]})
+    return {"ok": not regressions and not new_flagged, "checked": len(current),
+            "regressions": regressions, "new_flagged": new_flagged, "baseline_path": path}
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -6136,7 +10457,13 @@ if __name__ == "__main__":
                   'integrity_gate','snapshot_integrity','kpi_filter','data_quality_daily',
                   'lineage_edge','snapshot_sample_set','sample_member','stability_stat',
                   'anomaly_detector','anomaly_event','kpi_baseline_daily',
-                  'resolver_cache','http_fingerprint','domain_health_daily']
+                  'resolver_cache','http_fingerprint','domain_health_daily',
+                  'robots_cache','sitemap_ingest','sitemap_url_state',
+                  'redaction_hit','cost_running_total','kpi_stream_stat',
+                  'sample_stratum','data_version','query_result_cache',
+                  'pair_report_state','event_archive_segment','event_retention_run',
+                  'job_gate_profile','crawl_worker','shard_outbox_mark','event_rollup',
+                  'schema_migration']
         c.execute("SELECT name FROM sqlite_master WHERE type='table'")
         existing = {r[0] for r in c.fetchall()}
         ok = [t for t in tables if t in existing]